@@ -0,0 +1,104 @@
+import asyncio
+import threading
+
+from typing import List, Tuple
+
+import aiohttp
+
+from _periodic_caller import PollScheduler
+
+
+class AsyncPoller:
+    """
+    Checks due jobs of a `PollScheduler` concurrently on an asyncio loop.
+
+    Due jobs are split into chunks of `chunk_size`, every chunk is one
+    `/v1/pool-jobs` request and at most `concurrency` requests are in
+    flight over a pool of keep-alive connections. A cycle is abandoned
+    after `cycle_deadline` seconds; jobs whose request did not finish in
+    time are scheduled again like pending ones.
+    """
+
+    def __init__(self, scheduler: PollScheduler, producer_url: str, service_name: str,
+                 concurrency: int = 20, chunk_size: int = 100, batch_size: int = 10000,
+                 cycle_deadline: float = 10.0, window: float = 0.0):
+        self.scheduler = scheduler
+        self.url = f'{producer_url}v1/pool-jobs'
+        self.service_name = service_name
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.cycle_deadline = cycle_deadline
+        self.window = window
+        self._loop = asyncio.new_event_loop()
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start polling on a daemon thread."""
+        threading.Thread(target=self._loop.run_until_complete, args=(self._run(),),
+                         daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop polling after the current cycle."""
+        self._stopped.set()
+
+    async def _run(self) -> None:
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            while not self._stopped.is_set():
+                due_jobs = await self._loop.run_in_executor(
+                    None, lambda: self.scheduler.get_due(self.batch_size, timeout=1,
+                                                         window=self.window))
+                if due_jobs:
+                    await self.cycle(session, due_jobs)
+
+    async def cycle(self, session: aiohttp.ClientSession,
+                    due_jobs: List[Tuple[str, int]]) -> None:
+        """
+        Check one batch of due jobs.
+
+        :param session: pooled HTTP client
+        :type session: aiohttp.ClientSession
+        :param due_jobs: list of (`message_token`, polls done so far)
+        :type due_jobs: list
+        :return:
+        :rtype: None
+        """
+        limit = asyncio.Semaphore(self.concurrency)
+        chunks = [due_jobs[offset:offset + self.chunk_size]
+                  for offset in range(0, len(due_jobs), self.chunk_size)]
+        tasks = [asyncio.ensure_future(self._poll(session, limit, chunk)) for chunk in chunks]
+        _, late = await asyncio.wait(tasks, timeout=self.cycle_deadline)
+        for task in late:
+            task.cancel()
+        if late:
+            await asyncio.gather(*late, return_exceptions=True)
+
+    async def _poll(self, session: aiohttp.ClientSession, limit: asyncio.Semaphore,
+                    chunk: List[Tuple[str, int]]) -> None:
+        attempts = dict(chunk)
+        try:
+            async with limit:
+                async with session.post(self.url, json=[
+                    {'service_name': self.service_name, 'massage_token': job} for job in attempts
+                ]) as response:
+                    response.raise_for_status()
+                    retry_after = response.headers.get('Retry-After')
+                    result = await response.json(content_type=None)
+            retry_after = float(retry_after) if retry_after else None
+            # If status 302 means job competed and returned response to the caller
+            for job in result['jobs']:
+                if job['status'] == 202:
+                    self.scheduler.add(job['message_token'], attempts[job['message_token']] + 1,
+                                       retry_after)
+        except asyncio.CancelledError:  # Cycle deadline passed
+            self._reschedule(chunk)
+            raise
+        except Exception as e:
+            print(e)
+            self._reschedule(chunk)
+
+    def _reschedule(self, chunk: List[Tuple[str, int]]) -> None:
+        """Check jobs of a failed or late request again later."""
+        for job, attempt in chunk:
+            self.scheduler.add(job, attempt + 1)
@@ -1,6 +1,12 @@
+import heapq
+import itertools
+import random
 import threading
+import time
 
-from typing import Callable
+from typing import Callable, List, Tuple
+
+_MAX_EXPONENT = 32
 
 
 def set_interval(interval: int) -> Callable:
@@ -29,3 +35,126 @@ def set_interval(interval: int) -> Callable:
 
     return wrapper
 
+
+class PollScheduler:
+    """
+    Keeps queued jobs in a min-heap ordered by their next poll time.
+
+    A job still pending after a poll is due again after an exponential
+    backoff (`base_delay * 2 ** attempt`, capped at `max_delay`) with
+    jitter, or after the producer's `Retry-After` hint if that is longer.
+    Jitter spreads polls of jobs submitted together over time.
+    """
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0, jitter: float = 0.5):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._heap = []
+        self._sequence = itertools.count()
+        self._changed = threading.Condition()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Jittered delay before poll number `attempt` of a job.
+
+        :param attempt: number of polls done so far
+        :type attempt: int
+        :return: delay in seconds
+        :rtype: float
+        """
+        # Exponent capped, a float overflows past 2 ** 1023
+        delay = min(self.max_delay, self.base_delay * 2 ** min(attempt, _MAX_EXPONENT))
+        return delay * (1 - self.jitter * random.random())
+
+    def add(self, job: str, attempt: int = 0, retry_after: float = None) -> None:
+        """
+        Schedule next poll of a job.
+
+        :param job: `message_token`
+        :type job: str
+        :param attempt: number of polls done so far
+        :type attempt: int
+        :param retry_after: producer's `Retry-After` hint in seconds
+        :type retry_after: float
+        :return:
+        :rtype: None
+        """
+        delay = self.backoff(attempt)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        with self._changed:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence),
+                                        job, attempt))
+            if self._heap[0][2] == job:  # Earliest due job changed, wake up waiters
+                self._changed.notify_all()
+
+    def get_due(self, limit: int = None, timeout: float = None,
+                window: float = 0.0) -> List[Tuple[str, int]]:
+        """
+        Wait until at least one job is due and take up to `limit` due jobs.
+
+        :param limit: maximum jobs to take
+        :type limit: int
+        :param timeout: seconds to wait at most, forever if None
+        :type timeout: float
+        :param window: also take jobs due within `window` seconds, so they
+        are polled in the same batch
+        :type window: float
+        :return: list of (`message_token`, attempt), empty on timeout
+        :rtype: List[Tuple[str, int]]
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while True:
+                now = time.monotonic()
+                if self._heap and self._heap[0][0] <= now:
+                    break
+                wait = self._heap[0][0] - now if self._heap else None
+                if deadline is not None:
+                    if now >= deadline:
+                        return []
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self._changed.wait(wait)
+            due = []
+            while self._heap and self._heap[0][0] <= now + window \
+                    and (limit is None or len(due) < limit):
+                _, _, job, attempt = heapq.heappop(self._heap)
+                due.append((job, attempt))
+            return due
+
+
+def poll_scheduled(scheduler: PollScheduler, batch_size: int = None,
+                   window: float = 0.0) -> Callable:
+    """
+    Runs decorated function with every batch of due jobs of `scheduler`.
+
+    Batches run one after another on a single daemon thread, so a slow
+    batch delays the next one instead of overlapping it, and jobs which
+    became due meanwhile are picked up right after.
+
+    :param scheduler: scheduler holding the jobs
+    :type scheduler: PollScheduler
+    :param batch_size: maximum jobs per call
+    :type batch_size: int
+    :param window: see `PollScheduler.get_due`
+    :type window: float
+    :return:
+    :rtype:
+    """
+
+    def wrapper(func):
+        """Wrapper to scheduled functions"""
+        def wrapped(*args, **kwargs):
+            def worker():
+                while True:
+                    func(scheduler.get_due(batch_size, window=window), *args, **kwargs)
+
+            threading.Thread(target=worker, daemon=True).start()
+
+        return wrapped
+
+    return wrapper
@@ -1,3 +1,5 @@
+import threading
+
 from abc import ABCMeta, abstractmethod
 
 
@@ -37,25 +39,33 @@ class AbstractQueue(metaclass=ABCMeta):
 class QueueManager(AbstractQueue):
     """Queue implementation for job execution as
     "First Come First Serve".
+
+    Elements are kept in a circular buffer: dequeued slots are reused by
+    later enqueues. The buffer doubles when it is full, halves again once
+    it is only a quarter used (never below `capacity`), and refuses to grow
+    past `max_capacity` if one is given. Enqueue and dequeue are thread safe.
     """
 
-    def __init__(self, capacity=20):
+    def __init__(self, capacity=20, max_capacity=None):
         super().__init__()
+        if max_capacity is not None and max_capacity < capacity:
+            raise ValueError('`max_capacity` must not be less than `capacity`')
+        self._capacity = capacity
+        self._max_capacity = max_capacity
         self._queue = [None for _ in range(capacity)]
-        self._front, self._rear = 0, 0
+        self._front = 0
+        self._lock = threading.Lock()
 
     @property
     def queue(self) -> list:
         """Property to get queued elements."""
-        return self._queue
+        with self._lock:
+            return list(self)
 
     def __iter__(self):
-        index = self._front
-        while True:
-            if index == self._rear:
-                return
-            yield self._queue[index]
-            index += 1
+        capacity = len(self._queue)
+        for offset in range(self._size):
+            yield self._queue[(self._front + offset) % capacity]
 
     def enqueue(self, message_token: str) -> None:
         """
@@ -66,11 +76,11 @@ class QueueManager(AbstractQueue):
         :return:
         :rtype:
         """
-        if self.is_full():
-            self._expand()
-        self._queue[self._rear] = message_token
-        self._rear += 1
-        self._size += 1
+        with self._lock:
+            if self.is_full():
+                self._expand()
+            self._queue[(self._front + self._size) % len(self._queue)] = message_token
+            self._size += 1
 
     def dequeue(self) -> str:
         """
@@ -79,13 +89,16 @@ class QueueManager(AbstractQueue):
         :return: 'message_token`
         :rtype: str
         """
-        if self.is_empty():
-            raise IndexError('Queue is empty!')
-        message_token = self._queue[self._front]
-        self._queue[self._front] = None
-        self._front += 1
-        self._size -= 1
-        return message_token
+        with self._lock:
+            if self.is_empty():
+                raise IndexError('Queue is empty!')
+            message_token = self._queue[self._front]
+            self._queue[self._front] = None
+            self._front = (self._front + 1) % len(self._queue)
+            self._size -= 1
+            if self._size <= len(self._queue) // 4 and len(self._queue) > self._capacity:
+                self._shrink()
+            return message_token
 
     def _expand(self) -> None:
         """
@@ -93,7 +106,33 @@ class QueueManager(AbstractQueue):
         :return:
         :rtype:
         """
-        self._queue += [None for _ in range(len(self._queue))]
+        capacity = len(self._queue)
+        if self._max_capacity is not None and capacity >= self._max_capacity:
+            raise OverflowError(f'Queue is full! Maximum capacity is {self._max_capacity}.')
+        capacity *= 2
+        if self._max_capacity is not None:
+            capacity = min(capacity, self._max_capacity)
+        self._resize(capacity)
+
+    def _shrink(self) -> None:
+        """
+        Release unused slots after a burst.
+        :return:
+        :rtype:
+        """
+        self._resize(max(len(self._queue) // 2, self._capacity))
+
+    def _resize(self, capacity: int) -> None:
+        """
+        Move queued elements to a new buffer of `capacity` slots.
+        :param capacity: number of slots
+        :type capacity: int
+        :return:
+        :rtype:
+        """
+        elements = list(self)
+        self._queue = elements + [None for _ in range(capacity - len(elements))]
+        self._front = 0
 
     def is_full(self) -> bool:
         """
@@ -102,4 +141,4 @@ class QueueManager(AbstractQueue):
         :return: True or False
         :rtype: bool
         """
-        return len(self._queue) == self._rear
+        return self._size == len(self._queue)
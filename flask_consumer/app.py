@@ -1,17 +1,45 @@
 import json
-import requests
+import threading
+import time
 
 from flask import Flask, request
 
-from _queue import QueueManager
-from _periodic_caller import set_interval
+from _http_client import SessionPool
+from _async_poller import AsyncPoller
+from _periodic_caller import PollScheduler, poll_scheduled
 
 app = Flask(__name__)
-jobs = QueueManager()
+http = SessionPool()
 
 _SERVICE_NAME = 'greeting'
 _PRODUCER_SERVICE = 'http://127.0.0.1:8000/'
 _CURRENT_SERVICE = 'http://127.0.0.1:8001/'
+_POLL_CHUNK_SIZE = 500  # Jobs checked per `/v1/pool-jobs` request
+_POLL_BASE_DELAY = 1  # Seconds before first poll, doubled for each pending answer
+_POLL_MAX_DELAY = 60  # Upper bound of the backoff between two polls of a job
+_POLL_WINDOW = 0.5  # Jobs due within this many seconds are polled together
+_CLIENT_MODE = 'poll'  # `poll`, `long-poll` or `sse`
+_LONG_POLL_WAIT = 30  # Seconds producer holds a status request open
+_LONG_POLL_WORKERS = 4
+_POLLER = 'sync'  # `sync` (one request at a time) or `async` (concurrent requests)
+_ASYNC_POLL_CONCURRENCY = 20  # `/v1/pool-jobs` requests in flight with `async` poller
+
+jobs = PollScheduler(_POLL_BASE_DELAY, _POLL_MAX_DELAY)
+
+
+def _retry_after(response) -> float:
+    """
+    Producer's `Retry-After` hint in seconds, if any.
+
+    :param response: producer response
+    :type response: requests.Response
+    :return: seconds or None
+    :rtype: float
+    """
+    try:
+        return float(response.headers['Retry-After'])
+    except (KeyError, ValueError):
+        return None
 
 
 @app.route('/call-me', methods=['POST'])
@@ -24,7 +52,7 @@ def call_me():
             'method': 'POST'
         }
     })
-    response = requests.request(
+    response = http.request(
         method='POST',
         url=f'{_PRODUCER_SERVICE}v1/submit-job',
         headers={
@@ -34,9 +62,9 @@ def call_me():
     )
     data, status_code = response.json(), response.status_code
 
-    # Insert job in queue if status_code is 202 (Accepted)
+    # Schedule polling of job if status_code is 202 (Accepted)
     if status_code == 202:
-        jobs.enqueue(data.get('message_token'))
+        jobs.add(data.get('message_token'))
 
     return json.dumps(data), status_code
 
@@ -54,44 +82,119 @@ def response_returned():
     return 'Ok', 200
 
 
-@app.before_first_request
-@set_interval(15)
-def polling():
+@poll_scheduled(jobs, batch_size=_POLL_CHUNK_SIZE, window=_POLL_WINDOW)
+def polling(due_jobs):
     """
-    Function performs like worker pool to check whether job completed or not
-    If job not completed then it will again enqueues that job to queue.
+    Function performs like worker pool to check whether due jobs completed
+    or not. If job not completed then it will be scheduled again with a
+    longer delay.
 
+    :param due_jobs: list of (`message_token`, polls done so far)
+    :type due_jobs: list
     :return:
     :rtype: None
     """
     print("Pooling . . .")
+    attempts = dict(due_jobs)
     try:
-        pending_jobs = []
-        while jobs:
-            job = jobs.dequeue()
-            data = {
-                'service_name': _SERVICE_NAME,
-                'massage_token': job
-            }
-            response = requests.request(
-                method='POST',
-                url=f'{_PRODUCER_SERVICE}v1/pool-job',
-                headers={
-                    'Content-Type': 'application/json'
-                },
-                json=data
+        response = http.request(
+            method='POST',
+            url=f'{_PRODUCER_SERVICE}v1/pool-jobs',
+            headers={
+                'Content-Type': 'application/json'
+            },
+            json=[{'service_name': _SERVICE_NAME, 'massage_token': job} for job in attempts]
+        )
+        response.raise_for_status()
+        retry_after = _retry_after(response)
+        # If status 302 means job competed and returned response to the caller
+        for job in response.json()['jobs']:
+            if job['status'] == 202:
+                jobs.add(job['message_token'], attempts[job['message_token']] + 1, retry_after)
+    except Exception as e:
+        print(e)
+        # Check jobs of failed request again later.
+        for job, attempt in due_jobs:
+            jobs.add(job, attempt + 1)
+
+
+def long_polling():
+    """
+    Worker which waits on the producer until a due job finishes,
+    one job at a time. Jobs still pending are scheduled again.
+
+    :return:
+    :rtype: None
+    """
+    while True:
+        for job, attempt in jobs.get_due(limit=1):
+            try:
+                response = http.request(
+                    method='GET',
+                    url=f'{_PRODUCER_SERVICE}v1/job-status/{_SERVICE_NAME}/{job}',
+                    params={'wait': _LONG_POLL_WAIT},
+                    timeout=_LONG_POLL_WAIT + 5
+                )
+                if response.status_code == 202:  # Producer already waited, ask again soon
+                    jobs.add(job, retry_after=_retry_after(response))
+            except Exception as e:
+                print(e)
+                jobs.add(job, attempt + 1)
+
+
+def listen_events():
+    """
+    Follows the producer's stream of finished jobs and asks the producer to
+    redirect each result as soon as its job finishes.
+
+    :return:
+    :rtype: None
+    """
+    while True:
+        try:
+            response = http.request(
+                method='GET',
+                url=f'{_PRODUCER_SERVICE}v1/job-events/{_SERVICE_NAME}',
+                stream=True,
+                timeout=(5, 60)
             )
-            data, status_code = response.json(), response.status_code
-            # If status 302 means job competed and returned response to the caller
-            if status_code == 202:
-                # Save job which hasn't completed yet.
-                pending_jobs.append(job)
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                event = json.loads(line[len('data:'):])
+                http.request(
+                    method='POST',
+                    url=f'{_PRODUCER_SERVICE}v1/pool-jobs',
+                    headers={
+                        'Content-Type': 'application/json'
+                    },
+                    json=[{'service_name': _SERVICE_NAME, 'massage_token': event['message_token']}]
+                )
+        except Exception as e:
+            print(e)
+            time.sleep(1)
 
-        for job in pending_jobs:
-            jobs.enqueue(job)
 
-    except Exception as e:
-        print(e)
+@app.before_first_request
+def start_client():
+    """
+    Starts checking queued jobs as per `_CLIENT_MODE`. Event streaming keeps
+    the periodic polling as fallback for completions it missed.
+
+    :return:
+    :rtype: None
+    """
+    if _CLIENT_MODE == 'long-poll':
+        for _ in range(_LONG_POLL_WORKERS):
+            threading.Thread(target=long_polling, daemon=True).start()
+        return
+    if _CLIENT_MODE == 'sse':
+        threading.Thread(target=listen_events, daemon=True).start()
+    if _POLLER == 'async':
+        AsyncPoller(jobs, _PRODUCER_SERVICE, _SERVICE_NAME, concurrency=_ASYNC_POLL_CONCURRENCY,
+                    window=_POLL_WINDOW).start()
+    else:
+        polling()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,100 @@
+"""
+Poll cycle time of the sync poller against `AsyncPoller`.
+
+A local stub producer answers `/v1/pool-jobs` after a fixed latency and
+reports every job as completed. One cycle checks all outstanding tokens,
+once as sequential `SessionPool` requests of `_POLL_CHUNK_SIZE` jobs (the
+`sync` poller) and once through `AsyncPoller.cycle`.
+
+Run from `flask_consumer` directory::
+
+    $ python -m benchmarks.bench_async_poller [tokens] [latency_ms] [concurrency]
+"""
+import asyncio
+import json
+import socket
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+
+from _async_poller import AsyncPoller
+from _http_client import SessionPool
+from _periodic_caller import PollScheduler
+
+_POLL_CHUNK_SIZE = 500
+
+
+class StubProducer(BaseHTTPRequestHandler):
+    """Keep-alive producer which completes every polled job."""
+
+    protocol_version = 'HTTP/1.1'
+    latency = 0.02
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately, avoid Nagle/delayed ACK stalls
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        jobs = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        time.sleep(self.latency)
+        body = json.dumps({'jobs': [{'service_name': job['service_name'],
+                                     'message_token': job['massage_token'],
+                                     'status': 302} for job in jobs]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def sync_cycle(client: SessionPool, url: str, due_jobs: list) -> float:
+    started = time.perf_counter()
+    for offset in range(0, len(due_jobs), _POLL_CHUNK_SIZE):
+        chunk = due_jobs[offset:offset + _POLL_CHUNK_SIZE]
+        response = client.request('POST', f'{url}v1/pool-jobs', json=[
+            {'service_name': 'greeting', 'massage_token': job} for job, _ in chunk
+        ])
+        assert len(response.json()['jobs']) == len(chunk)
+    return time.perf_counter() - started
+
+
+async def async_cycle(poller: AsyncPoller, due_jobs: list) -> float:
+    connector = aiohttp.TCPConnector(limit=poller.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        await poller.cycle(session, due_jobs)
+        return time.perf_counter() - started
+
+
+def main(n_tokens: int = 10000, latency_ms: float = 20, concurrency: int = 20) -> None:
+    StubProducer.latency = latency_ms / 1000
+    ThreadingHTTPServer.request_queue_size = 128  # Room for `concurrency` simultaneous connects
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubProducer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/'
+    due_jobs = [(f'token-{number}', 0) for number in range(n_tokens)]
+
+    print(f'{"poller":>8} | {"cycle s":>8} | {"jobs/s":>8} | {"rescheduled":>11}')
+    client = SessionPool()
+    elapsed = sync_cycle(client, url, due_jobs)
+    print(f'{"sync":>8} | {elapsed:>8.3f} | {n_tokens / elapsed:>8.0f} | {0:>11}')
+    client.close()
+
+    scheduler = PollScheduler()
+    poller = AsyncPoller(scheduler, url, 'greeting', concurrency=concurrency)
+    elapsed = asyncio.new_event_loop().run_until_complete(async_cycle(poller, due_jobs))
+    rescheduled = len(scheduler)
+    print(f'{"async":>8} | {elapsed:>8.3f} | {n_tokens / elapsed:>8.0f} | {rescheduled:>11}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*(cast(arg) for cast, arg in zip((int, float, int), sys.argv[1:4])))
@@ -0,0 +1,55 @@
+"""
+Submit throughput of `/v1/submit-jobs` against `/v1/submit-job`.
+
+Submits the same `utils.dummy_data` shaped workload once job by job and
+once in batches through the Flask test client.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_batch_submit [jobs] [batch_size]
+"""
+import sys
+import time
+
+from producer import app
+
+
+def payloads(n_jobs: int) -> list:
+    """Jobs shaped like the ones `utils.dummy_data` produces."""
+    return [{
+        'service_name': f'greeting {round(int(10000 % i))}',
+        'name': f'Dummy Client {i}',
+        'redirect_location': {
+            'url': 'http://127.0.0.1:8001/jobs-result',
+            'method': 'POST'
+        }
+    } for i in range(1, n_jobs + 1)]
+
+
+def single(n_jobs: int) -> float:
+    client = app.test_client()
+    jobs = payloads(n_jobs)
+    started = time.perf_counter()
+    for job in jobs:
+        assert client.post('/v1/submit-job', json=job).status_code == 202
+    return time.perf_counter() - started
+
+
+def batch(n_jobs: int, batch_size: int) -> float:
+    client = app.test_client()
+    jobs = payloads(n_jobs)
+    started = time.perf_counter()
+    for offset in range(0, n_jobs, batch_size):
+        response = client.post('/v1/submit-jobs', json=jobs[offset:offset + batch_size])
+        assert response.status_code == 202
+    return time.perf_counter() - started
+
+
+def main(n_jobs: int = 10000, batch_size: int = 500) -> None:
+    for name, elapsed in (('single', single(n_jobs)),
+                          (f'batch of {batch_size}', batch(n_jobs, batch_size))):
+        print(f'{name:>14} | {n_jobs / elapsed:>10.0f} jobs/s')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,92 @@
+"""
+Cancellation and deadlines under load.
+
+1. Cancelling queued jobs: `QueueManager.remove` (tombstone) against
+   rebuilding the queue without the token, per removal from queues of
+   growing depth.
+2. Hung jobs: a `hang` handler blocks for `hang_s`, mixed with `quick`
+   jobs on 8 job workers. Without deadlines the hung jobs keep the workers
+   and the quick jobs wait behind them; with a deadline the workers give up
+   on hung jobs and move on.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_cancellation [jobs] [hang_s]
+"""
+import sys
+import threading
+import time
+
+from producer.queuing_mgmt.hash import ProcessStatus
+from producer.queuing_mgmt.jobs import Jobs
+from producer.queuing_mgmt.queue import QueueManager
+
+_RELEASE = threading.Event()
+
+
+def hang(payload: dict) -> dict:
+    _RELEASE.wait(payload['hang_s'])
+    return {'result': 'late'}
+
+
+def quick(payload: dict) -> dict:
+    return {'result': 'quick'}
+
+
+def per_removal_us(depth: int, removals: int = 100) -> tuple:
+    tokens = [f'{i:032x}' for i in range(depth)]
+    queue = QueueManager(capacity=depth)
+    for message_token in tokens:
+        queue.enqueue(message_token)
+    started = time.perf_counter()
+    for message_token in tokens[depth // 2:depth // 2 + removals]:
+        queue.remove(message_token)
+    tombstone = (time.perf_counter() - started) / removals * 1e6
+
+    queue = QueueManager(capacity=depth)
+    for message_token in tokens:
+        queue.enqueue(message_token)
+    started = time.perf_counter()
+    for message_token in tokens[depth // 2:depth // 2 + removals]:
+        kept = [token for token in queue.queue if token != message_token]
+        queue = QueueManager(capacity=depth)
+        for token in kept:
+            queue.enqueue(token)
+    rebuild = (time.perf_counter() - started) / removals * 1e6
+    return tombstone, rebuild
+
+
+def run(n_jobs: int, hang_s: float, deadline: float) -> tuple:
+    _RELEASE.clear()
+    queueing = Jobs({'EXECUTOR_MAX_WORKERS': 8, 'HANDLERS': {'functions': {
+        'hang': {'function': 'benchmarks.bench_cancellation.hang', 'execution': 'thread'},
+        'quick': {'function': 'benchmarks.bench_cancellation.quick'}}}})
+    started = time.perf_counter()
+    tokens = []
+    for i in range(n_jobs):
+        if i % 4 == 0:
+            queueing.register('hang', 'bench', {'hang_s': hang_s, 'timeout': deadline})
+        else:
+            tokens.append(queueing.register('quick', 'bench', {'n': i}))
+    while any(queueing.is_completed('bench', message_token)[0] != ProcessStatus.COMPLETE
+              for message_token in tokens):
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    _RELEASE.set()
+    return elapsed, len(tokens) / elapsed
+
+
+def main(n_jobs: int = 200, hang_s: float = 1) -> None:
+    print(f'{"depth":>7} | {"remove us":>9} | {"rebuild us":>10}')
+    for depth in (1000, 10000, 100000):
+        tombstone, rebuild = per_removal_us(depth)
+        print(f'{depth:>7} | {tombstone:>9.2f} | {rebuild:>10.1f}')
+
+    print(f'{"deadline":>8} | {"quick jobs s":>12} | {"quick jobs/s":>12}')
+    for deadline in (None, 0.05):
+        elapsed, rate = run(n_jobs, hang_s, deadline)
+        print(f'{str(deadline):>8} | {elapsed:>12.2f} | {rate:>12.1f}')
+
+
+if __name__ == '__main__':
+    main(*(cast(arg) for cast, arg in zip((int, float), sys.argv[1:3])))
@@ -0,0 +1,94 @@
+"""
+End to end latency from job submission to result delivery.
+
+A stub consumer records when each result arrives. In `poll` mode results
+are only delivered when a poller, standing in for the consumer's
+`set_interval` loop, checks the jobs every `interval` seconds; in `push`
+mode they are delivered as soon as the job completes.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_end_to_end_latency [jobs] [interval]
+"""
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from producer import app
+from producer.queuing_mgmt.jobs import Jobs
+
+
+class StubConsumer(BaseHTTPRequestHandler):
+    """Records arrival time of delivered results."""
+
+    protocol_version = 'HTTP/1.1'
+    arrivals = {}
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.arrivals[json.loads(json.loads(body))['message_token']] = time.monotonic()
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def run(mode: str, n_jobs: int, interval: float, url: str) -> list:
+    config = dict(app.config)
+    config['DELIVERY'] = dict(config.get('DELIVERY', {}), push_on_complete=mode == 'push')
+    jobs = Jobs(config)
+    StubConsumer.arrivals = {}
+
+    submitted = {}
+    stopped = threading.Event()
+    if mode == 'poll':
+        def poller():
+            while not stopped.wait(interval):
+                jobs.pool_many([('greeting', token) for token in list(submitted)
+                                if token not in StubConsumer.arrivals])
+        threading.Thread(target=poller, daemon=True).start()
+
+    for i in range(n_jobs):
+        message_token = jobs.register('greetings', 'greeting', {
+            'name': f'Dummy Client {i}',
+            'redirect_location': {'url': url, 'method': 'POST'}
+        })
+        submitted[message_token] = time.monotonic()
+        time.sleep(interval / n_jobs)  # Spread submissions over one poll interval
+
+    deadline = time.monotonic() + 5 * interval + 10
+    while len(StubConsumer.arrivals) < n_jobs and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stopped.set()
+    return [(StubConsumer.arrivals[token] - at) * 1000
+            for token, at in submitted.items() if token in StubConsumer.arrivals]
+
+
+def main(n_jobs: int = 200, interval: float = 1.0) -> None:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubConsumer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/jobs-result'
+
+    print(f'poll interval {interval}s')
+    print(f'{"mode":>6} | {"delivered":>9} | {"p50 ms":>8} | {"p99 ms":>8}')
+    for mode in ('poll', 'push'):
+        latencies = sorted(run(mode, n_jobs, interval, url))
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f'{mode:>6} | {len(latencies):>9} | {statistics.median(latencies):>8.1f} | '
+              f'{p99:>8.1f}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*(cast(arg) for cast, arg in zip((int, float), sys.argv[1:3])))
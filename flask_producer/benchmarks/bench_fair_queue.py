@@ -0,0 +1,68 @@
+"""
+Latency of small tenants during a burst of a large one, FIFO against
+fair share scheduling.
+
+A large service submits a burst of jobs, then small services submit a
+few jobs each. `utils.greetings` is slowed down by `work_ms`. Latency is
+the time from submit to the end of the job function.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_fair_queue [burst] [small_services] [work_ms]
+"""
+import functools
+import sys
+import threading
+import time
+
+from producer import utils
+from producer.queuing_mgmt.jobs import Jobs
+
+_SMALL_JOBS = 5
+
+
+def percentile(samples: list, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000
+
+
+def run(scheduler: str, burst: int, small_services: int) -> tuple:
+    queueing = Jobs({'QUEUE_SCHEDULER': scheduler, 'EXECUTOR_MAX_WORKERS': 4})
+    submitted, finished = {}, {}
+    run.finished = finished
+    for i in range(burst):
+        submitted[f'big {i}'] = time.monotonic()
+        queueing.register('greetings', 'big', {'name': f'big {i}'})
+    for i in range(_SMALL_JOBS):
+        for service in range(small_services):
+            name = f'small {service} {i}'
+            submitted[name] = time.monotonic()
+            queueing.register('greetings', f'small {service}', {'name': name})
+    while len(finished) < len(submitted):
+        time.sleep(0.01)
+    small = [finished[name] - submitted[name] for name in submitted if name.startswith('small')]
+    big = [finished[name] - submitted[name] for name in submitted if name.startswith('big')]
+    return small, big
+
+
+def main(burst: int = 2000, small_services: int = 10, work_ms: float = 1) -> None:
+    greetings = utils.greetings
+    lock = threading.Lock()
+
+    @functools.wraps(greetings)
+    def timed_greetings(payload):
+        time.sleep(work_ms / 1000)
+        with lock:
+            run.finished[payload['name']] = time.monotonic()
+        return greetings(payload)
+
+    utils.greetings = timed_greetings
+    print(f'{"scheduler":>9} | {"small p50 ms":>12} | {"small p99 ms":>12} | {"big p99 ms":>10}')
+    for scheduler in ('fifo', 'fair'):
+        small, big = run(scheduler, burst, small_services)
+        print(f'{scheduler:>9} | {percentile(small, 0.5):>12.1f} | '
+              f'{percentile(small, 0.99):>12.1f} | {percentile(big, 0.99):>10.1f}')
+
+
+if __name__ == '__main__':
+    main(*(cast(arg) for cast, arg in zip((int, int, float), sys.argv[1:4])))
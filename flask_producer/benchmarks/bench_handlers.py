@@ -0,0 +1,74 @@
+"""
+Request latency while CPU bound jobs run, per handler execution class.
+
+Submits `jobs` CPU bound jobs (`burn`, a pure Python loop of `work_ms`
+on an idle core) to a handler, then measures `/v1/load` latency through
+the Flask test client until they all finished. `inline` jobs run on job
+worker threads and take the GIL from request threads, `process` jobs run
+in worker processes.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_handlers [jobs] [work_ms]
+"""
+import sys
+import time
+
+import producer
+
+from producer.first_app import resources
+from producer.queuing_mgmt.hash import ProcessStatus
+from producer.queuing_mgmt.jobs import Jobs
+
+
+def burn(payload: dict) -> dict:
+    """CPU bound job function."""
+    total = 0
+    for i in range(payload['loops']):
+        total += i * i
+    return {'result': total}
+
+
+def loops_for(work_ms: float) -> int:
+    started = time.perf_counter()
+    burn({'loops': 100000})
+    return int(100000 * work_ms / 1000 / (time.perf_counter() - started))
+
+
+def percentile(samples: list, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000
+
+
+def run(execution: str, n_jobs: int, loops: int) -> tuple:
+    queueing = Jobs({'EXECUTOR_MAX_WORKERS': 4, 'HANDLERS': {'functions': {
+        'burn': {'function': 'benchmarks.bench_handlers.burn', 'execution': execution}}}})
+    resources.queueing = queueing
+    client = producer.app.test_client()
+    queueing.register('burn', 'warm up', {'loops': 1})  # Starts the process pool
+    time.sleep(0.5)
+
+    started = time.perf_counter()
+    tokens = [queueing.register('burn', 'bench', {'loops': loops}) for _ in range(n_jobs)]
+    latencies = []
+    while any(queueing.is_completed('bench', message_token)[0] != ProcessStatus.COMPLETE
+              for message_token in tokens):
+        requested = time.perf_counter()
+        client.get('/v1/load')
+        latencies.append(time.perf_counter() - requested)
+    return time.perf_counter() - started, latencies
+
+
+def main(n_jobs: int = 40, work_ms: float = 50) -> None:
+    loops = loops_for(work_ms)
+    print(f'{"execution":>9} | {"jobs s":>6} | {"requests":>8} | {"p50 ms":>7} | {"p99 ms":>7} | '
+          f'{"max ms":>7}')
+    for execution in ('inline', 'thread', 'process'):
+        elapsed, latencies = run(execution, n_jobs, loops)
+        print(f'{execution:>9} | {elapsed:>6.2f} | {len(latencies):>8} | '
+              f'{percentile(latencies, 0.5):>7.2f} | {percentile(latencies, 0.99):>7.2f} | '
+              f'{max(latencies) * 1000:>7.2f}')
+
+
+if __name__ == '__main__':
+    main(*(cast(arg) for cast, arg in zip((int, float), sys.argv[1:3])))
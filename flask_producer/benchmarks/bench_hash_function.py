@@ -0,0 +1,56 @@
+"""
+Service to bucket mapping of `HashTable` with thousands of services.
+
+Measures `hash_function` lookups for known services, the number of
+buckets allocated for them, and whether buckets of idle services are
+reused when new services show up.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_hash_function [n_services]
+"""
+import sys
+import time
+
+from producer.queuing_mgmt.hash import HashTable
+
+_ROUNDS = 20
+
+
+def service_names(n_services: int) -> list:
+    """Service names shaped like the ones `utils.dummy_data` produces."""
+    names = {f'greeting {round(int(10000 % i))}' for i in range(1, 10001)}
+    names.update(f'greeting {i}' for i in range(10000, 10000 + n_services))
+    return sorted(names)[:n_services]
+
+
+def main(n_services: int = 5000) -> None:
+    names = service_names(n_services)
+    table = HashTable()
+
+    started = time.perf_counter()
+    for name in names:
+        table.set_item(name, {}, message_token=f'token-{name}')
+    insert_us = (time.perf_counter() - started) / len(names) * 1e6
+
+    started = time.perf_counter()
+    for _ in range(_ROUNDS):
+        for name in names:
+            table.hash_function(name)
+    lookup_ns = (time.perf_counter() - started) / (len(names) * _ROUNDS) * 1e9
+
+    buckets_before = len(table.hash_table)
+    for name in names:  # All services go idle ...
+        table.delete_item(name, f'token-{name}')
+    for name in names:  # ... and the same number of new services arrive
+        table.set_item(f'{name} v2', {}, message_token=f'token-{name} v2')
+
+    print(f'distinct services           : {len(names)}')
+    print(f'first insert per service    : {insert_us:.3f} us')
+    print(f'hash_function lookup        : {lookup_ns:.1f} ns')
+    print(f'buckets after first wave    : {buckets_before}')
+    print(f'buckets after idle + reuse  : {len(table.hash_table)}')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,76 @@
+"""
+Result delivery over `SessionPool` against a new connection per request.
+
+A local stub consumer (HTTP/1.1, keep-alive) counts the TCP connections it
+accepts while `return_job_result` delivers the same results once through
+plain `requests` and once through the pooled client.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_http_client [results] [threads]
+"""
+import json
+import socket
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from producer.queuing_mgmt._http_client import SessionPool
+from producer.queuing_mgmt._utils import return_job_result
+
+
+class StubConsumer(BaseHTTPRequestHandler):
+    """Keep-alive consumer which counts accepted connections."""
+
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately, avoid Nagle/delayed ACK stalls
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.lock:
+            StubConsumer.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'Ok')
+
+    def log_message(self, *args):
+        pass
+
+
+def deliver(url: str, n_results: int, threads: int, client=None) -> float:
+    result = json.dumps({'message_token': 'x' * 32, 'result': {'result': 'Hello...!'}})
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for response in pool.map(lambda _: return_job_result('POST', url, result, client=client),
+                                 range(n_results)):
+            assert response.status_code == 200
+    return time.perf_counter() - started
+
+
+def main(n_results: int = 2000, threads: int = 8) -> None:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubConsumer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/jobs-result'
+
+    print(f'{"client":>12} | {"results/s":>10} | {"connections":>11}')
+    client = SessionPool(max_per_host=threads)
+    for name, pooled in (('requests', None), ('SessionPool', client)):
+        StubConsumer.connections = 0
+        elapsed = deliver(url, n_results, threads, pooled)
+        print(f'{name:>12} | {n_results / elapsed:>10.0f} | {StubConsumer.connections:>11}')
+    client.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
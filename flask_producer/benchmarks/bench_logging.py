@@ -0,0 +1,98 @@
+"""
+Latency of `/v1/pool-job` with logging off, synchronous and queued.
+
+Every poll logs one INFO record. In `sync` mode it is written to stdout
+and the rotating log files by the request thread, in `async` mode it is
+queued and written in batches by the listener thread. Polled jobs are
+kept pending so requests take the 202 path. Console output goes to
+/dev/null and log files to a temporary directory.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_logging [requests] [threads]
+"""
+import contextlib
+import functools
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import producer
+
+from producer import app, utils
+from producer.custom_logger.logger import CustomLogger
+from producer.first_app import resources
+
+_MODES = (
+    ('off', None),
+    ('sync', {'mode': 'sync'}),
+    ('async', {'mode': 'async'}),
+    ('async + rate limit', {'mode': 'async', 'rate_limit': {producer.app.name: 100}})
+)
+
+
+def percentile(samples: list, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1e6
+
+
+def poll(n_requests: int, n_threads: int, message_token: str) -> list:
+    """Latency of every request in seconds."""
+    latencies = []
+    payload = {'service_name': 'bench', 'massage_token': message_token}
+
+    def client():
+        with app.test_client() as test_client:
+            for _ in range(n_requests // n_threads):
+                started = time.perf_counter()
+                test_client.post('/v1/pool-job', json=payload)
+                latencies.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=client) for _ in range(n_threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies
+
+
+def main(n_requests: int = 20000, n_threads: int = 4) -> None:
+    release = threading.Event()
+    greetings = utils.greetings
+
+    @functools.wraps(greetings)
+    def blocked_greetings(payload):
+        release.wait()
+        return greetings(payload)
+
+    utils.greetings = blocked_greetings
+    message_token = producer.queueing.register(utils.greetings.__name__, 'bench', {'name': 'bench'})
+    log_dir = tempfile.mkdtemp()
+    print(f'{"logging":>18} | {"threads":>7} | {"mean us":>8} | {"p50 us":>8} | {"p99 us":>8}')
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for name, options in _MODES:
+                custom_logger = CustomLogger(log_dir=log_dir, options=options)
+                logging.disable(logging.CRITICAL if options is None else logging.NOTSET)
+                producer.logger = resources.logger = custom_logger
+                for threads in (1, n_threads):
+                    poll(n_requests // 10, threads, message_token)  # Warm up
+                    latencies = poll(n_requests, threads, message_token)
+                    sys.__stdout__.write(
+                        f'{name:>18} | {threads:>7} | '
+                        f'{sum(latencies) / len(latencies) * 1e6:>8.0f} | '
+                        f'{percentile(latencies, 0.5):>8.0f} | '
+                        f'{percentile(latencies, 0.99):>8.0f}\n')
+                custom_logger.close()
+    finally:
+        logging.disable(logging.NOTSET)
+        release.set()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
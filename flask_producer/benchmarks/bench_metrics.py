@@ -0,0 +1,81 @@
+"""
+Overhead of the metrics instrumentation.
+
+Measures the cost of a single `Counter.inc` / `Histogram.observe` call
+from one and from many threads, next to an uninstrumented dict update and
+a lock protected counter, then the throughput of `Jobs.register` plus job
+execution with the instrumentation switched on and off.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_metrics [operations] [threads]
+"""
+import sys
+import threading
+import time
+
+from producer.queuing_mgmt import metrics
+from producer.queuing_mgmt.hash import ProcessStatus
+from producer.queuing_mgmt.jobs import Jobs
+
+
+def per_call_ns(fn, operations: int, threads: int) -> float:
+    def work():
+        for _ in range(operations):
+            fn()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - started) / (operations * threads) * 1e9
+
+
+def jobs_per_second(n_jobs: int) -> float:
+    queueing = Jobs()
+    started = time.perf_counter()
+    tokens = [queueing.register('greetings', 'bench', {'name': str(i)}) for i in range(n_jobs)]
+    for message_token in tokens:
+        while queueing.is_completed('bench', message_token)[0] != ProcessStatus.COMPLETE:
+            time.sleep(0.001)
+    return n_jobs / (time.perf_counter() - started)
+
+
+def main(operations: int = 200000, threads: int = 8) -> None:
+    counter = metrics.Counter('bench_total', 'Benchmark counter.', ('code',))
+    histogram = metrics.Histogram('bench_seconds', 'Benchmark histogram.', ('func',))
+    plain = {}
+    lock = threading.Lock()
+
+    def plain_inc():
+        plain['302'] = plain.get('302', 0) + 1
+
+    def locked_inc():
+        with lock:
+            plain['302'] = plain.get('302', 0) + 1
+
+    print(f'{"operation":>20} | {"1 thread ns":>11} | {f"{threads} threads ns":>12}')
+    for name, fn in (('dict (no metrics)', plain_inc),
+                     ('locked counter', locked_inc),
+                     ('Counter.inc', lambda: counter.inc('302')),
+                     ('Histogram.observe', lambda: histogram.observe(0.003, 'greetings'))):
+        single = per_call_ns(fn, operations, 1)
+        many = per_call_ns(fn, operations // threads, threads)
+        print(f'{name:>20} | {single:>11.0f} | {many:>12.0f}')
+
+    inc, observe = metrics.Counter.inc, metrics.Histogram.observe
+    instrumented, bare = 0, 0
+    for _ in range(3):  # Best of alternating runs, background threads make single runs noisy
+        metrics.Counter.inc, metrics.Histogram.observe = inc, observe
+        instrumented = max(instrumented, jobs_per_second(10000))
+        metrics.Counter.inc = lambda *args, **kwargs: None
+        metrics.Histogram.observe = lambda *args, **kwargs: None
+        bare = max(bare, jobs_per_second(10000))
+    print(f'register + run jobs/s: instrumented {instrumented:.0f}, without metrics {bare:.0f} '
+          f'({(bare - instrumented) / bare * 100:+.1f}% overhead)')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
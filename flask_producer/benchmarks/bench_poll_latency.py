@@ -0,0 +1,53 @@
+"""
+Poll latency of `HashTableStorage` as the number of queued jobs grows.
+
+Every `/v1/pool-job` call ends up in `HashTableStorage.status`, so its
+latency should stay flat whether 100 or 1M jobs are queued.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_poll_latency [max_jobs]
+"""
+import random
+import sys
+import time
+
+from producer.queuing_mgmt.hash import HashTableStorage
+
+_SERVICES = 10
+_LOOKUPS = 100000
+
+
+def fill(storage: HashTableStorage, n_jobs: int) -> list:
+    """Insert `n_jobs` jobs spread over `_SERVICES` services."""
+    tokens = []
+    for i in range(n_jobs):
+        service_name = f'greeting {i % _SERVICES}'
+        message_token = f'{i:032x}'
+        storage.set_item(service_name, {'name': f'Dummy Client {i}'},
+                         message_token=message_token)
+        tokens.append((service_name, message_token))
+    return tokens
+
+
+def bench(n_jobs: int) -> float:
+    """Average `status` latency in micro seconds."""
+    storage = HashTableStorage()
+    tokens = fill(storage, n_jobs)
+    sample = [random.choice(tokens) for _ in range(_LOOKUPS)]
+    started = time.perf_counter()
+    for service_name, message_token in sample:
+        storage.status(service_name, message_token)
+    return (time.perf_counter() - started) / _LOOKUPS * 1e6
+
+
+def main(max_jobs: int = 1000000) -> None:
+    print(f'{"queued jobs":>12} | {"poll latency (us)":>18}')
+    n_jobs = 100
+    while n_jobs <= max_jobs:
+        print(f'{n_jobs:>12} | {bench(n_jobs):>18.3f}')
+        n_jobs *= 10
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
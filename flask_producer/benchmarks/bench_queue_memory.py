@@ -0,0 +1,85 @@
+"""
+Steady state memory of `QueueManager` after 1M enqueue/dequeue cycles.
+
+Compares the circular buffer with the previous list based queue, which
+only advanced its front index on dequeue, so its backing list grew with
+the total number of jobs ever queued. Each implementation runs in a fresh
+interpreter and reports its resident set size once the queue is drained
+back to the in-flight window.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_queue_memory [cycles]
+"""
+import gc
+import resource
+import subprocess
+import sys
+
+from producer.queuing_mgmt.queue import QueueManager
+
+_IN_FLIGHT = 100
+_BURST = 100000
+
+
+class LegacyQueueManager(QueueManager):
+    """Previous append-only queue, kept here for comparison."""
+
+    def __init__(self, capacity=20):
+        super().__init__(capacity)
+        self._rear = 0
+
+    def enqueue(self, message_token: str) -> None:
+        if self._rear == len(self._queue):
+            self._queue += [None for _ in range(len(self._queue))]
+        self._queue[self._rear] = message_token
+        self._rear += 1
+        self._size += 1
+
+    def dequeue(self) -> str:
+        if self.is_empty():
+            raise IndexError('Queue is empty!')
+        message_token = self._queue[self._front]
+        self._queue[self._front] = None
+        self._front += 1
+        self._size -= 1
+        return message_token
+
+
+def rss_mb() -> float:
+    """Current resident set size, peak size if /proc is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(implementation: str, cycles: int) -> None:
+    queue = LegacyQueueManager() if implementation == 'legacy' else QueueManager()
+    baseline = rss_mb()
+    for i in range(_IN_FLIGHT):
+        queue.enqueue(f'{i:032x}')
+    for i in range(_BURST):  # Burst of submissions ...
+        queue.enqueue(f'{i:032x}')
+    for _ in range(_BURST):  # ... drained by the workers
+        queue.dequeue()
+    for i in range(cycles):
+        queue.enqueue(f'{i:032x}')
+        queue.dequeue()
+    gc.collect()
+    print(f'{implementation:>8} | {len(queue._queue):>12} | {rss_mb() - baseline:>14.2f}')
+
+
+def main(cycles: int = 1000000) -> None:
+    print(f'{"queue":>8} | {"buffer slots":>12} | {"RSS growth MB":>14}')
+    for implementation in ('legacy', 'ring'):
+        subprocess.run([sys.executable, '-m', __spec__.name, implementation, str(cycles)],
+                       check=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        run(sys.argv[1], int(sys.argv[2]))
+    else:
+        main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,67 @@
+"""
+Job throughput with and without the result cache.
+
+Replays the `utils.dummy_data` workload where every client submits the
+same job `repeat` times, as repeated Postman runs do. `utils.greetings`
+is slowed down by `work_ms` to stand in for a real job. Throughput counts
+jobs registered and finished per second.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_result_cache [clients] [repeat] [work_ms]
+"""
+import functools
+import random
+import sys
+import time
+
+from producer import utils
+from producer.queuing_mgmt.hash import ProcessStatus
+from producer.queuing_mgmt.jobs import Jobs
+
+
+def workload(n_clients: int, repeat: int) -> list:
+    """Jobs shaped like the ones `utils.dummy_data` produces, each `repeat` times."""
+    jobs = [{
+        'service_name': f'greeting {round(int(10000 % i))}',
+        'name': f'Dummy Client {i}',
+        'redirect_location': {
+            'url': 'http://127.0.0.1:8001/jobs-result',
+            'method': 'POST'
+        }
+    } for i in range(1, n_clients + 1) for _ in range(repeat)]
+    random.Random(0).shuffle(jobs)
+    return jobs
+
+
+def run(enabled: bool, jobs: list) -> tuple:
+    queueing = Jobs({'RESULT_CACHE': {'enabled': enabled}, 'EXECUTOR_MAX_WORKERS': 8})
+    started = time.perf_counter()
+    tokens = [(job['service_name'],
+               queueing.register(utils.greetings.__name__, job['service_name'], dict(job)))
+              for job in jobs]
+    for service_name, message_token in tokens:
+        while queueing.is_completed(service_name, message_token)[0] != ProcessStatus.COMPLETE:
+            time.sleep(0.001)
+    return time.perf_counter() - started, queueing.cache_stats()
+
+
+def main(n_clients: int = 1000, repeat: int = 5, work_ms: float = 2) -> None:
+    greetings = utils.greetings
+
+    @functools.wraps(greetings)
+    def slow_greetings(payload):
+        time.sleep(work_ms / 1000)
+        return greetings(payload)
+
+    utils.greetings = slow_greetings
+    jobs = workload(n_clients, repeat)
+    print(f'{"cache":>5} | {"jobs/s":>8} | {"hits":>6} | {"attached":>8} | {"misses":>6}')
+    for enabled in (False, True):
+        elapsed, stats = run(enabled, jobs)
+        print(f'{"on" if enabled else "off":>5} | {len(jobs) / elapsed:>8.0f} | '
+              f'{stats["hits"]:>6} | {stats["attached"]:>8} | {stats["misses"]:>6}')
+
+
+if __name__ == '__main__':
+    main(*(cast(arg) for cast, arg in zip((int, int, float), sys.argv[1:4])))
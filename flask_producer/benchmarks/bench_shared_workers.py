@@ -0,0 +1,136 @@
+"""
+Throughput of producer processes sharing one `shared` storage.
+
+Starts 1, 2, 4 ... producer processes on the same SQLite database. Every
+job is submitted to one process and polled through another one until its
+result is redirected to a local stub consumer, so a job is only finished
+if the processes really share queue and jobs.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_shared_workers [jobs] [max_workers] [client_threads]
+"""
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+class StubConsumer(BaseHTTPRequestHandler):
+    """Consumer accepting every job result."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'Ok')
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int, path: str) -> None:
+    """Producer process on `port` using shared storage at `path`."""
+    from werkzeug.serving import make_server
+    from producer import app
+    from producer.first_app import resources
+    from producer.queuing_mgmt.jobs import Jobs
+    app.config.update(STORAGE_BACKEND='shared', STORAGE_OPTIONS={'path': path})
+    resources.queueing = Jobs(app.config)
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port: int) -> None:
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Producer on port {port} did not start')
+
+
+def run_job(ports: list, number: int, result_url: str) -> int:
+    """Submit to one producer, poll another until done. Returns requests made."""
+    session = getattr(run_job.local, 'session', None)
+    if session is None:
+        session = run_job.local.session = requests.Session()
+    submit_to = f'http://127.0.0.1:{ports[number % len(ports)]}/v1/'
+    poll_at = f'http://127.0.0.1:{ports[(number + 1) % len(ports)]}/v1/'
+    token = session.post(f'{submit_to}submit-job', json={
+        'service_name': 'greeting',
+        'name': f'Dummy Client {number}',
+        'redirect_location': {'url': result_url, 'method': 'POST'}
+    }).json()['message_token']
+    made = 1
+    while True:
+        made += 1
+        status = session.post(f'{poll_at}pool-job', json={
+            'service_name': 'greeting', 'massage_token': token}).status_code
+        if status == 302:
+            return made
+        if status != 202:
+            raise RuntimeError(f'Job {token} answered {status}')
+        time.sleep(0.01)
+
+
+run_job.local = threading.local()
+
+
+def main(n_jobs: int = 500, max_workers: int = 4, client_threads: int = 16) -> None:
+    consumer = ThreadingHTTPServer(('127.0.0.1', 0), StubConsumer)
+    threading.Thread(target=consumer.serve_forever, daemon=True).start()
+    result_url = f'http://127.0.0.1:{consumer.server_port}/jobs-result'
+    context = multiprocessing.get_context('spawn')
+
+    print(f'cpus: {os.cpu_count()}')
+    print(f'{"workers":>7} | {"jobs/s":>8} | {"requests/s":>10}')
+    workers = 1
+    while workers <= max_workers:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'shared.db')
+            ports = [free_port() for _ in range(workers)]
+            processes = [context.Process(target=serve, args=(port, path), daemon=True)
+                         for port in ports]
+            for process in processes:
+                process.start()
+            for port in ports:
+                wait_until_up(port)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=client_threads) as pool:
+                made = sum(pool.map(lambda number: run_job(ports, number, result_url),
+                                    range(n_jobs)))
+            elapsed = time.perf_counter() - started
+            print(f'{workers:>7} | {n_jobs / elapsed:>8.0f} | {made / elapsed:>10.0f}')
+
+            for process in processes:
+                process.terminate()
+                process.join()
+        workers *= 2
+    consumer.shutdown()
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
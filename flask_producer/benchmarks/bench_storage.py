@@ -0,0 +1,66 @@
+"""
+Submit throughput and replay time of the job storage backends.
+
+Submitter threads store jobs the way `Jobs.register` does (`set_item`
+followed by `flush`) against the in-memory storage and the SQLite
+journal with different durability settings. For SQLite the time to
+replay the journal into a fresh storage is reported as well.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_storage [jobs] [threads]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from producer.queuing_mgmt._utils import generate_token
+from producer.queuing_mgmt.storage import get_storage
+
+BACKENDS = (
+    ('memory', 'memory', {}),
+    ('sqlite NORMAL', 'sqlite', {'synchronous': 'NORMAL'}),
+    ('sqlite FULL', 'sqlite', {'synchronous': 'FULL'}),
+    ('sqlite no wait', 'sqlite', {'synchronous': 'NORMAL', 'wait_for_commit': False}),
+)
+
+
+def submit(storage, n_jobs: int, threads: int) -> float:
+    def register(i):
+        storage.set_item(f'greeting {i % 100}', {
+            'func': 'greetings',
+            'name': f'Dummy Client {i}',
+            'redirect_location': {'url': 'http://127.0.0.1:8001/jobs-result', 'method': 'POST'}
+        }, message_token=generate_token())
+        storage.flush()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(register, range(n_jobs)))
+    return time.perf_counter() - started
+
+
+def main(n_jobs: int = 20000, threads: int = 16) -> None:
+    print(f'{"backend":>15} | {"submits/s":>10} | {"replay s":>8} | {"recovered":>9}')
+    with tempfile.TemporaryDirectory() as directory:
+        for number, (name, backend, options) in enumerate(BACKENDS):
+            if backend == 'sqlite':
+                options = dict(options, path=os.path.join(directory, f'jobs-{number}.db'))
+            storage = get_storage(backend, **options)
+            elapsed = submit(storage, n_jobs, threads)
+            replay, recovered = '-', '-'
+            if backend == 'sqlite':
+                storage.close()
+                started = time.perf_counter()
+                restored = get_storage(backend, **options)
+                replay = f'{time.perf_counter() - started:.3f}'
+                recovered = len(restored.recovered())
+                restored.close()
+            print(f'{name:>15} | {n_jobs / elapsed:>10.0f} | {replay:>8} | {recovered:>9}')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,101 @@
+"""
+Cost per record of structured logging.
+
+1. A disabled level: the old eager f-string against lazy arguments and
+   fields.
+2. Formatting one record: the text formatter the handlers used before,
+   `FieldsFormatter`, `JsonFormatter` and a naive `json.dumps`.
+3. `log_info` inside a `job_context` through the configured handlers
+   (stdout redirected to /dev/null, files in a temporary directory) with
+   text and JSON records.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.bench_structured_logging [records]
+"""
+import contextlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from producer import app
+from producer.custom_logger.context import job_context
+from producer.custom_logger.formatters import FieldsFormatter, JsonFormatter
+from producer.custom_logger.logger import CustomLogger
+
+_FORMAT = '%(asctime)s | %(levelname)-8s | [%(process)d - %(thread)s] | %(name)-35s | ' \
+          '%(funcName)-20s | %(lineno)4d: %(message)s'
+_TOKEN = '542decf04d5d327b274f7720e555aa3d'
+
+
+def per_record_ns(fn, n_records: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n_records):
+        fn()
+    return (time.perf_counter() - started) / n_records * 1e9
+
+
+def naive_json(record: logging.LogRecord) -> str:
+    return json.dumps({'ts': record.created, 'level': record.levelname, 'logger': record.name,
+                       'msg': record.getMessage(), 'func': record.funcName,
+                       'line': record.lineno, **record.fields}, default=str)
+
+
+def main(n_records: int = 100000) -> None:
+    log_dir = tempfile.mkdtemp()
+    data = {'service_name': 'greeting 1', 'massage_token': _TOKEN}
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            custom_logger = CustomLogger(log_dir=log_dir, options={'mode': 'sync'})
+            custom_logger.logger.setLevel(logging.WARNING)
+            disabled = (
+                ('eager f-string', lambda: custom_logger.log_info(
+                    msg=f'Processing - {data.get("massage_token")}.')),
+                ('lazy with fields', lambda: custom_logger.log_info(
+                    'Processing job.', service_name=data.get('service_name'),
+                    message_token=data.get('massage_token')))
+            )
+            disabled = [(name, per_record_ns(fn, n_records)) for name, fn in disabled]
+            custom_logger.logger.setLevel(logging.NOTSET)
+
+            record = logging.LogRecord(app.name, logging.INFO, __file__, 1, 'Processing job.',
+                                       None, None, 'post')
+            record.fields = {'service_name': 'greeting 1', 'message_token': _TOKEN,
+                             'elapsed_ms': 0.042}
+            formatters = (
+                ('logging.Formatter', logging.Formatter(_FORMAT)),
+                ('FieldsFormatter', FieldsFormatter(_FORMAT)),
+                ('JsonFormatter', JsonFormatter())
+            )
+            formatting = [(name, per_record_ns(lambda: formatter.format(record), n_records))
+                          for name, formatter in formatters]
+            formatting.append(('naive json.dumps', per_record_ns(lambda: naive_json(record),
+                                                                 n_records)))
+
+            handled = []
+            for log_format in ('text', 'json'):
+                custom_logger.close()
+                custom_logger = CustomLogger(log_dir=log_dir, options={'format': log_format})
+                with job_context(service_name='greeting 1', message_token=_TOKEN):
+                    handled.append((log_format, per_record_ns(
+                        lambda: custom_logger.log_info('Processing job.'), n_records // 10)))
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    print('disabled level (INFO below WARNING)')
+    for name, ns in disabled:
+        print(f'  {name:>20} | {ns:>8.0f} ns')
+    print('formatting one record')
+    for name, ns in formatting:
+        print(f'  {name:>20} | {ns:>8.0f} ns')
+    print('log_info through the configured handlers')
+    for name, ns in handled:
+        print(f'  {name:>20} | {ns:>8.0f} ns')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,110 @@
+"""
+Stress test for the job registry under concurrent submit and poll.
+
+Many threads hammer `/v1/submit-job` and `/v1/pool-job` through the Flask
+test client, while a stub consumer records every delivered result. The run
+fails unless every `message_token` is delivered exactly once, carrying the
+result computed from its own payload.
+
+Run from `flask_producer` directory::
+
+    $ python -m benchmarks.stress_registry [threads] [jobs_per_thread]
+"""
+import json
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from producer import app
+
+_SERVICES = 7
+_POLL_DEADLINE = 60
+
+
+class StubConsumer(BaseHTTPRequestHandler):
+    """Records results delivered to `/jobs-result`."""
+
+    delivered = {}
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        job = json.loads(json.loads(body))  # Result is sent as a JSON string
+        with self.lock:
+            self.delivered.setdefault(job['message_token'], []).append(job)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def client(worker: int, jobs_per_thread: int, url: str) -> dict:
+    """Submit jobs, then poll them until all are redirected."""
+    test_client = app.test_client()
+    submitted = {}
+    for i in range(jobs_per_thread):
+        name = f'client {worker}-{i}'
+        service_name = f'greeting {(worker + i) % _SERVICES}'
+        response = test_client.post('/v1/submit-job', json={
+            'service_name': service_name,
+            'name': name,
+            'redirect_location': {'url': url, 'method': 'POST'}
+        })
+        assert response.status_code == 202, response.data
+        submitted[response.get_json()['message_token']] = (service_name, name)
+
+    pending = dict(submitted)
+    deadline = time.monotonic() + _POLL_DEADLINE
+    while pending and time.monotonic() < deadline:
+        for message_token, (service_name, _) in list(pending.items()):
+            response = test_client.post('/v1/pool-job', json={
+                'service_name': service_name,
+                'massage_token': message_token
+            })
+            if response.status_code == 302:
+                del pending[message_token]
+    return submitted
+
+
+def main(threads: int = 32, jobs_per_thread: int = 200) -> None:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubConsumer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/jobs-result'
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda w: client(w, jobs_per_thread, url), range(threads)))
+    deadline = time.monotonic() + _POLL_DEADLINE
+    while len(StubConsumer.delivered) < threads * jobs_per_thread \
+            and time.monotonic() < deadline:  # Results are delivered in background
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    submitted = {token: job for result in results for token, job in result.items()}
+    errors = []
+    for message_token, (service_name, name) in submitted.items():
+        deliveries = StubConsumer.delivered.get(message_token, [])
+        if len(deliveries) != 1:
+            errors.append(f'{message_token}: delivered {len(deliveries)} times')
+            continue
+        job = deliveries[0]
+        if job['name'] != name or job['service_name'] != service_name \
+                or job['result'] != {'result': f'Hello {name}...!'}:
+            errors.append(f'{message_token}: wrong result {job.get("result")}')
+
+    print(f'threads: {threads}, jobs: {len(submitted)}, elapsed: {elapsed:.2f}s, '
+          f'errors: {len(errors)}')
+    for error in errors[:20]:
+        print(error)
+    if errors or len(submitted) != threads * jobs_per_thread:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -22,6 +22,54 @@ SERVICE_HOST = site_config.get('microservice', {}).get('host', '0.0.0.0')
 SERVICE_PORT = site_config.get('microservice', {}).get('port', 3001)
 THREADED = site_config.get('microservice', {}).get('threaded', False)
 
+# Job executor: `thread`, `process` (CPU bound `utils` functions) or `asyncio`
+EXECUTOR_MODE = site_config.get('executor', {}).get('mode', 'thread')
+EXECUTOR_MAX_WORKERS = site_config.get('executor', {}).get('max_workers', 8)
+
+# Job functions submissions pick by `handler` name, each `inline`, `thread`, `process` or
+# `coroutine` with optional timeout and concurrency limit
+HANDLERS = site_config.get('handlers', {})
+
+# Seconds from submission a job may take before it times out, per service or by default
+DEADLINES = site_config.get('deadlines', {})
+
+# Pending jobs queue: initial slots and optional upper bound
+QUEUE_CAPACITY = site_config.get('queue', {}).get('capacity', 20)
+QUEUE_MAX_CAPACITY = site_config.get('queue', {}).get('max_capacity')
+# `fifo` or `fair` (round robin across services, jobs per turn as per `weights`)
+QUEUE_SCHEDULER = site_config.get('queue', {}).get('scheduler', 'fifo')
+QUEUE_WEIGHTS = site_config.get('queue', {}).get('weights') or {}
+
+# Job storage: `memory`, `sqlite` (journaled, replayed on start) or `shared` (queue and
+# jobs in one database for several producer processes) and its options
+STORAGE_BACKEND = site_config.get('storage', {}).get('backend', 'memory')
+STORAGE_OPTIONS = site_config.get('storage', {}).get(STORAGE_BACKEND) or {}
+
+# Keep-alive client used to return job results to consumers
+HTTP_CLIENT = site_config.get('http_client', {})
+
+# Workers pushing completed job results to consumers
+DELIVERY = site_config.get('delivery', {})
+
+# Finished jobs: seconds kept for delivery and memory budget of their results
+EXPIRY = site_config.get('expiry', {})
+
+# Opt-in memoization of job results, identical running jobs are deduplicated
+RESULT_CACHE = site_config.get('result_cache', {})
+
+# Finished jobs kept for export of their lifecycle as trace spans
+TRACING = site_config.get('tracing', {})
+
+# Limits on accepted jobs, refused with 429/503 beyond them, None means unlimited
+ADMISSION = site_config.get('admission', {})
+
+# Logging: `sync` or `async` (queued, written in batches by a listener thread), `text` or
+# `json` records, per logger sampling and rate limiting of DEBUG/INFO records
+LOGGING = site_config.get('logging', {})
+
+# Seconds clients are asked to wait before polling a pending job again
+RETRY_AFTER = site_config.get('polling', {}).get('retry_after', 1)
+
 ALLOWED_HOSTS = site_config.get('hosts', {}).get('ALLOWED_HOSTS', [])
 
 # Application definition
@@ -13,7 +13,7 @@ api = Api(app)
 from producer.queuing_mgmt.jobs import Jobs
 from producer.custom_logger.logger import CustomLogger
 
-queueing = Jobs()
+queueing = Jobs(app.config)
 
 logger = CustomLogger()
 
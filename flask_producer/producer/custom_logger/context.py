@@ -0,0 +1,41 @@
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_job_context = ContextVar('job_context', default=None)
+
+
+@contextmanager
+def job_context(**fields):
+    """
+    Attach `fields` (e.g. `service_name`, `message_token`) to every record
+    `CustomLogger` logs inside the block, along with `elapsed_ms` since the
+    block was entered. Blocks nest, inner fields win.
+
+    :param fields: fields of the records
+    :type fields: dict
+    :return:
+    :rtype: None
+    """
+    outer = _job_context.get()
+    token = _job_context.set((dict(outer[0], **fields) if outer else fields,
+                              time.perf_counter()))
+    try:
+        yield
+    finally:
+        _job_context.reset(token)
+
+
+def context_fields() -> dict:
+    """
+    Fields of the innermost `job_context` of the caller.
+
+    :return: fields and `elapsed_ms`, empty outside of a `job_context`
+    :rtype: dict
+    """
+    context = _job_context.get()
+    if context is None:
+        return {}
+    fields, started = context
+    return dict(fields, elapsed_ms=round((time.perf_counter() - started) * 1000, 3))
@@ -0,0 +1,46 @@
+import json
+import logging
+
+# One encoder for every record, `json.dumps` with options builds a new one per call
+_ENCODER = json.JSONEncoder(separators=(',', ':'), check_circular=False, default=str)
+
+
+class FieldsFormatter(logging.Formatter):
+    """Text formatter which appends structured fields as `key=value` pairs."""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            message += ' | ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line for log ingestion.
+
+    Every record carries `ts` (epoch seconds), `level`, `logger`, `msg`,
+    `func`, `line`, `process` and `thread`, followed by its structured
+    fields and `exc` when a traceback was logged.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'func': record.funcName,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.thread
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            for key, value in fields.items():
+                entry.setdefault(key, value)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return _ENCODER.encode(entry)
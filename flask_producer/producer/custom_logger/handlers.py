@@ -0,0 +1,155 @@
+import copy
+import itertools
+import logging
+import queue
+import threading
+import time
+
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+class _DeferredFlush:
+    """Handler mixin which leaves flushing to `BatchingQueueListener`, so a
+    batch of records reaches the file in one write instead of one each."""
+
+    _emitting = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._emitting = True
+        try:
+            super().emit(record)
+        finally:
+            self._emitting = False
+
+    def flush(self) -> None:
+        if not self._emitting:
+            super().flush()
+
+
+class BatchedStreamHandler(_DeferredFlush, logging.StreamHandler):
+    """`StreamHandler` flushed once per batch."""
+
+
+class BatchedRotatingFileHandler(_DeferredFlush, RotatingFileHandler):
+    """`RotatingFileHandler` flushed once per batch."""
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hands records to a bounded queue without blocking the caller.
+
+    Records below WARNING are dropped while the queue is full, warnings and
+    errors wait for a free slot.
+    """
+
+    def __init__(self, records: queue.Queue):
+        super().__init__(records)
+        self.dropped = 0
+        self._exceptions = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Merge arguments into the message and render the traceback while the
+        caller's objects are still current. Unlike `QueueHandler.prepare`
+        the traceback stays apart from the message for structured formatters.
+        """
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exceptions.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingQueueListener(QueueListener):
+    """Writes queued records on its own thread and flushes the handlers
+    after `batch_size` records or once the queue is drained."""
+
+    def __init__(self, records: queue.Queue, *handlers, batch_size=100):
+        super().__init__(records, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self._pending = 0
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        self._pending += 1
+        if self._pending >= self.batch_size or self.queue.empty():
+            self.flush()
+
+    def flush(self) -> None:
+        """Flush every handler."""
+        self._pending = 0
+        for handler in self.handlers:
+            handler.flush()
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)  # Wait for a slot, the queue may be full
+
+    def stop(self) -> None:
+        """Write records still queued and stop the thread."""
+        if self._thread is not None:
+            super().stop()
+            self.flush()
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one of every `1 / rate` records below `level`, records at
+    `level` or above always pass. A `rate` of 0 drops them all.
+    """
+
+    def __init__(self, rate: float = 1.0, level: int = logging.WARNING):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self.level = level
+        self.dropped = 0
+        self._seen = itertools.count()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.level:
+            return True
+        if self.every and next(self._seen) % self.every == 0:
+            return True
+        self.dropped += 1
+        return False
+
+
+class RateLimitFilter(logging.Filter):
+    """Allows `per_second` records below `level` from each line of code
+    (token bucket of `burst` records). The next record let through from a
+    line mentions how many were suppressed.
+    """
+
+    def __init__(self, per_second: float, burst: float = None, level: int = logging.WARNING):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst or per_second
+        self.level = level
+        self.dropped = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.level:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.per_second)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                self.dropped += 1
+                return False
+            self._buckets[key] = (tokens - 1, now, 0)
+        if suppressed and isinstance(record.msg, str):
+            record.msg = f'{record.msg} ({suppressed} similar messages suppressed)'
+        return True
@@ -1,24 +1,119 @@
 import os
+import sys
 import yaml
+import atexit
 import logging
 import logging.config
 
+from queue import Queue
+
 from producer import app
+from producer.custom_logger.context import context_fields
+from producer.custom_logger.handlers import BatchingQueueListener, DroppingQueueHandler, \
+    RateLimitFilter, SamplingFilter
+
+_BATCHED_HANDLERS = {
+    'logging.StreamHandler': 'producer.custom_logger.handlers.BatchedStreamHandler',
+    'logging.handlers.RotatingFileHandler':
+        'producer.custom_logger.handlers.BatchedRotatingFileHandler'
+}
+
+
+def _active_exception() -> bool:
+    """Whether an exception is being handled, only then a traceback is logged."""
+    return sys.exc_info()[0] is not None
 
 
 class CustomLogger:
     """Handler which handles applications state."""
 
     def __init__(self, log_dir=app.config.get('ROOT_PATH'),
-                 file_prefix=app.name):
+                 file_prefix=app.name, options=app.config.get('LOGGING')):
         """
         Logging initializer.
+
+        `options` (see `logging` in `default.yaml`): `mode` is `sync`, records
+        are written by the logging thread, or `async`, records are queued and
+        written in batches by a listener thread. `sampling` and `rate_limit`
+        thin out DEBUG/INFO records per logger name. `format` is `text` or
+        `json`, one object per line.
         """
+        options = options or {}
+        self.mode = options.get('mode', 'sync')
+        if self.mode not in ('sync', 'async'):
+            raise ValueError(f'Unknown logging mode - {self.mode}.')
+        log_format = options.get('format', 'text')
+        if log_format not in ('text', 'json'):
+            raise ValueError(f'Unknown logging format - {log_format}.')
         prefix = '{}_'.format(file_prefix) if file_prefix is not None else ''
-        logging.config.dictConfig(self.configure(prefix, log_dir))
+        logging.config.dictConfig(self.configure(prefix, log_dir, batched=self.mode == 'async',
+                                                 json_format=log_format == 'json'))
         self.logger = logging.getLogger(app.name)
+        self.logger.disabled = False  # `disable_existing_loggers` when configured again
+        self.handler, self.listener = None, None
+        if self.mode == 'async':
+            self.handler, self.listener = self._queue_root_handlers(
+                options.get('queue_size', 10000), options.get('batch_size', 100))
+            atexit.register(self.close)
+        self.filters = []
+        for name, rate in (options.get('sampling') or {}).items():
+            self._add_filter(name, SamplingFilter(rate))
+        for name, per_second in (options.get('rate_limit') or {}).items():
+            self._add_filter(name, RateLimitFilter(per_second))
 
-    def configure(self, prefix, log_dir):
+    @staticmethod
+    def _queue_root_handlers(queue_size, batch_size):
+        """
+        Replace handlers of the root logger with a queue served by a
+        listener thread which owns the original handlers.
+
+        :param queue_size: records queued before DEBUG/INFO ones are dropped
+        :type queue_size: int
+        :param batch_size: records written between flushes
+        :type batch_size: int
+        :return: (queue handler, listener)
+        :rtype: tuple
+        """
+        root = logging.getLogger()
+        records = Queue(queue_size)
+        listener = BatchingQueueListener(records, *root.handlers, batch_size=batch_size)
+        handler = DroppingQueueHandler(records)
+        for original in list(root.handlers):
+            root.removeHandler(original)
+        root.addHandler(handler)
+        listener.start()
+        return handler, listener
+
+    def _add_filter(self, name, log_filter):
+        """Attach `log_filter` to logger `name`."""
+        logging.getLogger(name).addFilter(log_filter)
+        self.filters.append((name, log_filter))
+
+    def close(self):
+        """Write queued records, stop the listener thread and remove filters."""
+        if self.listener is not None:
+            self.listener.stop()
+        for name, log_filter in self.filters:
+            logging.getLogger(name).removeFilter(log_filter)
+
+    def stats(self):
+        """
+        Records dropped on the way to the handlers.
+
+        :return: mode, queued and dropped records
+        :rtype: dict
+        """
+        return {
+            'mode': self.mode,
+            'queued': self.handler.queue.qsize() if self.handler else 0,
+            'dropped_queue_full': self.handler.dropped if self.handler else 0,
+            'sampled_out': {name: log_filter.dropped for name, log_filter in self.filters
+                            if isinstance(log_filter, SamplingFilter)},
+            'rate_limited': {name: log_filter.dropped for name, log_filter in self.filters
+                             if isinstance(log_filter, RateLimitFilter)}
+        }
+
+    def configure(self, prefix, log_dir, batched=False, json_format=False):
         """Logger configuration."""
         path = os.path.abspath(__file__)
         config_file = os.path.join(os.path.dirname(path), 'logging.yaml')
@@ -39,6 +134,10 @@ class CustomLogger:
                                 file_name = '{}{}'.format(prefix, file_name)
                                 abs_path = os.path.join(abs_dir_path, file_name)
                                 v['filename'] = abs_path
+                            if batched:  # Flushed by the listener once per batch
+                                v['class'] = _BATCHED_HANDLERS.get(v.get('class'), v.get('class'))
+                            if json_format:
+                                v['formatter'] = 'json'
 
                 return config
         except Exception as e:
@@ -56,45 +155,58 @@ class CustomLogger:
         """Docs not found"""
         pass
 
-    def log_debug(self, msg):
+    def _log(self, level, msg, args, fields, exc_info=False):
+        """
+        Log `msg % args` with structured `fields`, merged into the fields of
+        the current `job_context`. Nothing is formatted for disabled levels.
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        context = context_fields()
+        if fields:
+            context.update(fields)
+        self.logger.log(level, msg, *args, exc_info=exc_info, extra={'fields': context},
+                        stacklevel=3)
+
+    def log_debug(self, msg, *args, **fields):
         """Log DEBUG"""
         try:
-            self.logger.debug(msg)
+            self._log(logging.DEBUG, msg, args, fields)
         except Exception as e:
             print(e)
 
-    def log_error(self, msg):
+    def log_error(self, msg, *args, **fields):
         """Log ERROR's"""
         try:
-            self.logger.error(msg, exc_info=True)
+            self._log(logging.ERROR, msg, args, fields, _active_exception())
         except Exception as e:
             print(e)
 
-    def log_info(self, msg):
+    def log_info(self, msg, *args, **fields):
         """Log INFO"""
         try:
-            self.logger.info(msg)
+            self._log(logging.INFO, msg, args, fields)
         except Exception as e:
             print(e)
 
-    def log_warning(self, msg):
+    def log_warning(self, msg, *args, **fields):
         """Log WARNING's"""
         try:
-            self.logger.warning(msg, exc_info=True)
+            self._log(logging.WARNING, msg, args, fields, _active_exception())
         except Exception as e:
             print(e)
 
-    def log_critical(self, msg):
+    def log_critical(self, msg, *args, **fields):
         """Log CRITICAL"""
         try:
-            self.logger.critical(msg)
+            self._log(logging.CRITICAL, msg, args, fields)
         except Exception as e:
             print(e)
 
-    def log_exception(self, msg):
+    def log_exception(self, msg, *args, **fields):
         """Log EXCEPTION's"""
         try:
-            self.logger.exception(msg, exc_info=True)
+            self._log(logging.ERROR, msg, args, fields, _active_exception())
         except Exception as e:
             print(e)
 
@@ -10,6 +10,10 @@ api.blueprint_setup = process_controller_blueprint
 api.blueprint = process_controller_blueprint
 
 from producer.first_app import api_endpoints
+from producer.first_app.resources import Metrics
 
 # Registered Blueprints
 app.register_blueprint(process_controller_blueprint, url_prefix='/v1')
+
+# Scraped outside of the versioned API, where Prometheus expects it
+app.add_url_rule('/metrics', view_func=Metrics.as_view('metrics'))
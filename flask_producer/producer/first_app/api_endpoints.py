@@ -1,7 +1,16 @@
 from producer import api
 from producer.first_app.resources import (
-    FirstApp, QueuedTasks, JobPooling)
+    FirstApp, BatchSubmit, QueuedTasks, JobPooling, BulkJobPooling, CancelJob,
+    JobStatus, JobEvents, Load, Traces, DeadLetters)
 
 api.add_resource(FirstApp, '/submit-job')
+api.add_resource(BatchSubmit, '/submit-jobs')
 api.add_resource(QueuedTasks, '/jobs')
+api.add_resource(Load, '/load')
+api.add_resource(Traces, '/traces')
+api.add_resource(DeadLetters, '/dead-letters')
 api.add_resource(JobPooling, '/pool-job')
+api.add_resource(BulkJobPooling, '/pool-jobs')
+api.add_resource(CancelJob, '/cancel-job')
+api.add_resource(JobStatus, '/job-status/<string:service_name>/<string:message_token>')
+api.add_resource(JobEvents, '/job-events/<string:service_name>')
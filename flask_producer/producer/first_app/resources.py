@@ -1,22 +1,82 @@
-from flask import request
+import json
+
+from collections import Counter
+from queue import Empty
+
+from flask import request, Response
 from flask_restful import Resource
 
-from producer import queueing, utils, logger
+from producer import app, queueing, logger
+from producer.queuing_mgmt.hash import ProcessStatus
+from producer.queuing_mgmt.metrics import REGISTRY
+
+_MAX_WAIT_SECONDS = 60  # Longest a status request may be held open
+_HEARTBEAT_SECONDS = 10  # Keep-alive comment interval of event streams
+# Event name of each final job status
+_EVENT_NAMES = {ProcessStatus.COMPLETE: 'complete', ProcessStatus.FAILED: 'failed',
+                ProcessStatus.TIMED_OUT: 'timed_out', ProcessStatus.CANCELLED: 'cancelled',
+                ProcessStatus.EXPIRED: 'expired'}
+
+
+def _retry_after() -> dict:
+    """`Retry-After` hint for clients polling jobs still in progress."""
+    return {'Retry-After': str(app.config.get('RETRY_AFTER', 1))}
+
+
+def _rejected(status: int, retry_after: float) -> tuple:
+    """Response for jobs refused by admission control."""
+    if status == 413:  # More jobs of a service than its burst, never admitted
+        return {'error': 'Too many jobs for a service in one request, send fewer.'}, status
+    message = 'Too many jobs for this service, retry later.' if status == 429 \
+        else 'Producer is overloaded, retry later.'
+    return {'error': message}, status, {'Retry-After': str(retry_after)}
 
 
 class FirstApp(Resource):
-    """Temporary resource for API testing."""
+    """Temporary resource for API testing.
+    The job function is picked by name in `handler`, the default handler
+    if omitted.
+    """
 
     def post(self):
         """HTTP method `POST` to register job in queue."""
         try:
             requested_payload = request.get_json(force=True)
-            massage_token = queueing.register(utils.greetings.__name__,
+            if not isinstance(requested_payload, dict):
+                return {'error': 'Expected a JSON object.'}, 400
+            handler = requested_payload.get('handler', queueing.default_handler)
+            if not queueing.has_handler(handler):
+                return {'error': f'Unknown handler - {handler}.'}, 400
+            status, retry_after = queueing.admit({requested_payload.get('service_name'): 1})
+            if status:
+                return _rejected(status, retry_after)
+            massage_token = queueing.register(handler,
                                               requested_payload.get('service_name'),
                                               requested_payload)
             return {"message_token": massage_token}, 202
+        except OverflowError:  # Queue at `max_capacity`
+            return _rejected(503, app.config.get('ADMISSION', {}).get('retry_after', 1))
+        except Exception as e:
+            logger.log_exception('%s', e)
+
+
+class BatchSubmit(Resource):
+    """Register many jobs in one request."""
+
+    def post(self):
+        """HTTP method `POST` to register a list of jobs in queue."""
+        try:
+            requested_payload = request.get_json(force=True)
+            if not isinstance(requested_payload, list):
+                return {'error': 'Expected a JSON array of jobs.'}, 400
+            status, retry_after = queueing.admit(Counter(
+                job.get('service_name') for job in requested_payload if isinstance(job, dict)))
+            if status:
+                return _rejected(status, retry_after)
+            jobs = queueing.register_many(queueing.default_handler, requested_payload)
+            return {'jobs': jobs}, 202
         except Exception as e:
-            logger.log_exception(msg=str(e))
+            logger.log_exception('%s', e)
 
 
 class QueuedTasks(Resource):
@@ -26,10 +86,59 @@ class QueuedTasks(Resource):
         """HTTP method `GET` to get all jobs from queue and Hash Table."""
         return {
             'pending_jobs': queueing.all_pending_jobs(),
-            'hash_table': queueing.hash_table()
+            'hash_table': queueing.hash_table(),
+            'executor': queueing.executor_stats(),
+            'queue': queueing.queue_stats(),
+            'delivery': queueing.delivery_stats(),
+            'reaper': queueing.reaper_stats(),
+            'cache': queueing.cache_stats(),
+            'handlers': queueing.handler_stats(),
+            'logging': logger.stats()
         }
 
 
+class Load(Resource):
+    """Load of the producer for load balancers.
+    Answers 503 once traffic should go to other instances.
+    """
+
+    def get(self):
+        """HTTP method `GET` to get current load."""
+        load = queueing.load()
+        return load, 503 if load['shed'] else 200
+
+
+class DeadLetters(Resource):
+    """Results which could not be delivered to their consumer."""
+
+    def get(self):
+        """HTTP method `GET` to list dead letters."""
+        return {'dead_letters': queueing.delivery_stats()['dead_letters']}
+
+    def post(self):
+        """HTTP method `POST` to deliver dead letters again."""
+        return {'redriven': queueing.redrive()}, 202
+
+
+class Traces(Resource):
+    """Lifecycle of recently finished jobs as trace spans.
+    Accepts `?service_name=` and `?limit=` (jobs, 100 by default).
+    """
+
+    def get(self):
+        """HTTP method `GET` to export spans."""
+        return {'spans': queueing.traces(request.args.get('service_name'),
+                                         request.args.get('limit', 100, type=int))}
+
+
+class Metrics(Resource):
+    """Metrics in Prometheus text format."""
+
+    def get(self):
+        """HTTP method `GET` to scrape metrics."""
+        return Response(REGISTRY.exposition(), mimetype='text/plain; version=0.0.4')
+
+
 class JobPooling(Resource):
     """Pooling to check the jobs are completed or not.
     If competed the forward output to consumer service.
@@ -38,7 +147,91 @@ class JobPooling(Resource):
     def post(self):
         """HTTP method `POST` to perform provided job."""
         data = request.get_json(force=True)
-        logger.log_info(msg=f'Processing - {data.get("massage_token")}.')
+        logger.log_info('Processing job.', service_name=data.get('service_name'),
+                        message_token=data.get('massage_token'))
         status = queueing.pool_jobs(data.get('service_name'),
                                     data.get('massage_token'))
+        return 'Ok', status, _retry_after() if status == 202 else {}
+
+
+class CancelJob(Resource):
+    """Cancel a queued or running job.
+    Answers 200 once cancelled, 404 for an unknown job and 409 for a job
+    which finished already.
+    """
+
+    def post(self):
+        """HTTP method `POST` to cancel provided job."""
+        data = request.get_json(force=True)
+        message_token = data.get('massage_token') or data.get('message_token')
+        if not message_token:
+            return {'error': 'Expected `massage_token` of the job.'}, 400
+        status = queueing.cancel(data.get('service_name'), message_token)
         return 'Ok', status
+
+
+class JobStatus(Resource):
+    """Long polling status of a job.
+    With `?wait=<seconds>` the request is held open until the job finishes
+    or the wait expires. Answers like `/pool-job`.
+    """
+
+    def get(self, service_name, message_token):
+        """HTTP method `GET` to wait for a job."""
+        wait = min(request.args.get('wait', 0, type=float), _MAX_WAIT_SECONDS)
+        status = queueing.pool_jobs(service_name, message_token, wait=wait)
+        return 'Ok', status, _retry_after() if status == 202 else {}
+
+
+class JobEvents(Resource):
+    """Server sent events stream of finished jobs of a service.
+    Each event is named after the final status of its job (`complete`,
+    `failed`, `timed_out`, `cancelled` or `expired`), its data holds
+    `service_name`, `message_token` and the numeric `status`.
+    """
+
+    def get(self, service_name):
+        """HTTP method `GET` to stream finished jobs."""
+        def stream():
+            events = queueing.subscribe(service_name)
+            try:
+                yield ': connected\n\n'
+                while True:
+                    try:
+                        event = events.get(timeout=_HEARTBEAT_SECONDS)
+                    except Empty:
+                        yield ': keep-alive\n\n'
+                        continue
+                    name = _EVENT_NAMES.get(event['status'], 'finished')
+                    yield f'event: {name}\ndata: {json.dumps(event)}\n\n'
+            finally:
+                queueing.unsubscribe(service_name, events)
+
+        return Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache'})
+
+
+class BulkJobPooling(Resource):
+    """Pooling for many jobs in one request.
+    Accepts a list of `{"service_name": ..., "massage_token": ...}` objects
+    or `[service_name, message_token]` pairs.
+    """
+
+    def post(self):
+        """HTTP method `POST` to check a list of jobs."""
+        data = request.get_json(force=True)
+        if not isinstance(data, list):
+            return {'error': 'Expected a JSON array of jobs.'}, 400
+        jobs = []
+        for job in data:
+            if isinstance(job, dict):
+                jobs.append((job.get('service_name'),
+                             job.get('massage_token') or job.get('message_token')))
+            elif isinstance(job, list) and len(job) == 2:
+                jobs.append(tuple(job))
+            else:
+                return {'error': f'Invalid job - {job}.'}, 400
+        logger.log_info('Processing %d jobs.', len(jobs))
+        results = queueing.pool_many(jobs)
+        pending = any(result['status'] == 202 for result in results)
+        return {'jobs': results}, 200, _retry_after() if pending else {}
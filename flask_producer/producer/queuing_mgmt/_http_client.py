@@ -0,0 +1,86 @@
+import threading
+
+from typing import Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class SessionPool:
+    """Keep-alive HTTP sessions, one per destination (scheme, host and port).
+
+    Each destination gets its own `requests.Session` whose connection pool
+    keeps up to `max_per_host` connections open for reuse. At most
+    `max_per_host` requests run against one destination at a time; further
+    callers wait for a free slot. Connection errors are retried with
+    exponential backoff. 502/503/504 responses are only retried for
+    idempotent methods: a POST may have been processed already, and a 503
+    may be backpressure the caller has to see.
+    """
+
+    def __init__(self, max_per_host=10, retries=3, backoff_factor=0.2, timeout=15):
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self._destinations = {}
+        self._lock = threading.Lock()
+
+    def _destination(self, url: str) -> Tuple[requests.Session, threading.BoundedSemaphore]:
+        """
+        Session and concurrency limit for destination of `url`.
+
+        :param url: request url
+        :type url: str
+        :return: tuple(session, semaphore)
+        :rtype: tuple
+        """
+        parts = urlsplit(url)
+        origin = f'{parts.scheme}://{parts.netloc}'
+        destination = self._destinations.get(origin)
+        if destination is None:
+            with self._lock:
+                destination = self._destinations.get(origin)
+                if destination is None:
+                    destination = (self._new_session(),
+                                   threading.BoundedSemaphore(self.max_per_host))
+                    self._destinations[origin] = destination
+        return destination
+
+    def _new_session(self) -> requests.Session:
+        """Session with tuned connection pool and retries."""
+        retry = Retry(total=self.retries, connect=self.retries, read=0,
+                      status=self.retries, status_forcelist=(502, 503, 504),
+                      backoff_factor=self.backoff_factor, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_per_host,
+                              max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Same as `requests.request` over a pooled connection.
+
+        :param method: HTTP Method (GET, POST, etc)
+        :type method: str
+        :param url: url of destination service
+        :type url: str
+        :return: response
+        :rtype: requests.Response
+        """
+        session, limit = self._destination(url)
+        kwargs.setdefault('timeout', self.timeout)
+        with limit:
+            return session.request(method, url, **kwargs)
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        with self._lock:
+            for session, _ in self._destinations.values():
+                session.close()
+            self._destinations.clear()
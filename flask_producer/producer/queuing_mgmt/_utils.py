@@ -1,9 +1,14 @@
 import secrets
+import time
+
 import requests
 
 from typing import AnyStr
 
+from .metrics import RESULT_DELIVERY
+
 _N_BYTES = 16
+_TIMEOUT_SECONDS = 15
 
 
 def generate_token():
@@ -11,7 +16,7 @@ def generate_token():
     return secrets.token_hex(_N_BYTES)
 
 
-def return_job_result(method: str, url: str, json: AnyStr):
+def return_job_result(method: str, url: str, json: AnyStr, client=None):
     """
     Redirect result to the consumer service by requesting to provided `url`.
 
@@ -21,9 +26,20 @@ def return_job_result(method: str, url: str, json: AnyStr):
     :type url: str
     :param json: processed data
     :type json: dict
+    :param client: pooled client (`SessionPool`), plain `requests` if omitted
+    :type client: SessionPool
     :return:
     :rtype:
     """
     headers = {'Content-Type': 'application/json'}
-    return requests.request(method, url, json=json,
-                            headers=headers, timeout=15)
+    # A pooled client applies its own configured timeout
+    options = {} if client is not None else {'timeout': _TIMEOUT_SECONDS}
+    started = time.perf_counter()
+    try:
+        response = (client or requests).request(method, url, json=json,
+                                                headers=headers, **options)
+    except Exception:
+        RESULT_DELIVERY.observe(time.perf_counter() - started, 'error')
+        raise
+    RESULT_DELIVERY.observe(time.perf_counter() - started, str(response.status_code))
+    return response
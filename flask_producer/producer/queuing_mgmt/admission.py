@@ -0,0 +1,119 @@
+import math
+import threading
+import time
+
+from typing import Dict, Tuple
+
+_MAX_BUCKETS = 10000
+
+
+class AdmissionController:
+    """Decides whether new jobs are accepted.
+
+    Jobs are refused with 503 while the queue holds `max_queue_depth` jobs
+    or `max_in_flight` jobs are queued or running, and with 429 once a
+    service exceeds `rate` jobs per second (token bucket of `burst` jobs,
+    `rate` but at least one by default). A request with more jobs of a
+    service than `burst` could never be admitted, it is refused with 413.
+    Limits left as None are not enforced.
+
+    `load` reports utilization of the limits; from `shed_at` on the
+    producer asks load balancers to send traffic elsewhere.
+    """
+
+    def __init__(self, max_queue_depth=None, max_in_flight=None, rate=None, burst=None,
+                 retry_after=1, shed_at=0.9):
+        self.max_queue_depth = max_queue_depth
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = max(1, burst or rate) if rate else burst
+        self.retry_after = retry_after
+        self.shed_at = shed_at
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._metrics = {
+            'admitted': 0,
+            'rejected_queue_depth': 0,
+            'rejected_in_flight': 0,
+            'rejected_rate': 0,
+            'rejected_too_large': 0
+        }
+
+    def admit(self, counts: Dict[str, int], queue_depth: int, in_flight: int) -> Tuple[int, float]:
+        """
+        Admit new jobs, all or none.
+
+        :param counts: number of new jobs per service name
+        :type counts: dict
+        :param queue_depth: jobs waiting in the queue
+        :type queue_depth: int
+        :param in_flight: jobs queued or running
+        :type in_flight: int
+        :return: (None, 0) if admitted else (HTTP status, seconds to retry after),
+            None instead of seconds if retrying can not help
+        :rtype: tuple(int, float)
+        """
+        total = sum(counts.values())
+        with self._lock:
+            if self.rate and any(count > self.burst for count in counts.values()):
+                self._metrics['rejected_too_large'] += total
+                return 413, None
+            if self.max_queue_depth is not None and queue_depth + total > self.max_queue_depth:
+                self._metrics['rejected_queue_depth'] += total
+                return 503, self.retry_after
+            if self.max_in_flight is not None and in_flight + total > self.max_in_flight:
+                self._metrics['rejected_in_flight'] += total
+                return 503, self.retry_after
+            if self.rate:
+                wait = self._take(counts)
+                if wait:
+                    self._metrics['rejected_rate'] += total
+                    return 429, wait
+            self._metrics['admitted'] += total
+            return None, 0
+
+    def _take(self, counts: Dict[str, int]) -> float:
+        """
+        Take tokens of every service or none. Lock must be held.
+
+        :param counts: number of new jobs per service name
+        :type counts: dict
+        :return: 0 if taken else seconds until enough tokens are refilled
+        :rtype: float
+        """
+        now = time.monotonic()
+        if len(self._buckets) > _MAX_BUCKETS:  # Forget services which are idle long enough
+            self._buckets = {service_name: bucket for service_name, bucket in self._buckets.items()
+                             if bucket[0] + (now - bucket[1]) * self.rate < self.burst}
+        refilled = {}
+        for service_name, count in counts.items():
+            tokens, updated_at = self._buckets.get(service_name, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            if tokens < count:
+                return math.ceil((count - tokens) / self.rate)
+            refilled[service_name] = tokens - count
+        for service_name, tokens in refilled.items():
+            self._buckets[service_name] = (tokens, now)
+        return 0
+
+    def load(self, queue_depth: int, in_flight: int) -> Dict:
+        """
+        Current load against the configured limits.
+
+        :param queue_depth: jobs waiting in the queue
+        :type queue_depth: int
+        :param in_flight: jobs queued or running
+        :type in_flight: int
+        :return: load, limits, utilization and whether to shed traffic
+        :rtype: dict
+        """
+        utilization = max(
+            queue_depth / self.max_queue_depth if self.max_queue_depth else 0.0,
+            in_flight / self.max_in_flight if self.max_in_flight else 0.0
+        )
+        with self._lock:
+            metrics = dict(self._metrics)
+        return dict(metrics, queue_depth=queue_depth, in_flight=in_flight,
+                    max_queue_depth=self.max_queue_depth, max_in_flight=self.max_in_flight,
+                    rate=self.rate, burst=self.burst, utilization=round(utilization, 4),
+                    shed=utilization >= self.shed_at)
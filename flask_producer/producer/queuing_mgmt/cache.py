@@ -0,0 +1,152 @@
+import hashlib
+import json
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Dict, List, Tuple, AnyStr
+
+# Bookkeeping fields which do not change what a job computes, set by Jobs or the storages
+_IGNORED_FIELDS = ('func', 'message_token', 'status', 'result', 'redirect_location', 'ttl',
+                   'timeout', 'submitted_at', 'picked_up_at', 'finished_at', 'leased_at')
+
+
+class ResultCache:
+    """Memoized job results with deduplication of running jobs.
+
+    Jobs are keyed on function name and a hash of their canonical JSON
+    payload. The first job of a key runs (it leads); identical jobs
+    submitted while it runs attach to it and finish with its result. Once
+    done, the result is served to identical jobs for `ttl` seconds, at most
+    `max_entries` results are kept, least recently used go first.
+
+    Disabled unless `enabled`, every job then leads.
+    """
+
+    def __init__(self, enabled=False, max_entries=10000, ttl=300):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._results = OrderedDict()
+        self._running = {}
+        self._lock = threading.Lock()
+        self._metrics = {
+            'hits': 0,
+            'misses': 0,
+            'attached': 0,
+            'evicted': 0
+        }
+
+    @staticmethod
+    def key(func: str, data: dict) -> str:
+        """
+        Cache key of a job.
+
+        :param func: name of the job function
+        :type func: str
+        :param data: job payload
+        :type data: dict
+        :return: hex digest
+        :rtype: str
+        """
+        payload = {k: v for k, v in data.items() if k not in _IGNORED_FIELDS}
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(f'{func}:{canonical}'.encode()).hexdigest()
+
+    def claim(self, key: str, service_name: str, message_token: str,
+              ttl: float = None) -> Tuple[AnyStr, Dict]:
+        """
+        Decide how a new job with `key` is handled.
+
+        :param key: cache key of the job
+        :type key: str
+        :param service_name: name of service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param ttl: `ttl` of the job payload, kept for attached jobs
+        :type ttl: float
+        :return: (`hit`, result), (`attached`, None) or (`lead`, None)
+        :rtype: tuple(str, dict)
+        """
+        if not self.enabled:
+            return 'lead', None
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                expires_at, result = cached
+                if expires_at > time.monotonic():
+                    self._results.move_to_end(key)
+                    self._metrics['hits'] += 1
+                    return 'hit', result
+                del self._results[key]
+            followers = self._running.get(key)
+            if followers is not None:
+                followers.append((service_name, message_token, ttl))
+                self._metrics['attached'] += 1
+                return 'attached', None
+            self._running[key] = []
+            self._metrics['misses'] += 1
+            return 'lead', None
+
+    def resolve(self, key: str, result: dict = None,
+                failed: bool = False) -> List[Tuple[AnyStr, AnyStr, float]]:
+        """
+        Record the outcome of a leading job.
+
+        :param key: cache key of the job
+        :type key: str
+        :param result: result of the job
+        :type result: dict
+        :param failed: True if the job failed, nothing is cached then
+        :type failed: bool
+        :return: attached jobs as (`service_name`, `message_token`, ttl)
+        :rtype: list
+        """
+        if not self.enabled:
+            return []
+        with self._lock:
+            followers = self._running.pop(key, [])
+            if not failed:
+                self._results[key] = (time.monotonic() + self.ttl, result)
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+                    self._metrics['evicted'] += 1
+            return followers
+
+    def detach(self, key: str, message_token: str) -> bool:
+        """
+        Stop an attached job from finishing with the result of its leader.
+
+        :param key: cache key of the job
+        :type key: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :return: True if the job was attached
+        :rtype: bool
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            followers = self._running.get(key, [])
+            for index, follower in enumerate(followers):
+                if follower[1] == message_token:
+                    del followers[index]
+                    return True
+            return False
+
+    def stats(self) -> Dict:
+        """
+        Cache metrics.
+
+        :return: counters, cached results and running keys
+        :rtype: dict
+        """
+        with self._lock:
+            metrics = dict(self._metrics, entries=len(self._results),
+                           running=len(self._running), enabled=self.enabled)
+        lookups = metrics['hits'] + metrics['attached'] + metrics['misses']
+        metrics['hit_ratio'] = round((metrics['hits'] + metrics['attached']) / lookups, 4) \
+            if lookups else 0.0
+        return metrics
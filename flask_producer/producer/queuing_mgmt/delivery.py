@@ -0,0 +1,196 @@
+import json
+import threading
+import time
+
+from collections import deque
+from queue import Queue
+from typing import Dict, List
+
+from ._utils import return_job_result
+from .hash import ProcessStatus
+
+
+class DeliveryPipeline:
+    """Delivers results of completed jobs to their `redirect_location`.
+
+    Completed jobs are put on an outbound queue and pushed by a pool of
+    delivery workers, so no request thread waits on a consumer callback.
+    A job is deleted from the Hash Table once the consumer answers 200.
+    Failed attempts are retried with exponential backoff; after `retries`
+    retries the job goes to the dead letter list and stays in the Hash
+    Table. Consumers stop polling once a job completed, so dead letters
+    are redriven (queued for delivery again) every `redrive_interval`
+    seconds, or on demand with `redrive`, until delivered or expired.
+
+    With `push_on_complete` the result is queued as soon as the job
+    completes instead of waiting for the consumer's next poll.
+    `on_delivered(service_name, message_token, value)` is called with the
+    delivered job after it was deleted.
+    """
+
+    def __init__(self, storage, client, workers=4, retries=3, backoff=0.5,
+                 max_dead_letters=1000, push_on_complete=False, redrive_interval=60,
+                 on_delivered=None):
+        self._storage = storage
+        self._client = client
+        self._on_delivered = on_delivered
+        self.push_on_complete = push_on_complete
+        self.retries = retries
+        self.backoff = backoff
+        self.redrive_interval = redrive_interval
+        self._outbound = Queue()
+        self._in_flight = set()
+        self._dead_letters = deque(maxlen=max_dead_letters)
+        self._lock = threading.Lock()
+        self._metrics = {
+            'submitted': 0,
+            'delivered': 0,
+            'retried': 0,
+            'dead_lettered': 0,
+            'redriven': 0,
+            'latency_ms_total': 0.0,
+            'latency_ms_max': 0.0
+        }
+        for number in range(workers):
+            threading.Thread(target=self._worker, name=f'delivery-worker-{number}',
+                             daemon=True).start()
+        if redrive_interval:
+            threading.Thread(target=self._redrive_loop, name='delivery-redrive',
+                             daemon=True).start()
+
+    def submit(self, service_name: str, message_token: str) -> bool:
+        """
+        Queue a completed job for delivery.
+
+        :param service_name: name of service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :return: False if the job is already queued for delivery
+        :rtype: bool
+        """
+        with self._lock:
+            if message_token in self._in_flight:
+                return False
+            self._in_flight.add(message_token)
+            self._metrics['submitted'] += 1
+        self._outbound.put((service_name, message_token, time.monotonic()))
+        return True
+
+    def _worker(self) -> None:
+        """Delivery worker loop."""
+        while True:
+            service_name, message_token, queued_at = self._outbound.get()
+            try:
+                self._deliver(service_name, message_token, queued_at)
+            finally:
+                with self._lock:
+                    self._in_flight.discard(message_token)
+                self._outbound.task_done()
+
+    def _deliver(self, service_name: str, message_token: str, queued_at: float) -> None:
+        """
+        Deliver one job, retrying failed attempts.
+
+        :param service_name: name of service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param queued_at: monotonic time the job was queued for delivery
+        :type queued_at: float
+        :return:
+        :rtype: None
+        """
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                with self._lock:
+                    self._metrics['retried'] += 1
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            status, value = self._storage.status(service_name, message_token)
+            if status != ProcessStatus.COMPLETE:  # Delivered or removed meanwhile
+                return
+            try:
+                redirect_location = value.get('redirect_location')
+                response = return_job_result(
+                    method=redirect_location.get('method'),
+                    url=redirect_location.get('url'),
+                    json=json.dumps(value),
+                    client=self._client
+                )
+                if response.status_code == 200:
+                    # Delete item from Hash Table if result redirected to desired location
+                    self._storage.delete_item(service_name, message_token)
+                    if self._on_delivered is not None:
+                        self._on_delivered(service_name, message_token, value)
+                    latency = (time.monotonic() - queued_at) * 1000
+                    with self._lock:
+                        self._metrics['delivered'] += 1
+                        self._metrics['latency_ms_total'] += latency
+                        self._metrics['latency_ms_max'] = max(self._metrics['latency_ms_max'],
+                                                              latency)
+                    return
+                error = f'HTTP {response.status_code}'
+            except Exception as e:
+                error = str(e)
+
+        with self._lock:
+            self._metrics['dead_lettered'] += 1
+            self._dead_letters.append({
+                'service_name': service_name,
+                'message_token': message_token,
+                'error': error,
+                'at': time.time()
+            })
+
+    def _redrive_loop(self) -> None:
+        """Redrive loop."""
+        while True:
+            time.sleep(self.redrive_interval)
+            try:
+                self.redrive()
+            except Exception as e:
+                from producer import logger
+                logger.log_exception('%s while redriving dead letters.', e)
+
+    def redrive(self) -> int:
+        """
+        Queue every dead letter for delivery again. Jobs delivered or
+        removed meanwhile are skipped by the delivery workers.
+
+        :return: number of jobs queued again
+        :rtype: int
+        """
+        with self._lock:
+            dead_letters = list(self._dead_letters)
+            self._dead_letters.clear()
+        redriven = sum(self.submit(letter['service_name'], letter['message_token'])
+                       for letter in dead_letters)
+        with self._lock:
+            self._metrics['redriven'] += redriven
+        return redriven
+
+    def dead_letters(self) -> List[Dict]:
+        """
+        Jobs which could not be delivered.
+
+        :return: most recent dead letters
+        :rtype: List[Dict]
+        """
+        with self._lock:
+            return list(self._dead_letters)
+
+    def stats(self) -> Dict:
+        """
+        Delivery metrics.
+
+        :return: counters, queue depth and latency
+        :rtype: dict
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        total = metrics.pop('latency_ms_total')
+        metrics['latency_ms_avg'] = round(total / metrics['delivered'], 3) \
+            if metrics['delivered'] else 0.0
+        metrics['queued'] = self._outbound.qsize()
+        return metrics
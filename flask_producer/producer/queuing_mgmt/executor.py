@@ -0,0 +1,217 @@
+import asyncio
+import threading
+
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Dict
+
+_DEFAULT_MAX_WORKERS = 8
+
+
+class AbstractExecutor(ABC):
+    """Abstract Base class for job executors.
+
+    Executors own a bounded number of workers. Every submitted job is
+    accounted as `pending` until a worker picks it up and as `active`
+    while it runs, which is reported as pool saturation.
+    """
+
+    mode = None
+
+    def __init__(self, max_workers: int = _DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self._completed = 0
+
+    @abstractmethod
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule `fn` for execution on a pool worker."""
+        pass
+
+    @abstractmethod
+    def run(self, fn: Callable, *args, **kwargs):
+        """Run a job function from inside a pool worker and return its result."""
+        pass
+
+    @abstractmethod
+    def shutdown(self, wait: bool = True) -> None:
+        """Release pool workers."""
+        pass
+
+    def _track(self, fn: Callable) -> Callable:
+        """Wrap `fn` so that pending/active counters follow its lifecycle."""
+        with self._lock:
+            self._pending += 1
+
+        def tracked(*args, **kwargs):
+            with self._lock:
+                self._pending -= 1
+                self._active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        return tracked
+
+    def stats(self) -> Dict:
+        """
+        Pool saturation metric.
+
+        :return: workers, active & pending jobs and saturation ratio
+        :rtype: dict
+        """
+        with self._lock:
+            active, pending, completed = self._active, self._pending, self._completed
+        return {
+            'mode': self.mode,
+            'max_workers': self.max_workers,
+            'active': active,
+            'pending': pending,
+            'completed': completed,
+            'saturation': round(active / self.max_workers, 4) if self.max_workers else 0.0
+        }
+
+
+class ThreadPoolJobExecutor(AbstractExecutor):
+    """Fixed size thread pool. Job functions run inside the pool thread."""
+
+    mode = 'thread'
+
+    def __init__(self, max_workers: int = _DEFAULT_MAX_WORKERS):
+        super().__init__(max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix='job-worker')
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        return self._pool.submit(self._track(fn), *args, **kwargs)
+
+    def run(self, fn: Callable, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+class ProcessPoolJobExecutor(ThreadPoolJobExecutor):
+    """Process pool for CPU bound `utils` functions.
+
+    Job bookkeeping stays on a thread pool of the same size (it touches the
+    in-memory Queue and Hash Table), the job function itself is shipped to a
+    worker process so it does not hold the GIL of the Flask process.
+    Job functions and their payload must be picklable.
+    """
+
+    mode = 'process'
+
+    def __init__(self, max_workers: int = _DEFAULT_MAX_WORKERS):
+        super().__init__(max_workers)
+        self._processes = ProcessPoolExecutor(max_workers=max_workers)
+
+    def run(self, fn: Callable, *args, **kwargs):
+        return self._processes.submit(fn, *args, **kwargs).result()
+
+    def shutdown(self, wait: bool = True) -> None:
+        super().shutdown(wait=wait)
+        self._processes.shutdown(wait=wait)
+
+
+class AsyncioJobExecutor(AbstractExecutor):
+    """Single event loop running in a background thread.
+
+    Coroutine job functions run on the loop; at most `max_workers` of them
+    run at a time. Plain functions are pushed to a bounded thread pool by
+    the loop so they never block it.
+    """
+
+    mode = 'asyncio'
+
+    def __init__(self, max_workers: int = _DEFAULT_MAX_WORKERS):
+        super().__init__(max_workers)
+        self._loop = asyncio.new_event_loop()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix='job-worker')
+        self._loop.set_default_executor(self._pool)
+        self._semaphore = None
+        self._thread = threading.Thread(target=self._run_loop, name='job-event-loop',
+                                        daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._init_semaphore(), self._loop).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _init_semaphore(self):
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+
+    async def _execute(self, fn: Callable, *args, **kwargs):
+        async with self._semaphore:
+            if asyncio.iscoroutinefunction(fn):
+                return await fn(*args, **kwargs)
+            return await self._loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        tracked = self._track_async(fn) if asyncio.iscoroutinefunction(fn) else self._track(fn)
+        return asyncio.run_coroutine_threadsafe(self._execute(tracked, *args, **kwargs),
+                                                self._loop)
+
+    def _track_async(self, fn: Callable) -> Callable:
+        """Coroutine flavour of `_track`."""
+        with self._lock:
+            self._pending += 1
+
+        async def tracked(*args, **kwargs):
+            with self._lock:
+                self._pending -= 1
+                self._active += 1
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        return tracked
+
+    def run(self, fn: Callable, *args, **kwargs):
+        if asyncio.iscoroutinefunction(fn):
+            # Called from a pool thread, never from the loop itself.
+            return asyncio.run_coroutine_threadsafe(fn(*args, **kwargs), self._loop).result()
+        return fn(*args, **kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if wait:
+            self._thread.join()
+        self._pool.shutdown(wait=wait)
+
+
+_EXECUTORS = {
+    ThreadPoolJobExecutor.mode: ThreadPoolJobExecutor,
+    ProcessPoolJobExecutor.mode: ProcessPoolJobExecutor,
+    AsyncioJobExecutor.mode: AsyncioJobExecutor,
+}
+
+
+def get_executor(mode: str = 'thread', max_workers: int = _DEFAULT_MAX_WORKERS) -> AbstractExecutor:
+    """
+    Build executor for configured mode.
+
+    :param mode: one of `thread`, `process` or `asyncio`
+    :type mode: str
+    :param max_workers: size of the pool
+    :type max_workers: int
+    :return: executor instance
+    :rtype: AbstractExecutor
+    """
+    try:
+        executor_class = _EXECUTORS[mode]
+    except KeyError:
+        raise ValueError(f'Unknown executor mode - {mode}. '
+                         f'Expected one of {", ".join(_EXECUTORS)}.')
+    return executor_class(max_workers=max_workers or _DEFAULT_MAX_WORKERS)
@@ -0,0 +1,387 @@
+import asyncio
+import concurrent.futures
+import importlib
+import threading
+import time
+
+from concurrent.futures import (Future, ThreadPoolExecutor, ProcessPoolExecutor,
+                                CancelledError, InvalidStateError)
+from typing import Callable, Dict, Union
+
+_EXECUTIONS = ('inline', 'thread', 'process', 'coroutine')
+_DEFAULT_THREADS = 8
+_DEFAULT_FUNCTIONS = {
+    'greetings': {'function': 'producer.utils.greetings'}
+}
+
+
+class JobTimeout(TimeoutError):
+    """A job ran out of time, unlike a `TimeoutError` raised by its function."""
+
+
+class Handler:
+    """Job function and the way it is executed.
+
+    `execution` is one of:
+
+    - `inline`: called by the job worker, as `executor.mode` runs it
+    - `thread`: on a thread pool of its own
+    - `process`: on the process pool of the registry, out of the GIL of the
+      Flask process. Function and payload must be picklable.
+    - `coroutine`: `async def` function on the event loop of the registry
+
+    A job fails with `JobTimeout` after `timeout` seconds; `inline` jobs
+    with a timeout are handed to a thread pool of the handler for that.
+    At most `max_concurrency` jobs of the handler run at a time, further
+    job workers wait for a slot, no longer than the job may run.
+
+    A function which does not return keeps its thread after its job timed
+    out or was cancelled (it is `abandoned`). Once abandoned calls hold
+    every thread of the pool (`max_concurrency`, else 8), jobs of the
+    handler fail at once instead of waiting for a thread in vain.
+    """
+
+    def __init__(self, name: str, function: Union[str, Callable], execution: str = 'inline',
+                 timeout: float = None, max_concurrency: int = None):
+        if execution not in _EXECUTIONS:
+            raise ValueError(f'Unknown execution - {execution} of handler {name}. '
+                             f'Expected one of {", ".join(_EXECUTIONS)}.')
+        self.name = name
+        self.execution = execution
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        if isinstance(function, str):
+            # Looked up on every call, so the module attribute may be replaced
+            module_name, _, attribute = function.rpartition('.')
+            self._module, self._attribute = importlib.import_module(module_name), attribute
+            getattr(self._module, self._attribute)
+        else:
+            self._module, self._attribute = None, function
+        self.threads = max_concurrency or _DEFAULT_THREADS
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self._lock = threading.Lock()
+        self._metrics = {
+            'running': 0,
+            'completed': 0,
+            'failed': 0,
+            'timed_out': 0,
+            'cancelled': 0,
+            'abandoned': 0
+        }
+
+    @property
+    def function(self) -> Callable:
+        """The job function."""
+        if self._module is None:
+            return self._attribute
+        return getattr(self._module, self._attribute)
+
+    def exhausted(self) -> bool:
+        """Whether abandoned calls hold every thread of the pool."""
+        return self._metrics['abandoned'] >= self.threads
+
+    def acquire(self, timeout: float = None) -> None:
+        """
+        Wait for a free slot.
+
+        :param timeout: seconds to wait at most, forever if None
+        :type timeout: float
+        :return:
+        :rtype: None
+        :raises JobTimeout: if no slot was free in time
+        """
+        if self._slots is not None and not self._slots.acquire(timeout=timeout):
+            raise JobTimeout(f'No free slot of handler {self.name} within {timeout:g} seconds.')
+        with self._lock:
+            self._metrics['running'] += 1
+
+    def give_up(self, call: dict, outcome: str) -> None:
+        """
+        The job worker stopped waiting for a call which may still run.
+
+        :param call: state of the call shared with `release`
+        :type call: dict
+        :param outcome: `timed_out` or `cancelled`
+        :type outcome: str
+        :return:
+        :rtype: None
+        """
+        with self._lock:
+            call['given_up'] = outcome
+            if not call.get('stopped'):
+                self._metrics['abandoned'] += 1
+
+    def release(self, outcome: str, call: dict = None) -> None:
+        """
+        Free the slot of a job which stopped running.
+
+        :param outcome: `completed`, `failed`, `timed_out` or `cancelled`
+        :type outcome: str
+        :param call: state of the call shared with `give_up`
+        :type call: dict
+        :return:
+        :rtype: None
+        """
+        with self._lock:
+            if call is not None:
+                call['stopped'] = True
+                if call.get('given_up'):
+                    outcome = call['given_up']
+                    self._metrics['abandoned'] -= 1
+            self._metrics['running'] -= 1
+            self._metrics[outcome] += 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        """
+        Handler settings and counters.
+
+        :return: execution, limits and job counters
+        :rtype: dict
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        return dict(metrics, execution=self.execution, timeout=self.timeout,
+                    max_concurrency=self.max_concurrency)
+
+
+class HandlerRegistry:
+    """Job functions available to submissions by name.
+
+    Handlers come from `functions` (name to `Handler` arguments, `function`
+    being a dotted path) or `register`. Process pool and event loop are
+    shared by the handlers and started once one needs them.
+    """
+
+    def __init__(self, default='greetings', process_workers=None, functions=None):
+        self.default = default
+        self.process_workers = process_workers
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._processes = None
+        self._loop = None
+        self._threads = {}
+        for name, options in (_DEFAULT_FUNCTIONS if functions is None else functions).items():
+            self.register(name, **options)
+
+    def register(self, name: str, function: Union[str, Callable], execution: str = 'inline',
+                 timeout: float = None, max_concurrency: int = None) -> Handler:
+        """
+        Add or replace a handler, see `Handler`.
+
+        :param name: name submissions refer to
+        :type name: str
+        :param function: job function or its dotted path
+        :type function: str or callable
+        :param execution: `inline`, `thread`, `process` or `coroutine`
+        :type execution: str
+        :param timeout: seconds a job may run
+        :type timeout: float
+        :param max_concurrency: jobs of the handler running at a time
+        :type max_concurrency: int
+        :return: the handler
+        :rtype: Handler
+        """
+        handler = Handler(name, function, execution, timeout, max_concurrency)
+        with self._lock:
+            self._handlers[name] = handler
+        return handler
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._handlers
+
+    def get(self, name: str) -> Handler:
+        """
+        Handler registered as `name`.
+
+        :param name: name of the handler
+        :type name: str
+        :return: the handler
+        :rtype: Handler
+        """
+        try:
+            return self._handlers[name]
+        except KeyError:
+            raise ValueError(f'Unknown handler - {name}.') from None
+
+    def run(self, name: str, payload: dict, executor, job: Future = None,
+            timeout: float = None):
+        """
+        Run a job with handler `name` and wait for its result. Called by a
+        job worker.
+
+        A job with a `timeout` of its own runs on the thread pool of the
+        handler even if it is `inline`, so the worker can stop waiting for
+        it. Cancelling `job` stops the wait as well. The job function is
+        only interrupted if it did not start yet or is a coroutine, its
+        slot stays taken until it returns. Exceptions of the job function,
+        `TimeoutError` included, are raised as they are.
+
+        :param name: name of the handler
+        :type name: str
+        :param payload: job payload
+        :type payload: dict
+        :param executor: job executor, runs `inline` handlers
+        :type executor: AbstractExecutor
+        :param job: future cancelled once the job is not wanted anymore
+        :type job: Future
+        :param timeout: seconds the job may still run, besides the handler `timeout`
+        :type timeout: float
+        :return: result of the job function
+        :rtype: dict
+        :raises JobTimeout: if the job did not finish in time
+        :raises CancelledError: if `job` was cancelled
+        """
+        handler = self.get(name)
+        if handler.timeout is not None:
+            timeout = handler.timeout if timeout is None else min(timeout, handler.timeout)
+        if job is not None and job.cancelled():
+            raise CancelledError()
+        pooled = handler.execution == 'thread' or handler.execution == 'inline' \
+            and timeout is not None
+        if pooled and handler.exhausted():
+            raise RuntimeError(f'Every thread of handler {name} is held by a job which '
+                               f'timed out or was cancelled.')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        handler.acquire(timeout)
+        if handler.execution == 'inline' and timeout is None:
+            try:
+                result = executor.run(handler.function, payload)
+            except Exception:
+                handler.release('failed')
+                raise
+            handler.release('completed')
+            return result
+
+        try:
+            future = self._submit(handler, payload, executor, timeout)
+        except Exception:
+            handler.release('failed')
+            raise
+        call = {}
+
+        def stopped(done: Future) -> None:
+            # The slot is taken until the job really stops, even past its timeout
+            if not done.cancelled() and isinstance(done.exception(), JobTimeout):
+                handler.release('timed_out', call)
+            else:
+                handler.release('failed' if done.cancelled() or done.exception()
+                                else 'completed', call)
+
+        future.add_done_callback(stopped)
+        waited = future if job is None else _chain(future, job)
+        try:
+            return waited.result(None if deadline is None else max(deadline - time.monotonic(), 0))
+        except JobTimeout:  # Coroutine cancelled on the event loop
+            raise
+        except concurrent.futures.TimeoutError as e:
+            if waited.done() and not waited.cancelled() and waited.exception() is e:
+                raise  # Raised by the job function, it failed
+            handler.give_up(call, 'timed_out')
+            future.cancel()
+            raise JobTimeout(f'Job of handler {name} timed out after {timeout:g} seconds.')
+        except CancelledError:
+            handler.give_up(call, 'cancelled')
+            future.cancel()
+            raise
+
+    def _submit(self, handler: Handler, payload: dict, executor, timeout: float = None):
+        """Start a job of a handler on its thread pool, process pool or event loop."""
+        if handler.execution == 'coroutine':
+            coroutine = handler.function(payload)
+            if timeout is not None:  # Cancelled on the loop once it times out
+                coroutine = _limit(coroutine, timeout, handler.name)
+            return asyncio.run_coroutine_threadsafe(coroutine, self._event_loop())
+        if handler.execution == 'process':
+            return self._process_pool().submit(handler.function, payload)
+        if handler.execution == 'inline':  # As the job worker would run it
+            return self._thread_pool(handler).submit(executor.run, handler.function, payload)
+        return self._thread_pool(handler).submit(handler.function, payload)
+
+    def _thread_pool(self, handler: Handler) -> ThreadPoolExecutor:
+        with self._lock:
+            pool = self._threads.get(handler.name)
+            if pool is None:
+                pool = self._threads[handler.name] = ThreadPoolExecutor(
+                    max_workers=handler.max_concurrency or _DEFAULT_THREADS,
+                    thread_name_prefix=f'handler-{handler.name}')
+            return pool
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._processes
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='handler-event-loop',
+                                 daemon=True).start()
+            return self._loop
+
+    def stats(self) -> Dict:
+        """
+        Settings and counters of every handler.
+
+        :return: handler name to its stats
+        :rtype: dict
+        """
+        with self._lock:
+            handlers = dict(self._handlers)
+        return {name: handler.stats() for name, handler in handlers.items()}
+
+
+async def _limit(coroutine, timeout: float, name: str):
+    """
+    Await `coroutine`, cancel it after `timeout` seconds.
+
+    :param coroutine: job function call
+    :type coroutine: Coroutine
+    :param timeout: seconds the job may run
+    :type timeout: float
+    :param name: name of the handler
+    :type name: str
+    :return: result of the job function
+    :rtype: dict
+    :raises JobTimeout: if the job did not finish in time
+    """
+    task = asyncio.ensure_future(coroutine)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if not done:
+        task.cancel()
+        await asyncio.wait({task})
+        raise JobTimeout(f'Job of handler {name} timed out after {timeout:g} seconds.')
+    return task.result()
+
+
+def _chain(future: Future, job: Future) -> Future:
+    """
+    Resolve `job` with the outcome of `future`, unless it was cancelled first.
+
+    :param future: running job function
+    :type future: Future
+    :param job: future a job worker waits on
+    :type job: Future
+    :return: `job`
+    :rtype: Future
+    """
+    def copy(done: Future) -> None:
+        if done.cancelled():  # By the worker, which gave up on `job` already
+            return
+        try:
+            if done.exception() is not None:
+                job.set_exception(done.exception())
+            else:
+                job.set_result(done.result())
+        except InvalidStateError:  # Cancelled meanwhile
+            pass
+
+    future.add_done_callback(copy)
+    return job
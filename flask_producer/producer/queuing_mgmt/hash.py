@@ -1,5 +1,7 @@
+import threading
+
 from abc import ABC, abstractmethod
-from typing import Dict, Tuple, AnyStr
+from typing import Dict, List, Tuple, AnyStr
 
 
 class ProcessStatus(object):
@@ -10,6 +12,14 @@ class ProcessStatus(object):
     PROCESSING = 2
     COMPLETE = 3
     ACCEPTED = 4
+    EXPIRED = 5
+    TIMED_OUT = 6
+    CANCELLED = 7
+
+
+# Jobs which will not change anymore
+FINISHED_STATUSES = (ProcessStatus.COMPLETE, ProcessStatus.FAILED, ProcessStatus.TIMED_OUT,
+                     ProcessStatus.CANCELLED)
 
 
 class Hash(ABC):
@@ -40,14 +50,48 @@ class Hash(ABC):
         """Delete a job from Hash Table."""
         pass
 
+    @abstractmethod
+    def locate(self, message_token: str) -> Tuple[AnyStr, Dict]:
+        """Find service name and job for `message_token`."""
+        pass
+
 
 class HashTable(Hash):
-    """Hash Table to store jobs as per the service."""
+    """Hash Table to store jobs as per the service.
+
+    Every bucket holds the jobs of one service keyed by `message_token`, and
+    `_token_index` maps each `message_token` to its service, so lookups,
+    updates and deletes never scan a bucket.
+
+    Buckets are handed out to services on first insert. The table doubles
+    only when every bucket is in use, and the bucket of a service is
+    reclaimed for reuse as soon as its last job is deleted.
 
-    def __init__(self, size=20):
+    Access to a bucket is guarded by one of `stripes` locks picked by
+    service name, so jobs of different services are updated in parallel.
+    Only handing out and reclaiming buckets takes the table wide lock.
+    """
+
+    def __init__(self, size=20, stripes=16):
         self.size = size
-        self.hash_table = [[] for _ in range(self.size)]
+        self.hash_table = [{} for _ in range(self.size)]
         self._hash_indexes = {}
+        self._token_index = {}
+        self._free_indexes = []
+        self._next_index = 0
+        self._index_lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+
+    def _lock_for(self, service_name: str) -> threading.Lock:
+        """
+        Lock guarding the bucket of a service.
+
+        :param service_name: name of service
+        :type service_name: str
+        :return: stripe lock
+        :rtype: threading.Lock
+        """
+        return self._stripes[hash(service_name) % len(self._stripes)]
 
     def hashed_index(self) -> dict:
         """
@@ -67,14 +111,59 @@ class HashTable(Hash):
         :return: integer index of service
         :rtype: int
         """
-        if len(self._hash_indexes) == self.size:  # Expand if Hash Table size is full
-            self._expand()
+        index = self._hash_indexes.get(service_name)
+        if index is None:  # Create index for service if it does not exist
+            with self._index_lock:
+                index = self._hash_indexes.get(service_name)
+                if index is None:
+                    index = self._allocate(service_name)
+        return index
+
+    def _allocate(self, service_name: str) -> int:
+        """
+        Assign a free bucket to a new service, expanding the Hash Table
+        only if every bucket is in use.
+
+        :param service_name: name of service
+        :type service_name: str
+        :return: integer index of service
+        :rtype: int
+        """
+        if self._free_indexes:  # Reuse bucket of an idle service
+            index = self._free_indexes.pop()
+        else:
+            if self.is_full():
+                self._expand()
+            index = self._next_index
+            self._next_index += 1
+        self._hash_indexes[service_name] = index
+        return index
+
+    def _release(self, service_name: str) -> None:
+        """
+        Reclaim the bucket of a service which has no more jobs.
+
+        :param service_name: name of service
+        :type service_name: str
+        :return:
+        :rtype:
+        """
+        with self._index_lock:
+            index = self._hash_indexes.pop(service_name, None)
+            if index is not None:
+                self._free_indexes.append(index)
+
+    def _bucket(self, service_name: str) -> dict:
+        """
+        Bucket of a service without allocating one for unknown services.
 
-        # Check whether is service index exist in Hash Table. If not exist
-        # then create index for service
-        if service_name not in list(self._hash_indexes):
-            self._hash_indexes[service_name] = len(self._hash_indexes) + 1
-        return self._hash_indexes[service_name]
+        :param service_name: name of service
+        :type service_name: str
+        :return: jobs of service keyed by `message_token` or None
+        :rtype: dict
+        """
+        index = self._hash_indexes.get(service_name)
+        return None if index is None else self.hash_table[index]
 
     def has(self, service_name: str, message_token: str) -> bool:
         """
@@ -90,15 +179,13 @@ class HashTable(Hash):
         if not message_token:  # if `message_token` not nullable
             raise ValueError(f'You must provide `message_token`')
 
-        hash_key = self.hash_function(service_name)
-        for index, ele in enumerate(self.hash_table[hash_key]):
-            if ele[0] == message_token:
-                return True
-        return False
+        with self._lock_for(service_name):
+            bucket = self._bucket(service_name)
+            return bucket is not None and message_token in bucket
 
     def is_full(self) -> bool:
         """Check whether Hash Table is full or have space."""
-        return len(self.hash_table) > self.size
+        return self._next_index >= len(self.hash_table) and not self._free_indexes
 
     def set_item(self, service_name: str, data: dict, **kwargs: dict) -> str:
         """
@@ -111,26 +198,60 @@ class HashTable(Hash):
         :return: `message_token`
         :rtype: str
         """
-
-        if self.is_full():
-            self._expand()
-
         message_token = data.get('message_token')
         generated_message_token = kwargs.get('message_token', message_token)
-        hash_key = self.hash_function(service_name)
-        exist = False
-        if message_token:  # Update if `message_token` matches
-            for index, ele in enumerate(self.hash_table[hash_key]):
-                if ele[0] == message_token:
-                    self.hash_table[hash_key][index] = (message_token, data)
-                    exist = True
-        if not exist:  # Make new entry if `message_token` not provided of found in Hash Table
-            data['message_token'] = generated_message_token
-            data['status'] = ProcessStatus.CREATED
-            self.hash_table[hash_key].append((generated_message_token, data))
+        with self._lock_for(service_name):
+            hash_key = self.hash_function(service_name)
+            bucket = self.hash_table[hash_key]
+            if message_token and message_token in bucket:  # Update if `message_token` matches
+                bucket[message_token] = data
+            else:  # Make new entry if `message_token` not provided of found in Hash Table
+                data['message_token'] = generated_message_token
+                data['status'] = ProcessStatus.CREATED
+                bucket[generated_message_token] = data
+                self._token_index[generated_message_token] = service_name
+            self._changed(service_name, data['message_token'], data)
 
         return message_token
 
+    def update(self, service_name: str, message_token: str, values: dict) -> int:
+        """
+        Atomically update fields of an existing job.
+
+        :param service_name: name of the service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param values: fields to set on the job
+        :type values: dict
+        :return: 0 or 1
+        :rtype: int
+        """
+        if not message_token:
+            raise ValueError(f'You must provide `message_token`')
+
+        with self._lock_for(service_name):
+            bucket = self._bucket(service_name)
+            value = None if bucket is None else bucket.get(message_token)
+            if value is None:
+                return 0
+            value.update(values)
+            self._changed(service_name, message_token, value)
+            return 1
+
+    def items(self, service_name: str) -> List[Tuple[AnyStr, Dict]]:
+        """
+        Snapshot of all jobs of a service.
+
+        :param service_name: name of the service
+        :type service_name: str
+        :return: list of (`message_token`, job)
+        :rtype: List[Tuple[AnyStr, Dict]]
+        """
+        with self._lock_for(service_name):
+            bucket = self._bucket(service_name)
+            return [] if bucket is None else list(bucket.items())
+
     def get_item(self, service_name: str, message_token: str) -> Tuple[AnyStr, Dict]:
         """
         Get an item from the Hash Table for provided `service_name`.
@@ -144,11 +265,25 @@ class HashTable(Hash):
         if not message_token:
             raise ValueError(f'You must provide `message_token`')
 
-        hash_key = self.hash_function(service_name)
-        for key, value in self.hash_table[hash_key]:
-            if key == message_token:
-                return key, value
-        return message_token, {}
+        with self._lock_for(service_name):
+            bucket = self._bucket(service_name)
+            if bucket is None:
+                return message_token, {}
+            return message_token, bucket.get(message_token, {})
+
+    def locate(self, message_token: str) -> Tuple[AnyStr, Dict]:
+        """
+        Find a job by `message_token` only.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :return: tuple(service name, item value)
+        :rtype: tuple(str, dict)
+        """
+        service_name = self._token_index.get(message_token)
+        if service_name is None:
+            return None, {}
+        return service_name, self.get_item(service_name, message_token)[1]
 
     def delete_item(self, service_name: str, message_token: str) -> int:
         """
@@ -164,22 +299,66 @@ class HashTable(Hash):
         if not message_token:
             raise ValueError(f'You must provide `message_token`')
 
-        hash_key = self.hash_function(service_name)
-        for index, item in enumerate(self.hash_table[hash_key]):
-            if item[0] == message_token:
-                del self.hash_table[hash_key][index]
-                return 1
-        return 0
+        with self._lock_for(service_name):
+            bucket = self._bucket(service_name)
+            if bucket is None or bucket.pop(message_token, None) is None:
+                return 0
+            self._token_index.pop(message_token, None)
+            self._changed(service_name, message_token, None)
+            if not bucket:  # Service went idle, reclaim its bucket
+                self._release(service_name)
+            return 1
+
+    def _changed(self, service_name: str, message_token: str, value: dict) -> None:
+        """
+        Hook called with the bucket lock held after a job is stored, updated
+        or deleted. Durable storages journal the change from here.
+
+        :param service_name: name of service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param value: job after the change, None once deleted
+        :type value: dict
+        :return:
+        :rtype: None
+        """
+        pass
+
+    def flush(self) -> None:
+        """Block until changes made by the calling thread are durable."""
+        pass
 
     def _expand(self) -> None:
-        self.hash_table += [[] for _ in range(self.size)]
+        """Double the number of buckets."""
+        self.hash_table.extend({} for _ in range(len(self.hash_table) or self.size))
 
 
 class HashTableStorage(HashTable):
     """Utility functions for Hash Table storage."""
 
-    def __init__(self, size=20):
-        super().__init__(size)
+    def __init__(self, size=20, stripes=16):
+        super().__init__(size, stripes)
+
+    def recovered(self) -> List[Tuple[AnyStr, AnyStr]]:
+        """
+        Jobs restored from a previous run which still have to be executed.
+        Nothing survives a restart of the in-memory storage.
+
+        :return: list of (`service_name`, `message_token`) in submit order
+        :rtype: List[Tuple[AnyStr, AnyStr]]
+        """
+        return []
+
+    def finished(self) -> List[Tuple[AnyStr, AnyStr]]:
+        """
+        Finished jobs restored from a previous run, which still have to
+        expire.
+
+        :return: list of (`service_name`, `message_token`)
+        :rtype: List[Tuple[AnyStr, AnyStr]]
+        """
+        return []
 
     def status(self, service_name: str, message_token: str) -> Tuple[int, Dict]:
         """
@@ -195,11 +374,12 @@ class HashTableStorage(HashTable):
         if not message_token:
             raise ValueError(f'You must provide `message_token`')
 
-        hash_key = self.hash_function(service_name)
-        for key, value in self.hash_table[hash_key]:
-            if key == message_token:
-                return value.get('status'), value
-        return ProcessStatus.NOT_EXIST, {}
+        with self._lock_for(service_name):
+            bucket = self._bucket(service_name)
+            value = None if bucket is None else bucket.get(message_token)
+            if value is None:
+                return ProcessStatus.NOT_EXIST, {}
+            return value.get('status'), value
 
     def status_update(self, service_name: str, message_token: str, status) -> int:
         """
@@ -217,9 +397,4 @@ class HashTableStorage(HashTable):
         if not message_token:
             raise ValueError(f'You must provide `message_token`')
 
-        hash_key = self.hash_function(service_name)
-        for index, item in enumerate(self.hash_table[hash_key]):
-            if item[0] == message_token:
-                self.hash_table[hash_key][index][1]['status'] = status
-                return 1
-        return 0
+        return self.update(service_name, message_token, {'status': status})
@@ -1,12 +1,29 @@
-import json
 import threading
+import time
 
+from concurrent.futures import Future, CancelledError
+from queue import Queue
 from typing import List, Dict, Tuple, AnyStr, Iterator
 
-from ._utils import generate_token, return_job_result
-from .queue import QueueManager
-from .hash import HashTableStorage, ProcessStatus
-from producer import utils
+from ._http_client import SessionPool
+from ._utils import generate_token
+from .admission import AdmissionController
+from .cache import ResultCache
+from .delivery import DeliveryPipeline
+from .executor import get_executor
+from .handlers import HandlerRegistry, JobTimeout
+from .metrics import JOBS_REGISTERED, JOB_WAIT, JOB_EXECUTION, JOBS_FINISHED, POOL_JOBS, gauges
+from .notify import CompletionNotifier
+from .reaper import Reaper
+from .hash import ProcessStatus
+from .shared import SharedSQLiteStorage
+from .storage import get_storage, get_queue
+from .tracing import Tracer
+from producer.custom_logger.context import job_context
+
+_WAIT_RECHECK_SECONDS = 1
+_STATUS_NAMES = {ProcessStatus.COMPLETE: 'complete', ProcessStatus.FAILED: 'failed',
+                 ProcessStatus.TIMED_OUT: 'timed_out', ProcessStatus.CANCELLED: 'cancelled'}
 
 
 class Jobs(object):
@@ -15,17 +32,72 @@ class Jobs(object):
     job in Queue as well as in Hash Table
     """
 
-    def __init__(self):
-        self.__queue = QueueManager()
-        self.__hash = HashTableStorage()
+    def __init__(self, config: dict = None):
+        config = config or {}
+        self.__hash = get_storage(config.get('STORAGE_BACKEND', 'memory'),
+                                  **config.get('STORAGE_OPTIONS', {}))
+        self.__queue = get_queue(self.__hash, config.get('QUEUE_CAPACITY', 20),
+                                 config.get('QUEUE_MAX_CAPACITY'),
+                                 config.get('QUEUE_SCHEDULER', 'fifo'),
+                                 config.get('QUEUE_WEIGHTS'))
+        self.__executor = get_executor(config.get('EXECUTOR_MODE', 'thread'),
+                                       config.get('EXECUTOR_MAX_WORKERS'))
+        self.__handlers = HandlerRegistry(**config.get('HANDLERS', {}))
+        deadlines = config.get('DEADLINES', {})
+        self.__default_deadline = deadlines.get('default')
+        self.__service_deadlines = deadlines.get('services') or {}
+        # Jobs picked up by a worker of this process, cancelled through their future
+        self.__running = {}
+        self.__running_lock = threading.Lock()
+        # Jobs of a shared storage may also be cancelled by another process
+        self.__shared = isinstance(self.__hash, SharedSQLiteStorage)
+        self.__http = SessionPool(**config.get('HTTP_CLIENT', {}))
+        self.__reaper = Reaper(self.__hash, **config.get('EXPIRY', {}))
+        self.__tracer = Tracer(**config.get('TRACING', {}))
+        self.__delivery = DeliveryPipeline(self.__hash, self.__http,
+                                           on_delivered=self._delivered,
+                                           **config.get('DELIVERY', {}))
+        self.__notifier = CompletionNotifier()
+        self.__cache = ResultCache(**config.get('RESULT_CACHE', {}))
+        self.__admission = AdmissionController(**config.get('ADMISSION', {}))
+        gauges({
+            'producer_queue_depth': ('Jobs waiting in the queue.', lambda: len(self.__queue)),
+            'producer_executor_active': ('Jobs running on workers.',
+                                         lambda: self.__executor.stats()['active']),
+            'producer_delivery_queued': ('Results waiting for a delivery worker.',
+                                         lambda: self.__delivery.stats()['queued'])
+        })
+        self.recover()
+
+    def recover(self) -> None:
+        """
+        Queue again jobs restored by a durable storage which did not finish
+        before the last shutdown, and start workers for every queued job.
+        Jobs left in a shared queue are started the same way; surplus
+        workers find the queue empty and return. Restored finished jobs
+        expire `ttl` seconds after they finished.
+
+        :return:
+        :rtype: None
+        """
+        for service_name, message_token in self.__hash.finished():
+            _, value = self.__hash.status(service_name, message_token)
+            self.__reaper.track(service_name, message_token, value.get('ttl'),
+                                value.get('finished_at'))
+        for service_name, message_token in self.__hash.recovered():
+            try:
+                self.__queue.enqueue(message_token, service_name)
+            except OverflowError:  # Leave the rest for a later restart
+                break
+        for _ in range(len(self.__queue)):
+            self.__executor.submit(self.start)
 
     def register(self, func: str, service_name: str, data: dict) -> str:
         """
         It will enqueued job in Queue and returns `message_token`
         with started function execution.
 
-        :param func: function to execution which will be exist in
-        `utils` module.
+        :param func: name of a registered handler
         :type func: str
         :param service_name: name of the service
         :type service_name: str
@@ -35,42 +107,475 @@ class Jobs(object):
         :rtype: str
         """
         message_token = generate_token()
-        self.__queue.enqueue(message_token)
+        data['func'] = func
+        data['submitted_at'] = time.monotonic()
         kwd = {'message_token': message_token}
+        # Job must be in Hash Table before any worker can dequeue its token
         self.__hash.set_item(service_name, data, **kwd)
-        threading.Thread(target=self.start, args=(func, service_name, data)).start()
+        try:
+            self.__hash.flush()
+        except Exception:  # Not durable, the job is not taken
+            self.__hash.delete_item(service_name, message_token)
+            raise
+        JOBS_REGISTERED.inc()
+        if self._attach(func, service_name, message_token, data):
+            return message_token
+        try:
+            self.__queue.enqueue(message_token, service_name, self._priority(data))
+        except OverflowError:
+            self.__hash.delete_item(service_name, message_token)
+            self._release(func, data)
+            raise
+        self.__executor.submit(self.start)
         return message_token
 
-    def start(self, func: str, service_name: str, data: dict):
+    @property
+    def default_handler(self) -> str:
+        """Handler of jobs which do not name one."""
+        return self.__handlers.default
+
+    def has_handler(self, name: str) -> bool:
+        """
+        Whether jobs can be submitted to handler `name`.
+        :param name: name of the handler
+        :type name: str
+        :return: True if registered
+        :rtype: bool
+        """
+        return name in self.__handlers
+
+    def register_handler(self, name: str, function, **options) -> None:
+        """
+        Add or replace a job handler, see `HandlerRegistry.register`.
+        :param name: name submissions refer to
+        :type name: str
+        :param function: job function or its dotted path
+        :type function: str or callable
+        :param options: `execution`, `timeout` and `max_concurrency`
+        :type options: dict
+        :return:
+        :rtype: None
+        """
+        self.__handlers.register(name, function, **options)
+
+    def register_many(self, func: str, payloads: List[Dict]) -> List[Dict]:
+        """
+        Register a batch of jobs in one pass. Every job is stored in Hash
+        Table first, then all tokens are enqueued and handed to workers.
+
+        :param func: handler of jobs which do not name one in `handler`
+        :type func: str
+        :param payloads: data received from request parameters, one per job
+        :type payloads: list of dict
+        :return: per job `{"message_token": ...}` or `{"error": ...}`
+        :rtype: List[Dict]
+        """
+        results, registered = [], []
+        for data in payloads:
+            if not isinstance(data, dict):
+                results.append({'error': 'Job payload must be a JSON object.'})
+                continue
+            if not self.has_handler(data.get('handler', func)):
+                results.append({'error': f'Unknown handler - {data.get("handler", func)}.'})
+                continue
+            message_token = generate_token()
+            data['func'] = data.get('handler', func)
+            data['submitted_at'] = time.monotonic()
+            self.__hash.set_item(data.get('service_name'), data, message_token=message_token)
+            registered.append((len(results), data.get('service_name'), message_token, data))
+            results.append({'message_token': message_token})
+        try:
+            self.__hash.flush()
+        except Exception:  # Not durable, none of the jobs is taken
+            for _, service_name, message_token, _ in registered:
+                self.__hash.delete_item(service_name, message_token)
+            raise
+        JOBS_REGISTERED.inc(amount=len(registered))
+
+        for index, service_name, message_token, data in registered:
+            if self._attach(data['func'], service_name, message_token, data):
+                continue
+            try:
+                self.__queue.enqueue(message_token, service_name, self._priority(data))
+            except OverflowError as e:
+                self.__hash.delete_item(service_name, message_token)
+                self._release(data['func'], data)
+                results[index] = {'error': str(e)}
+                continue
+            self.__executor.submit(self.start)
+        return results
+
+    @staticmethod
+    def _priority(data: dict) -> int:
         """
-        Picks up job for `func` execution and adding result
-        to the Hash Table with a status.
+        Priority of a job within its service, given as `priority` in the
+        payload. Higher runs first, 0 by default.
 
-        :param func: function to execution which will be exist in
-        `utils` module.
+        :param data: job payload
+        :type data: dict
+        :return: priority
+        :rtype: int
+        """
+        try:
+            return int(data.get('priority', 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def _attach(self, func: str, service_name: str, message_token: str, data: dict) -> bool:
+        """
+        Finish a new job from the result cache or attach it to an identical
+        running job.
+
+        :param func: name of the job function
         :type func: str
         :param service_name: name of the service
         :type service_name: str
-        :param data: data received from request parameters
+        :param message_token: `message_token`
+        :type message_token: str
+        :param data: job payload
         :type data: dict
-        :return: `message_token`
-        :rtype: str
+        :return: True if the job must not be queued
+        :rtype: bool
+        """
+        if not self.__cache.enabled:
+            return False
+        state, result = self.__cache.claim(ResultCache.key(func, data), service_name,
+                                           message_token, data.get('ttl'))
+        if state == 'hit':
+            self._finish(service_name, message_token, ProcessStatus.COMPLETE, result,
+                         data.get('ttl'))
+        return state != 'lead'
+
+    def _release(self, func: str, data: dict) -> None:
+        """
+        Fail jobs attached to a job which will not run.
+
+        :param func: name of the job function
+        :type func: str
+        :param data: payload of the job which will not run
+        :type data: dict
+        :return:
+        :rtype: None
+        """
+        if not self.__cache.enabled:
+            return
+        for service_name, message_token, ttl in self.__cache.resolve(
+                ResultCache.key(func, data), failed=True):
+            self._finish(service_name, message_token, ProcessStatus.FAILED, ttl=ttl)
+
+    def _finish(self, service_name: str, message_token: str, status: int,
+                result: dict = None, ttl: float = None, finished_at: float = None) -> None:
+        """
+        Store the outcome of a job and tell whoever waits for it.
+
+        :param service_name: name of the service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param status: `ProcessStatus.COMPLETE`, `FAILED`, `TIMED_OUT` or `CANCELLED`
+        :type status: int
+        :param result: result of a completed job
+        :type result: dict
+        :param ttl: `ttl` of the job payload
+        :type ttl: float
+        :param finished_at: monotonic time the job finished, now if None
+        :type finished_at: float
+        :return:
+        :rtype: None
+        """
+        values = {'status': status, 'finished_at': finished_at or time.monotonic()}
+        if status == ProcessStatus.COMPLETE:
+            values['result'] = result
+        self.__hash.update(service_name, message_token, values)
+        self.__reaper.track(service_name, message_token, ttl)
+        # Don't wait for the consumer to poll
+        if status == ProcessStatus.COMPLETE and self.__delivery.push_on_complete:
+            self.__delivery.submit(service_name, message_token)
+        self.__notifier.notify(service_name, message_token, status)
+        JOBS_FINISHED.inc(_STATUS_NAMES[status])
+
+    def start(self) -> None:
+        """
+        Picks up next job from the Queue for `func` execution and adding
+        result to the Hash Table with a status. The job is `PROCESSING`
+        while it runs, its transitions are timed for `Tracer`.
+
+        The job is looked up by the dequeued `message_token`, so the result
+        always lands on the job which was executed. It times out once its
+        deadline passes (see `_timeout`) and may be cancelled while it runs,
+        the worker is free for the next job either way. Only jobs of an
+        `inline` handler without a deadline can not be interrupted: once
+        cancelled they keep their worker until the job function returns.
+
+        :return:
+        :rtype: None
         """
-        message_token = self.__queue.dequeue()
+        job = Future()
+        with self.__running_lock:  # Queued or running, `cancel` finds the job either way
+            try:
+                message_token = self.__queue.dequeue()
+            except IndexError:  # Every queued job is already picked up
+                return
+            self.__running[message_token] = job
         try:
-            if hasattr(utils, func):
-                data['result'] = getattr(utils, func)(data)
-                data['status'] = ProcessStatus.COMPLETE
-                data['message_token'] = message_token
-                self.__hash.set_item(service_name, data)
-        except Exception as e:
-            from producer import logger
-            logger.log_exception(f'{e} while execution of job - '
-                                 f'{message_token}. Marking job as '
-                                 f'failed.')
-            data['status'] = ProcessStatus.FAILED
-            data['message_token'] = message_token
-            self.__hash.set_item(service_name, data)
+            self._run(message_token, job)
+        finally:
+            self.__running.pop(message_token, None)
+
+    def _run(self, message_token: str, job: Future) -> None:
+        """
+        Execute a dequeued job, see `start`.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :param job: future `cancel` cancels
+        :type job: Future
+        :return:
+        :rtype: None
+        """
+        service_name, data = self.__hash.locate(message_token)
+        if not data:  # Job removed before it was picked up
+            return
+        func = data.get('func')
+        data['picked_up_at'] = time.monotonic()
+        self.__hash.update(service_name, message_token, {'status': ProcessStatus.PROCESSING,
+                                                         'picked_up_at': data['picked_up_at']})
+        if data.get('submitted_at') is not None \
+                and data['picked_up_at'] >= data['submitted_at']:
+            JOB_WAIT.observe(data['picked_up_at'] - data['submitted_at'])
+        self.__tracer.observe('queue_wait', service_name, func, data.get('submitted_at'),
+                              data['picked_up_at'])
+        key = ResultCache.key(func, data) if self.__cache.enabled else None
+        timeout = self._timeout(service_name, data)
+        with job_context(service_name=service_name, message_token=message_token, func=func):
+            try:
+                if timeout is not None and timeout <= 0:
+                    raise JobTimeout('Job timed out while it was queued.')
+                started = time.perf_counter()
+                result = self.__handlers.run(func, data, self.__executor, job, timeout)
+                # Jobs of a shared storage may be cancelled by another process
+                if not self._claim(job) or self.__shared and self.__hash.status(
+                        service_name, message_token)[0] != ProcessStatus.PROCESSING:
+                    raise CancelledError()
+                JOB_EXECUTION.observe(time.perf_counter() - started, func)
+                data['finished_at'] = time.monotonic()
+                self.__tracer.observe('execution', service_name, func, data['picked_up_at'],
+                                      data['finished_at'])
+                self._finish(service_name, message_token, ProcessStatus.COMPLETE, result,
+                             data.get('ttl'), data['finished_at'])
+                # Identical jobs submitted meanwhile finish with the same result
+                for follower in self.__cache.resolve(key, result):
+                    self._finish(follower[0], follower[1], ProcessStatus.COMPLETE, result,
+                                 follower[2], data['finished_at'])
+            except CancelledError:  # Already finished by `cancel`, the result is dropped
+                from producer import logger
+                logger.log_info('Job was cancelled while it ran.')
+                self._release(func, data)
+            except JobTimeout as e:
+                from producer import logger
+                if not self._claim(job):  # Cancelled meanwhile
+                    self._release(func, data)
+                    return
+                logger.log_warning('%s Marking job as timed out.', e)
+                self._stop(service_name, message_token, data, ProcessStatus.TIMED_OUT, key)
+            except Exception as e:
+                from producer import logger
+                if not self._claim(job):  # Cancelled meanwhile
+                    self._release(func, data)
+                    return
+                logger.log_exception('%s while execution of job. Marking job as failed.', e)
+                self._stop(service_name, message_token, data, ProcessStatus.FAILED, key)
+
+    def _claim(self, job: Future) -> bool:
+        """
+        Take the outcome of a job for its worker, `cancel` can not cancel it
+        anymore afterwards. The job future of an `inline` handler without a
+        deadline is never resolved by the handler, it is marked running.
+
+        :param job: future of the job
+        :type job: Future
+        :return: False if `cancel` got to the job first
+        :rtype: bool
+        """
+        with self.__running_lock:
+            if job.cancelled():
+                return False
+            if not job.done() and not job.running():
+                job.set_running_or_notify_cancel()
+            return True
+
+    def _stop(self, service_name: str, message_token: str, data: dict, status: int,
+              key: str) -> None:
+        """
+        Finish a job which failed or timed out, along with the identical
+        jobs attached to it.
+
+        :param service_name: name of the service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param data: the job
+        :type data: dict
+        :param status: `ProcessStatus.FAILED` or `ProcessStatus.TIMED_OUT`
+        :type status: int
+        :param key: result cache key of the job, None if the cache is disabled
+        :type key: str
+        :return:
+        :rtype: None
+        """
+        func = data.get('func')
+        data['finished_at'] = time.monotonic()
+        self._finish(service_name, message_token, status, ttl=data.get('ttl'),
+                     finished_at=data['finished_at'])
+        self.__tracer.observe('execution', service_name, func, data['picked_up_at'],
+                              data['finished_at'])
+        self.__tracer.observe('total', service_name, func, data.get('submitted_at'),
+                              data['finished_at'])
+        self.__tracer.complete(service_name, message_token, data, _STATUS_NAMES[status])
+        for follower in self.__cache.resolve(key, failed=True):
+            self._finish(follower[0], follower[1], status, ttl=follower[2],
+                         finished_at=data['finished_at'])
+
+    def _timeout(self, service_name: str, data: dict) -> float:
+        """
+        Seconds a picked up job may still run. Its deadline counts from
+        submission, given as `timeout` in the payload, else per service or
+        by default in `DEADLINES`.
+
+        :param service_name: name of the service
+        :type service_name: str
+        :param data: the job
+        :type data: dict
+        :return: seconds left, None without a deadline
+        :rtype: float
+        """
+        timeout = data.get('timeout', self.__service_deadlines.get(service_name,
+                                                                   self.__default_deadline))
+        try:
+            timeout = float(timeout)
+        except (TypeError, ValueError):
+            return None
+        if data.get('submitted_at') is not None \
+                and data['picked_up_at'] >= data['submitted_at']:
+            timeout -= data['picked_up_at'] - data['submitted_at']
+        return timeout
+
+    def cancel(self, service_name: str, message_token: str) -> int:
+        """
+        Cancel a job which did not finish yet. A queued job is taken out of
+        the queue, a running job is given up: its worker is free at once and
+        whatever the job function still returns is dropped. A running job
+        of an `inline` handler without a deadline can not be interrupted, it
+        keeps its worker until the job function returns.
+
+        :param service_name: name of the service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :return: 200 if cancelled, 404 if not found, 409 if it finished already
+        :rtype: int
+        """
+        from producer import logger
+        status, data = self.__hash.status(service_name, message_token)
+        if status == ProcessStatus.NOT_EXIST:
+            return 404
+        if status not in (ProcessStatus.CREATED, ProcessStatus.PROCESSING):
+            return 409
+        data = dict(data)
+        with self.__running_lock:
+            job = self.__running.get(message_token)
+            queued = job is None and self.__queue.remove(message_token)
+            # False once the worker claimed the outcome of the job, see `_claim`
+            cancelled = queued or job is not None and job.cancel()
+        if job is None and not queued:
+            # Attached to an identical job or picked up by another process
+            # of a shared storage, which drops the result once it sees the status
+            if self.__cache.enabled:
+                self.__cache.detach(ResultCache.key(data.get('func'), data), message_token)
+            cancelled = self.__hash.status(service_name, message_token)[0] in (
+                ProcessStatus.CREATED, ProcessStatus.PROCESSING)
+        if not cancelled:
+            return 409
+        data['finished_at'] = time.monotonic()
+        self._finish(service_name, message_token, ProcessStatus.CANCELLED, ttl=data.get('ttl'),
+                     finished_at=data['finished_at'])
+        self.__tracer.observe('total', service_name, data.get('func'), data.get('submitted_at'),
+                              data['finished_at'])
+        self.__tracer.complete(service_name, message_token, data, 'cancelled')
+        if queued:  # Identical jobs waited for it in vain
+            self._release(data.get('func'), data)
+        logger.log_info('Job cancelled.', service_name=service_name, message_token=message_token)
+        return 200
+
+    def _delivered(self, service_name: str, message_token: str, value: dict) -> None:
+        """
+        Last transition of a job, its result reached the consumer and the
+        job was deleted.
+
+        :param service_name: name of the service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param value: the delivered job
+        :type value: dict
+        :return:
+        :rtype: None
+        """
+        self.__reaper.forget(service_name, message_token)
+        value = dict(value, delivered_at=time.monotonic())
+        func = value.get('func')
+        self.__tracer.observe('delivery', service_name, func, value.get('finished_at'),
+                              value['delivered_at'])
+        self.__tracer.observe('total', service_name, func, value.get('submitted_at'),
+                              value['delivered_at'])
+        self.__tracer.complete(service_name, message_token, value, 'delivered')
+
+    def wait_for(self, service_name: str, message_token: str, timeout: float) -> None:
+        """
+        Block until job is finished or `timeout` expires.
+        :param service_name: name of the service
+        :type service_name: str
+        :param message_token: message_token
+        :type message_token: str
+        :param timeout: seconds to wait at most
+        :type timeout: float
+        :return:
+        :rtype: None
+        """
+        event = self.__notifier.waiter(message_token)
+        deadline = time.monotonic() + timeout
+        while True:
+            status, _ = self.is_completed(service_name, message_token)
+            remaining = deadline - time.monotonic()
+            if status not in (ProcessStatus.CREATED, ProcessStatus.PROCESSING) or remaining <= 0:
+                break
+            # Completions in other processes of a shared storage are not
+            # notified here, check the status again from time to time.
+            if event.wait(min(remaining, _WAIT_RECHECK_SECONDS)):
+                return
+        self.__notifier.forget(message_token)
+
+    def subscribe(self, service_name: str) -> Queue:
+        """
+        Subscribe to completions of all jobs of a service.
+        :param service_name: name of the service
+        :type service_name: str
+        :return: queue receiving `{service_name, message_token, status}` events
+        :rtype: Queue
+        """
+        return self.__notifier.subscribe(service_name)
+
+    def unsubscribe(self, service_name: str, events: Queue) -> None:
+        """
+        Stop receiving completions of a service.
+        :param service_name: name of the service
+        :type service_name: str
+        :param events: queue returned by `subscribe`
+        :type events: Queue
+        :return:
+        :rtype: None
+        """
+        self.__notifier.unsubscribe(service_name, events)
 
     def is_completed(self, service_name: str, message_token: str) -> Tuple[AnyStr, Dict]:
         """
@@ -82,7 +587,41 @@ class Jobs(object):
         :return: (status, job result)
         :rtype: tuple(int, dict)
         """
-        return self.__hash.status(service_name, message_token)
+        status, value = self.__hash.status(service_name, message_token)
+        if status == ProcessStatus.NOT_EXIST and self.__reaper.is_expired(message_token):
+            return ProcessStatus.EXPIRED, {}
+        return status, value
+
+    def admit(self, counts: Dict[str, int]) -> Tuple[int, float]:
+        """
+        Check whether new jobs may be registered.
+        :param counts: number of new jobs per service name
+        :type counts: dict
+        :return: (None, 0) if admitted else (HTTP status, seconds to retry after),
+            None instead of seconds if retrying can not help
+        :rtype: tuple(int, float)
+        """
+        queue_depth = len(self.__queue)
+        return self.__admission.admit(counts, queue_depth, self._in_flight(queue_depth))
+
+    def load(self) -> Dict:
+        """
+        Current load against the admission limits.
+        :return: load metrics
+        :rtype: dict
+        """
+        queue_depth = len(self.__queue)
+        return self.__admission.load(queue_depth, self._in_flight(queue_depth))
+
+    def _in_flight(self, queue_depth: int) -> int:
+        """
+        Jobs queued or running.
+        :param queue_depth: jobs waiting in the queue
+        :type queue_depth: int
+        :return: number of jobs
+        :rtype: int
+        """
+        return queue_depth + self.__executor.stats()['active']
 
     def all_pending_jobs(self) -> List[str]:
         """
@@ -92,11 +631,80 @@ class Jobs(object):
         """
         return self.__queue.queue
 
-    def hash_table(self) -> List[Tuple[AnyStr, Dict]]:
+    def executor_stats(self) -> Dict:
+        """
+        Saturation of the worker pool.
+        :return: worker pool metric
+        :rtype: dict
+        """
+        return self.__executor.stats()
+
+    def delivery_stats(self) -> Dict:
+        """
+        Result delivery metrics and dead letters.
+        :return: delivery metrics
+        :rtype: dict
+        """
+        return dict(self.__delivery.stats(), dead_letters=self.__delivery.dead_letters())
+
+    def redrive(self) -> int:
+        """
+        Queue results which could not be delivered for delivery again.
+        :return: number of jobs queued again
+        :rtype: int
+        """
+        return self.__delivery.redrive()
+
+    def queue_stats(self) -> Dict:
+        """
+        Per service queue depth and wait times, if the queue tracks them.
+        :return: metrics keyed by service name
+        :rtype: dict
+        """
+        stats = getattr(self.__queue, 'stats', None)
+        return stats() if stats is not None else {}
+
+    def reaper_stats(self) -> Dict:
+        """
+        Expiry and eviction of finished jobs.
+        :return: reaper metrics
+        :rtype: dict
+        """
+        return self.__reaper.stats()
+
+    def traces(self, service_name: str = None, limit: int = 100) -> List[Dict]:
+        """
+        Lifecycle of recently finished jobs as trace spans.
+        :param service_name: only jobs of this service, all if None
+        :type service_name: str
+        :param limit: number of jobs
+        :type limit: int
+        :return: spans
+        :rtype: List[Dict]
+        """
+        return self.__tracer.spans(service_name, limit)
+
+    def handler_stats(self) -> Dict:
+        """
+        Execution settings and job counters of the registered handlers.
+        :return: handler name to its stats
+        :rtype: dict
+        """
+        return self.__handlers.stats()
+
+    def cache_stats(self) -> Dict:
+        """
+        Result cache hits and misses.
+        :return: cache metrics
+        :rtype: dict
+        """
+        return self.__cache.stats()
+
+    def hash_table(self) -> List[Dict[AnyStr, Dict]]:
         """
         Return all jobs exist in Hash Table.
-        :return: list of tuples
-        :rtype: List[Tuple[AnyStr, Dict]]:
+        :return: list of per service buckets keyed by `message_token`
+        :rtype: List[Dict[AnyStr, Dict]]:
         """
         return self.__hash.hash_table
 
@@ -118,7 +726,7 @@ class Jobs(object):
 
     def service_wise_hash(self, service_name: str) -> None:
         """
-        Returns all job results for particular service.
+        Queues all completed job results of particular service for delivery.
         :param service_name:
         :type service_name:
         :return:
@@ -127,56 +735,80 @@ class Jobs(object):
         from producer import logger
         try:
             index = self.__hash.hashed_index().get(service_name)
-            if not index:  # Skip execution if jobs does not exists for service
-                logger.log_info(msg=f'No more jobs exist for service - {service_name}.')
+            if index is None:  # Skip execution if jobs does not exists for service
+                logger.log_info('No more jobs exist for service.', service_name=service_name)
                 return
-            qd_jobs = self.__hash.hash_table[index]
+            qd_jobs = self.__hash.items(service_name)
             for jb in self.get_completed_jobs(qd_jobs):
                 if jb and jb[1]:
-                    temp_jd = jb[1].get('redirect_location')
-                    response = return_job_result(
-                        method=temp_jd.get('method'),
-                        url=temp_jd.get('url'),
-                        json=json.dumps(jb[1])
-                    )
-                    if response.status_code == 200:
-                        # Delete item from Hash Table if result redirected to desired location
-                        self.__hash.delete_item(service_name, jb[1].get('message_token'))
+                    self.__delivery.submit(service_name, jb[0])
         except Exception as e:
-            logger.log_exception(msg=str(e))
+            logger.log_exception('%s', e, service_name=service_name)
+
+    def pool_jobs(self, service_name: str, message_token: str, wait: float = 0) -> int:
+        """
+        Checks status of single job for service. Result of a completed job
+        is handed to the delivery workers which redirect it.
+        :param service_name: name of service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param wait: seconds to wait for a pending job to finish (long polling)
+        :type wait: float
+        :return: status
+        :rtype: int
+        """
+        with job_context(service_name=service_name, message_token=message_token):
+            status = self._pool_job(service_name, message_token, wait)
+        POOL_JOBS.inc(str(status))
+        return status
 
-    def pool_jobs(self, service_name: str, message_token: str) -> int:
+    def _pool_job(self, service_name: str, message_token: str, wait: float) -> int:
         """
-        Executes single job for service and redirects result.
+        See `pool_jobs`.
         :param service_name: name of service
         :type service_name: str
         :param message_token: `message_token`
         :type message_token: str
+        :param wait: seconds to wait for a pending job to finish (long polling)
+        :type wait: float
         :return: status
         :rtype: int
         """
         from producer import logger
         try:
+            if wait > 0:
+                self.wait_for(service_name, message_token, wait)
             status, value = self.is_completed(service_name, message_token)
             if status == ProcessStatus.COMPLETE:  # Proceed further if job completed execution
-                temp_jd = value.get('redirect_location')
-                response = return_job_result(
-                    method=temp_jd.get('method'),
-                    url=temp_jd.get('url'),
-                    json=json.dumps(value)
-                )
-                if response.status_code == 200:
-                    # Delete item from Hash Table if result redirected to desired location
-                    self.__hash.delete_item(service_name, value.get('message_token'))
-                    return 302  # Processed and redirect
+                self.__reaper.touch(message_token)
+                self.__delivery.submit(service_name, message_token)
+                return 302  # Processed and redirect
+            if status in (ProcessStatus.CREATED, ProcessStatus.PROCESSING):
+                return 202  # Accepted, still in progress
+            if status == ProcessStatus.EXPIRED:
+                logger.log_info('The job expired before it was delivered.')
+                return 410  # Gone
+            if status in (ProcessStatus.TIMED_OUT, ProcessStatus.CANCELLED):
+                logger.log_info('The job ended without a result.', status=_STATUS_NAMES[status])
+                return 410  # Gone
+            if status == ProcessStatus.NOT_EXIST:
+                logger.log_error('The job is not found.')
             else:
-                if status:
-                    logger.log_error(msg=f'The job - {message_token} for service - {service_name}'
-                                         f' has still status - {status}.')
-                else:
-                    logger.log_error(msg=f'The job - {message_token} for service - {service_name}'
-                                         f' is not found.')
-                return 404  # Not not found
+                logger.log_error('The job has status - %s.', status)
+            return 404  # Not not found
         except Exception as e:
-            logger.log_exception(msg=str(e))
+            logger.log_exception('%s', e)
         return 202  # Accepted
+
+    def pool_many(self, jobs: List[Tuple[AnyStr, AnyStr]]) -> List[Dict]:
+        """
+        Status of many jobs at once, see `pool_jobs`.
+        :param jobs: list of (`service_name`, `message_token`)
+        :type jobs: List[Tuple[AnyStr, AnyStr]]
+        :return: per job `message_token` and status
+        :rtype: List[Dict]
+        """
+        return [{'message_token': message_token,
+                 'status': self.pool_jobs(service_name, message_token)}
+                for service_name, message_token in jobs]
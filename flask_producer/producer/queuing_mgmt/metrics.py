@@ -0,0 +1,250 @@
+import bisect
+import threading
+
+from typing import Callable, Dict, List, Tuple
+
+_DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1, 2.5, 5, 10, 30, 60)
+_FOLD_AFTER = 256  # Shards kept before those of finished threads are merged
+
+
+class _Shards:
+    """Values kept per thread and summed when collected.
+
+    Every thread updates only its own dict, so the hot path takes no lock.
+    Shards of finished threads (Werkzeug starts one per request) are merged
+    into `_retired` from time to time.
+    """
+
+    def __init__(self, merge: Callable):
+        self._merge = merge
+        self.local_values = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def local(self) -> dict:
+        """
+        Shard of the calling thread.
+
+        :return: values keyed by label values
+        :rtype: dict
+        """
+        shard = getattr(self.local_values, 'shard', None)
+        if shard is None:
+            shard = self.local_values.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+                if len(self._shards) > _FOLD_AFTER:
+                    self._fold()
+        return shard
+
+    def _fold(self) -> None:
+        """Merge shards of finished threads, lock must be held."""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for key, value in shard.items():
+                    self._retired[key] = self._merge(self._retired.get(key), value)
+        self._shards = alive
+
+    def collect(self) -> dict:
+        """
+        Sum of all shards.
+
+        :return: values keyed by label values
+        :rtype: dict
+        """
+        with self._lock:
+            self._fold()
+            shards = [dict(shard) for _, shard in self._shards]
+            total = dict(self._retired)
+        for shard in shards:
+            for key, value in shard.items():
+                total[key] = self._merge(total.get(key), value)
+        return total
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Tuple, values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._shards = _Shards(lambda total, value: (total or 0) + value)
+        self._local = self._shards.local_values
+
+    def inc(self, *labelvalues, amount: float = 1) -> None:
+        """
+        Increase counter of `labelvalues` by `amount`.
+
+        :param labelvalues: one value per label name
+        :type labelvalues: tuple
+        :param amount: increment
+        :type amount: float
+        :return:
+        :rtype: None
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:  # First update from this thread
+            shard = self._shards.local()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{_labels(self.labelnames, key)} {value}'
+                for key, value in sorted(self._shards.collect().items())]
+
+
+class Histogram:
+    """Distribution of observed values in fixed buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple = (),
+                 buckets: Tuple = _DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._shards = _Shards(self._merge)
+        self._local = self._shards.local_values
+
+    @staticmethod
+    def _merge(total: list, value: list) -> list:
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+    def observe(self, value: float, *labelvalues) -> None:
+        """
+        Record one value.
+
+        :param value: observed value, seconds for durations
+        :type value: float
+        :param labelvalues: one value per label name
+        :type labelvalues: tuple
+        :return:
+        :rtype: None
+        """
+        try:
+            shard = self._local.shard
+        except AttributeError:  # First update from this thread
+            shard = self._shards.local()
+        counts = shard.get(labelvalues)
+        if counts is None:
+            # Per bucket counts, +Inf bucket, sum and count
+            counts = shard[labelvalues] = [0] * (len(self.buckets) + 3)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def samples(self) -> List[str]:
+        samples = []
+        for key, counts in sorted(self._shards.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                labels = _labels(self.labelnames, key, 'le="%s"' % bound)
+                samples.append(f'{self.name}_bucket{labels} {cumulative}')
+            samples.append(f'{self.name}_sum{_labels(self.labelnames, key)} {counts[-2]}')
+            samples.append(f'{self.name}_count{_labels(self.labelnames, key)} {counts[-1]}')
+        return samples
+
+
+class Gauge:
+    """Current value read from `function` when collected."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+
+    def samples(self) -> List[str]:
+        return [f'{self.name} {self.function()}']
+
+
+class MetricsRegistry:
+    """Metrics exposed in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        Add a metric, replacing one of the same name.
+
+        :param metric: `Counter`, `Histogram` or `Gauge`
+        :type metric: object
+        :return: the metric
+        :rtype: object
+        """
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def exposition(self) -> str:
+        """
+        All metrics in Prometheus text exposition format.
+
+        :return: metrics text
+        :rtype: str
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+JOBS_REGISTERED = REGISTRY.register(Counter(
+    'producer_jobs_registered_total', 'Jobs accepted by register.'))
+JOB_WAIT = REGISTRY.register(Histogram(
+    'producer_job_wait_seconds', 'Time jobs spent queued before a worker picked them up.'))
+JOB_EXECUTION = REGISTRY.register(Histogram(
+    'producer_job_execution_seconds', 'Run time of job functions.', ('func',)))
+JOBS_FINISHED = REGISTRY.register(Counter(
+    'producer_jobs_finished_total', 'Finished jobs by status.', ('status',)))
+POOL_JOBS = REGISTRY.register(Counter(
+    'producer_pool_jobs_total', 'Answers to job status polls by HTTP status.', ('code',)))
+JOB_STAGE = REGISTRY.register(Histogram(
+    'producer_job_stage_seconds', 'Duration of job lifecycle stages '
+    '(queue_wait, execution, delivery, total).', ('stage', 'service_name', 'func')))
+RESULT_DELIVERY = REGISTRY.register(Histogram(
+    'producer_result_delivery_seconds', 'Duration of result delivery requests by HTTP status.',
+    ('code',)))
+
+
+def gauges(functions: Dict[str, Tuple[str, Callable[[], float]]]) -> None:
+    """
+    Register gauges read from callables.
+
+    :param functions: name to (documentation, callable)
+    :type functions: dict
+    :return:
+    :rtype: None
+    """
+    for name, (documentation, function) in functions.items():
+        REGISTRY.register(Gauge(name, documentation, function))
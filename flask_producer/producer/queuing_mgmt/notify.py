@@ -0,0 +1,118 @@
+import threading
+
+from queue import Queue, Full
+from typing import Dict
+
+
+class CompletionNotifier:
+    """Wakes up clients waiting for jobs to finish.
+
+    Long polling clients wait on a per `message_token` event; server sent
+    event streams subscribe to all completions of a service. Subscriber
+    queues are bounded, events for a subscriber which does not keep up are
+    dropped rather than held in memory.
+    """
+
+    def __init__(self, max_events=1000):
+        self.max_events = max_events
+        self._waiters = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def waiter(self, message_token: str) -> threading.Event:
+        """
+        Event which is set once job of `message_token` finishes. Register it
+        before checking the job status, so a completion is never missed.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :return: completion event
+        :rtype: threading.Event
+        """
+        with self._lock:
+            event = self._waiters.get(message_token)
+            if event is None:
+                event = self._waiters[message_token] = threading.Event()
+            return event
+
+    def forget(self, message_token: str) -> None:
+        """
+        Drop waiter of `message_token` once nobody waits for it anymore.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :return:
+        :rtype: None
+        """
+        with self._lock:
+            self._waiters.pop(message_token, None)
+
+    def subscribe(self, service_name: str) -> Queue:
+        """
+        Subscribe to completions of all jobs of a service.
+
+        :param service_name: name of service
+        :type service_name: str
+        :return: queue receiving completion events
+        :rtype: Queue
+        """
+        events = Queue(maxsize=self.max_events)
+        with self._lock:
+            self._subscribers.setdefault(service_name, set()).add(events)
+        return events
+
+    def unsubscribe(self, service_name: str, events: Queue) -> None:
+        """
+        Stop receiving completions of a service.
+
+        :param service_name: name of service
+        :type service_name: str
+        :param events: queue returned by `subscribe`
+        :type events: Queue
+        :return:
+        :rtype: None
+        """
+        with self._lock:
+            subscribers = self._subscribers.get(service_name, set())
+            subscribers.discard(events)
+            if not subscribers:
+                self._subscribers.pop(service_name, None)
+
+    def notify(self, service_name: str, message_token: str, status: int) -> None:
+        """
+        Publish that job of `message_token` finished with `status`.
+
+        :param service_name: name of service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param status: final job status
+        :type status: int
+        :return:
+        :rtype: None
+        """
+        event = {'service_name': service_name, 'message_token': message_token,
+                 'status': status}
+        with self._lock:
+            waiter = self._waiters.pop(message_token, None)
+            subscribers = list(self._subscribers.get(service_name, ()))
+        if waiter is not None:
+            waiter.set()
+        for events in subscribers:
+            try:
+                events.put_nowait(event)
+            except Full:
+                pass
+
+    def stats(self) -> Dict:
+        """
+        Number of waiting clients and subscribers.
+
+        :return: waiters and subscribers count
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'waiters': len(self._waiters),
+                'subscribers': sum(len(s) for s in self._subscribers.values())
+            }
@@ -1,4 +1,10 @@
+import heapq
+import itertools
+import threading
+import time
+
 from abc import ABCMeta, abstractmethod
+from collections import deque
 
 
 class AbstractQueue(metaclass=ABCMeta):
@@ -20,7 +26,7 @@ class AbstractQueue(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def enqueue(self, value: str) -> None:
+    def enqueue(self, value: str, service_name: str = None, priority: int = 0) -> None:
         """Insert element in queue."""
         pass
 
@@ -29,6 +35,11 @@ class AbstractQueue(metaclass=ABCMeta):
         """Remove element from queue."""
         pass
 
+    @abstractmethod
+    def remove(self, message_token: str) -> bool:
+        """Remove a queued element before its turn."""
+        pass
+
     @abstractmethod
     def __iter__(self):
         pass
@@ -37,40 +48,71 @@ class AbstractQueue(metaclass=ABCMeta):
 class QueueManager(AbstractQueue):
     """Queue implementation for job execution as
     "First Come First Serve".
+
+    Elements are kept in a circular buffer: dequeued slots are reused by
+    later enqueues. The buffer doubles when it is full, halves again once
+    it is only a quarter used (never below `capacity`), and refuses to grow
+    past `max_capacity` if one is given. Enqueue and dequeue are thread safe.
+
+    `remove` leaves a tombstone in the slot of the element, which `dequeue`
+    skips; resizing the buffer drops the tombstones.
     """
 
-    def __init__(self, capacity=20):
+    def __init__(self, capacity=20, max_capacity=None):
         super().__init__()
+        if max_capacity is not None and max_capacity < capacity:
+            raise ValueError('`max_capacity` must not be less than `capacity`')
+        self._capacity = capacity
+        self._max_capacity = max_capacity
         self._queue = [None for _ in range(capacity)]
-        self._front, self._rear = 0, 0
+        self._front = 0
+        self._queued = set()
+        self._removed = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size - len(self._removed)
+
+    def is_empty(self) -> bool:
+        """Is queue empty?"""
+        return self._size == len(self._removed)
 
     @property
     def queue(self) -> list:
         """Property to get queued elements."""
-        return self._queue
+        with self._lock:
+            return list(self)
 
     def __iter__(self):
-        index = self._front
-        while True:
-            if index == self._rear:
-                return
-            yield self._queue[index]
-            index += 1
+        capacity = len(self._queue)
+        for offset in range(self._size):
+            message_token = self._queue[(self._front + offset) % capacity]
+            if message_token not in self._removed:
+                yield message_token
 
-    def enqueue(self, message_token: str) -> None:
+    def enqueue(self, message_token: str, service_name: str = None, priority: int = 0) -> None:
         """
-        Insert element in queue.
+        Insert element in queue. Service and priority are ignored, all jobs
+        are served in arrival order.
 
         :param message_token: `message_token`
         :type message_token: str
+        :param service_name: name of service
+        :type service_name: str
+        :param priority: job priority
+        :type priority: int
         :return:
         :rtype:
         """
-        if self.is_full():
-            self._expand()
-        self._queue[self._rear] = message_token
-        self._rear += 1
-        self._size += 1
+        with self._lock:
+            if self.is_full():
+                if self._removed:  # Reclaim slots of removed elements first
+                    self._resize(len(self._queue))
+                else:
+                    self._expand()
+            self._queue[(self._front + self._size) % len(self._queue)] = message_token
+            self._queued.add(message_token)
+            self._size += 1
 
     def dequeue(self) -> str:
         """
@@ -79,13 +121,37 @@ class QueueManager(AbstractQueue):
         :return: 'message_token`
         :rtype: str
         """
-        if self.is_empty():
-            raise IndexError('Queue is empty!')
-        message_token = self._queue[self._front]
-        self._queue[self._front] = None
-        self._front += 1
-        self._size -= 1
-        return message_token
+        with self._lock:
+            if self.is_empty():
+                raise IndexError('Queue is empty!')
+            while True:
+                message_token = self._queue[self._front]
+                self._queue[self._front] = None
+                self._front = (self._front + 1) % len(self._queue)
+                self._size -= 1
+                if message_token in self._removed:
+                    self._removed.discard(message_token)
+                    continue
+                self._queued.discard(message_token)
+                if self._size <= len(self._queue) // 4 and len(self._queue) > self._capacity:
+                    self._shrink()
+                return message_token
+
+    def remove(self, message_token: str) -> bool:
+        """
+        Remove a queued element before its turn, in constant time.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :return: True if it was queued
+        :rtype: bool
+        """
+        with self._lock:
+            if message_token not in self._queued:
+                return False
+            self._queued.discard(message_token)
+            self._removed.add(message_token)
+            return True
 
     def _expand(self) -> None:
         """
@@ -93,7 +159,173 @@ class QueueManager(AbstractQueue):
         :return:
         :rtype:
         """
-        self._queue += [None for _ in range(len(self._queue))]
+        capacity = len(self._queue)
+        if self._max_capacity is not None and capacity >= self._max_capacity:
+            raise OverflowError(f'Queue is full! Maximum capacity is {self._max_capacity}.')
+        capacity *= 2
+        if self._max_capacity is not None:
+            capacity = min(capacity, self._max_capacity)
+        self._resize(capacity)
+
+    def _shrink(self) -> None:
+        """
+        Release unused slots after a burst.
+        :return:
+        :rtype:
+        """
+        self._resize(max(len(self._queue) // 2, self._capacity))
+
+    def _resize(self, capacity: int) -> None:
+        """
+        Move queued elements to a new buffer of `capacity` slots.
+        :param capacity: number of slots
+        :type capacity: int
+        :return:
+        :rtype:
+        """
+        elements = list(self)
+        self._queue = elements + [None for _ in range(capacity - len(elements))]
+        self._front = 0
+        self._size = len(elements)
+        self._removed.clear()
+
+    def is_full(self) -> bool:
+        """
+        Is queue full?
+
+        :return: True or False
+        :rtype: bool
+        """
+        return self._size == len(self._queue)
+
+
+class FairQueueManager(AbstractQueue):
+    """Per service queues served by deficit round robin.
+
+    Every service with queued jobs takes turns; on its turn a service may
+    dequeue `weight` jobs (weights below 1 accumulate over turns), so a
+    burst of one service cannot starve the others. Within a service jobs
+    with higher `priority` go first, equal priorities in arrival order.
+
+    Depth and recent wait times are tracked per service. Removed elements
+    stay in the heap of their service until `dequeue` pops and skips them.
+    """
+
+    def __init__(self, max_capacity=None, weights=None, default_weight=1, wait_samples=1000):
+        super().__init__()
+        # A service without a positive weight never earns the credit for a job
+        if not default_weight > 0:
+            raise ValueError(f'`default_weight` must be positive, got {default_weight}.')
+        for service_name, weight in (weights or {}).items():
+            if not weight > 0:
+                raise ValueError(f'Weight of service {service_name} must be positive, '
+                                 f'got {weight}.')
+        self._max_capacity = max_capacity
+        self._weights = weights or {}
+        self._default_weight = default_weight
+        self._wait_samples = wait_samples
+        self._queues = {}
+        self._active = deque()
+        self._deficit = {}
+        self._sequence = itertools.count()
+        self._metrics = {}
+        self._queued = {}
+        self._removed = set()
+        self._stale = {}
+        self._lock = threading.Lock()
+
+    @property
+    def queue(self) -> list:
+        """Property to get queued elements."""
+        with self._lock:
+            return list(self)
+
+    def __iter__(self):
+        for service_name in list(self._active):
+            for _, _, _, message_token in sorted(self._queues[service_name]):
+                if message_token not in self._removed:
+                    yield message_token
+
+    def _service_metrics(self, service_name: str) -> dict:
+        """Counters of a service, created on first use. Lock must be held."""
+        metrics = self._metrics.get(service_name)
+        if metrics is None:
+            metrics = self._metrics[service_name] = {
+                'enqueued': 0,
+                'dequeued': 0,
+                'removed': 0,
+                'waits': deque(maxlen=self._wait_samples)
+            }
+        return metrics
+
+    def enqueue(self, message_token: str, service_name: str = None, priority: int = 0) -> None:
+        """
+        Insert element in queue of its service.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :param service_name: name of service
+        :type service_name: str
+        :param priority: higher is dequeued first within the service
+        :type priority: int
+        :return:
+        :rtype:
+        """
+        with self._lock:
+            if self.is_full():
+                raise OverflowError(f'Queue is full! Maximum capacity is {self._max_capacity}.')
+            jobs = self._queues.get(service_name)
+            if jobs is None:
+                jobs = self._queues[service_name] = []
+                self._active.append(service_name)
+                self._deficit[service_name] = 0
+            heapq.heappush(jobs, (-priority, next(self._sequence), time.monotonic(),
+                                  message_token))
+            self._queued[message_token] = service_name
+            self._service_metrics(service_name)['enqueued'] += 1
+            self._size += 1
+
+    def dequeue(self) -> str:
+        """
+        Remove element from the queue of the service whose turn it is.
+
+        :return: 'message_token`
+        :rtype: str
+        """
+        with self._lock:
+            if self.is_empty():
+                raise IndexError('Queue is empty!')
+            while True:
+                service_name = self._active[0]
+                if self._deficit[service_name] < 1:
+                    self._deficit[service_name] += self._weights.get(service_name,
+                                                                     self._default_weight)
+                    if self._deficit[service_name] < 1:  # Not enough credit for a job yet
+                        self._active.rotate(-1)
+                        continue
+                jobs = self._queues[service_name]
+                _, _, queued_at, message_token = heapq.heappop(jobs)
+                removed = message_token in self._removed
+                if removed:  # Costs no credit
+                    self._removed.discard(message_token)
+                    self._stale[service_name] -= 1
+                else:
+                    self._deficit[service_name] -= 1
+                if not jobs:  # Service went idle, it starts from scratch next time
+                    self._active.popleft()
+                    del self._queues[service_name]
+                    del self._deficit[service_name]
+                    self._stale.pop(service_name, None)
+                elif self._deficit[service_name] < 1:  # Turn is over
+                    self._active.rotate(-1)
+                if removed:
+                    continue
+                del self._queued[message_token]
+                metrics = self._service_metrics(service_name)
+                metrics['dequeued'] += 1
+                metrics['waits'].append(time.monotonic() - queued_at)
+                self._size -= 1
+                return message_token
 
     def is_full(self) -> bool:
         """
@@ -102,4 +334,56 @@ class QueueManager(AbstractQueue):
         :return: True or False
         :rtype: bool
         """
-        return len(self._queue) == self._rear
+        return self._max_capacity is not None and self._size >= self._max_capacity
+
+    def remove(self, message_token: str) -> bool:
+        """
+        Remove a queued element before its turn, in constant time.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :return: True if it was queued
+        :rtype: bool
+        """
+        with self._lock:
+            if message_token not in self._queued:
+                return False
+            service_name = self._queued.pop(message_token)
+            self._removed.add(message_token)
+            self._stale[service_name] = self._stale.get(service_name, 0) + 1
+            self._service_metrics(service_name)['removed'] += 1
+            self._size -= 1
+            return True
+
+    def stats(self) -> dict:
+        """
+        Per service depth and wait times of recently dequeued jobs.
+
+        :return: metrics keyed by service name
+        :rtype: dict
+        """
+        with self._lock:
+            services = {service_name: (len(self._queues.get(service_name, ()))
+                                       - self._stale.get(service_name, 0),
+                                       metrics['enqueued'], metrics['dequeued'],
+                                       metrics['removed'], sorted(metrics['waits']))
+                        for service_name, metrics in self._metrics.items()}
+        stats = {}
+        for service_name, (depth, enqueued, dequeued, removed, waits) in services.items():
+            stats[str(service_name)] = {
+                'depth': depth,
+                'weight': self._weights.get(service_name, self._default_weight),
+                'enqueued': enqueued,
+                'dequeued': dequeued,
+                'removed': removed,
+                'wait_ms_p50': _percentile(waits, 0.5),
+                'wait_ms_p99': _percentile(waits, 0.99)
+            }
+        return stats
+
+
+def _percentile(samples: list, fraction: float) -> float:
+    """Percentile in milliseconds of sorted `samples` in seconds."""
+    if not samples:
+        return 0.0
+    return round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000, 3)
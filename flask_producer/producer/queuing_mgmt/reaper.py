@@ -0,0 +1,191 @@
+import heapq
+import json
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Dict
+
+from .hash import FINISHED_STATUSES
+
+
+class Reaper:
+    """Removes finished jobs nobody picked up.
+
+    A job is tracked once it completes, fails, times out or is cancelled.
+    It expires `ttl` seconds later (or after the `ttl` given in its
+    payload) unless delivered first.
+    Tracked results are also kept under a `max_bytes` memory budget: once
+    exceeded, the least recently polled results are evicted.
+
+    Removed jobs are remembered as expired (up to `max_expired` tokens), so
+    polls can tell them apart from tokens which never existed.
+    """
+
+    def __init__(self, storage, ttl=3600, max_bytes=64 * 1024 * 1024, interval=1,
+                 max_expired=10000):
+        self._storage = storage
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.max_expired = max_expired
+        self._deadlines = []
+        self._tracked = OrderedDict()
+        self._expired = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._metrics = {
+            'runs': 0,
+            'expired': 0,
+            'evicted': 0,
+            'last_run_ms': 0.0
+        }
+        threading.Thread(target=self._run, name='job-reaper', daemon=True).start()
+
+    def track(self, service_name: str, message_token: str, ttl: float = None,
+              finished_at: float = None) -> None:
+        """
+        Start the expiry clock of a finished job.
+
+        :param service_name: name of service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param ttl: seconds to keep the job, default `ttl` if None
+        :type ttl: float
+        :param finished_at: monotonic time the job finished, now if None
+        :type finished_at: float
+        :return:
+        :rtype: None
+        """
+        _, value = self._storage.status(service_name, message_token)
+        if not value:
+            return
+        size = len(json.dumps(value, default=str))
+        try:
+            ttl = self.ttl if ttl is None else float(ttl)
+        except (TypeError, ValueError):  # Ignore malformed `ttl` of a payload
+            ttl = self.ttl
+        now = time.monotonic()
+        # A finish time past now is from before a reboot, the clock restarted
+        expires_at = (now if finished_at is None else min(finished_at, now)) + ttl
+        with self._lock:
+            self._forget(message_token)
+            self._tracked[message_token] = (service_name, size, expires_at)
+            self._bytes += size
+            heapq.heappush(self._deadlines, (expires_at, message_token))
+
+    def touch(self, message_token: str) -> None:
+        """
+        Mark a result as recently used, it is evicted last.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :return:
+        :rtype: None
+        """
+        with self._lock:
+            if message_token in self._tracked:
+                self._tracked.move_to_end(message_token)
+
+    def forget(self, service_name: str, message_token: str) -> None:
+        """
+        Stop tracking a job which was delivered.
+
+        :param service_name: name of service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :return:
+        :rtype: None
+        """
+        with self._lock:
+            self._forget(message_token)
+
+    def _forget(self, message_token: str) -> None:
+        """Drop a tracked job, its deadline is skipped once due."""
+        tracked = self._tracked.pop(message_token, None)
+        if tracked is not None:
+            self._bytes -= tracked[1]
+
+    def is_expired(self, message_token: str) -> bool:
+        """
+        Check whether the job was removed by the reaper.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :return: True or False
+        :rtype: bool
+        """
+        with self._lock:
+            return message_token in self._expired
+
+    def _run(self) -> None:
+        """Reaper loop."""
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.reap()
+            except Exception as e:
+                from producer import logger
+                logger.log_exception('%s while reaping jobs.', e)
+
+    def reap(self) -> None:
+        """
+        Remove jobs past their deadline, then evict least recently used
+        results while over the memory budget.
+
+        :return:
+        :rtype: None
+        """
+        started = time.monotonic()
+        removed = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= started:
+                expires_at, message_token = heapq.heappop(self._deadlines)
+                tracked = self._tracked.get(message_token)
+                if tracked is not None and tracked[2] == expires_at:
+                    removed.append((self._remove(message_token), message_token, 'expired'))
+            while self._bytes > self.max_bytes and self._tracked:
+                message_token = next(iter(self._tracked))
+                removed.append((self._remove(message_token), message_token, 'evicted'))
+            if len(self._deadlines) > 2 * len(self._tracked) + 1024:
+                # Most deadlines belong to delivered jobs, drop them at once
+                self._deadlines = [entry for entry in self._deadlines
+                                   if entry[1] in self._tracked]
+                heapq.heapify(self._deadlines)
+        for service_name, message_token, _ in removed:
+            if self._storage.status(service_name, message_token)[0] in FINISHED_STATUSES:
+                self._storage.delete_item(service_name, message_token)
+        with self._lock:
+            self._metrics['runs'] += 1
+            for _, _, reason in removed:
+                self._metrics[reason] += 1
+            self._metrics['last_run_ms'] = round((time.monotonic() - started) * 1000, 3)
+
+    def _remove(self, message_token: str) -> str:
+        """
+        Move a tracked job to the expired tokens, lock must be held.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :return: name of service of the job
+        :rtype: str
+        """
+        service_name, size, _ = self._tracked.pop(message_token)
+        self._bytes -= size
+        self._expired[message_token] = service_name
+        while len(self._expired) > self.max_expired:
+            self._expired.popitem(last=False)
+        return service_name
+
+    def stats(self) -> Dict:
+        """
+        Reaper metrics.
+
+        :return: counters, tracked jobs and their estimated size
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._metrics, tracked=len(self._tracked), tracked_bytes=self._bytes,
+                        max_bytes=self.max_bytes, expired_tokens=len(self._expired))
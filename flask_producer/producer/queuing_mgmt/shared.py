@@ -0,0 +1,352 @@
+import json
+import sqlite3
+import threading
+import time
+
+from typing import Dict, List, Tuple, AnyStr
+
+from .hash import Hash, ProcessStatus, FINISHED_STATUSES
+from .queue import AbstractQueue
+
+
+class _SQLiteBackend(object):
+    """One SQLite connection per thread to a database shared by processes.
+
+    Connections run in autocommit mode, read-modify-write steps take the
+    database write lock up front with `BEGIN IMMEDIATE`.
+    """
+
+    def __init__(self, path: str, timeout: float = 30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Connection of the calling thread.
+
+        :return: SQLite connection
+        :rtype: sqlite3.Connection
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def transaction(self):
+        """Write transaction, committed on success and rolled back on error."""
+        return _Transaction(self.connection())
+
+
+class _Transaction(object):
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+class SharedSQLiteStorage(Hash):
+    """Job storage kept in a SQLite database shared by every producer
+    process on a host.
+
+    Nothing is cached in the process, each call reads or writes the
+    database, so a job registered by one worker can be polled, executed
+    and delivered by any other.
+
+    A job taken by a worker is leased to it for `lease` seconds. Jobs still
+    `PROCESSING` after their lease, left behind by a process which
+    crashed, are queued again when a producer process starts. A job which
+    runs longer than its lease may thus run twice, jobs run at least once.
+    """
+
+    def __init__(self, path='producer_shared.db', timeout=30, lease=300):
+        self.path = path
+        self.lease = lease
+        self._db = _SQLiteBackend(path, timeout)
+        with self._db.transaction() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS jobs ('
+                               'message_token TEXT PRIMARY KEY, '
+                               'service_name TEXT, '
+                               'data TEXT)')
+            connection.execute('CREATE INDEX IF NOT EXISTS jobs_service_name '
+                               'ON jobs (service_name)')
+
+    def _load(self, connection: sqlite3.Connection, service_name: str,
+              message_token: str) -> dict:
+        """Job of a service or None."""
+        row = connection.execute('SELECT data FROM jobs WHERE message_token = ? '
+                                 'AND service_name IS ?', (message_token, service_name)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def hashed_index(self) -> dict:
+        """
+        Returns services which have jobs.
+
+        :return: service name to index
+        :rtype: dict
+        """
+        rows = self._db.connection().execute(
+            'SELECT DISTINCT service_name FROM jobs ORDER BY service_name')
+        return {service_name: index for index, (service_name,) in enumerate(rows)}
+
+    def hash_function(self, service_name: str) -> int:
+        """
+        Index of a service in `hash_table`, -1 if it has no jobs.
+
+        :param service_name: name of service
+        :type service_name: str
+        :return: integer index of service
+        :rtype: int
+        """
+        return self.hashed_index().get(service_name, -1)
+
+    @property
+    def hash_table(self) -> List[Dict]:
+        """Jobs of every service keyed by `message_token`."""
+        buckets = {}
+        rows = self._db.connection().execute(
+            'SELECT service_name, message_token, data FROM jobs ORDER BY service_name, rowid')
+        for service_name, message_token, data in rows:
+            buckets.setdefault(service_name, {})[message_token] = json.loads(data)
+        return list(buckets.values())
+
+    def has(self, service_name: str, message_token: str) -> bool:
+        if not message_token:
+            raise ValueError('You must provide `message_token`')
+
+        return self._load(self._db.connection(), service_name, message_token) is not None
+
+    def set_item(self, service_name: str, data: dict, **kwargs: dict) -> str:
+        message_token = data.get('message_token')
+        generated_message_token = kwargs.get('message_token', message_token)
+        with self._db.transaction() as connection:
+            if not (message_token and self._load(connection, service_name, message_token)):
+                data['message_token'] = generated_message_token
+                data['status'] = ProcessStatus.CREATED
+            connection.execute('INSERT INTO jobs (message_token, service_name, data) '
+                               'VALUES (?, ?, ?) ON CONFLICT (message_token) '
+                               'DO UPDATE SET data = excluded.data',
+                               (data['message_token'], service_name,
+                                json.dumps(data, default=str)))
+        return message_token
+
+    def update(self, service_name: str, message_token: str, values: dict) -> int:
+        """
+        Atomically update fields of an existing job.
+
+        :param service_name: name of the service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param values: fields to set on the job
+        :type values: dict
+        :return: 0 or 1
+        :rtype: int
+        """
+        if not message_token:
+            raise ValueError('You must provide `message_token`')
+
+        with self._db.transaction() as connection:
+            value = self._load(connection, service_name, message_token)
+            if value is None:
+                return 0
+            value.update(values)
+            if values.get('status') == ProcessStatus.PROCESSING:
+                value['leased_at'] = time.time()
+            connection.execute('UPDATE jobs SET data = ? WHERE message_token = ?',
+                               (json.dumps(value, default=str), message_token))
+            return 1
+
+    def flush(self) -> None:
+        """Every write is committed before it returns."""
+        pass
+
+    def items(self, service_name: str) -> List[Tuple[AnyStr, Dict]]:
+        """
+        Snapshot of all jobs of a service.
+
+        :param service_name: name of the service
+        :type service_name: str
+        :return: list of (`message_token`, job)
+        :rtype: List[Tuple[AnyStr, Dict]]
+        """
+        rows = self._db.connection().execute(
+            'SELECT message_token, data FROM jobs WHERE service_name IS ? ORDER BY rowid',
+            (service_name,))
+        return [(message_token, json.loads(data)) for message_token, data in rows]
+
+    def get_item(self, service_name: str, message_token: str) -> Tuple[AnyStr, Dict]:
+        if not message_token:
+            raise ValueError('You must provide `message_token`')
+
+        return message_token, self._load(self._db.connection(), service_name, message_token) or {}
+
+    def locate(self, message_token: str) -> Tuple[AnyStr, Dict]:
+        row = self._db.connection().execute(
+            'SELECT service_name, data FROM jobs WHERE message_token = ?',
+            (message_token,)).fetchone()
+        return (None, {}) if row is None else (row[0], json.loads(row[1]))
+
+    def delete_item(self, service_name: str, message_token: str) -> int:
+        if not message_token:
+            raise ValueError('You must provide `message_token`')
+
+        cursor = self._db.connection().execute(
+            'DELETE FROM jobs WHERE message_token = ? AND service_name IS ?',
+            (message_token, service_name))
+        return cursor.rowcount
+
+    def status(self, service_name: str, message_token: str) -> Tuple[int, Dict]:
+        """
+        Check status of provided 'message_token`
+
+        :param service_name: name of service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :return: tuple(status, item value)
+        :rtype: tuple(int, dict)
+        """
+        if not message_token:
+            raise ValueError('You must provide `message_token`')
+
+        value = self._load(self._db.connection(), service_name, message_token)
+        if value is None:
+            return ProcessStatus.NOT_EXIST, {}
+        return value.get('status'), value
+
+    def status_update(self, service_name: str, message_token: str, status) -> int:
+        return self.update(service_name, message_token, {'status': status})
+
+    def recovered(self) -> List[Tuple[AnyStr, AnyStr]]:
+        """
+        The shared queue outlives restarts by itself. Only jobs `PROCESSING`
+        past their lease are handed back, reset to `CREATED`, to be queued
+        again.
+
+        :return: list of (`service_name`, `message_token`)
+        :rtype: list
+        """
+        expired = time.time() - self.lease
+        recovered = []
+        with self._db.transaction() as connection:
+            rows = connection.execute(
+                "SELECT service_name, message_token, data FROM jobs "
+                "WHERE json_extract(data, '$.status') = ?", (ProcessStatus.PROCESSING,)).fetchall()
+            for service_name, message_token, data in rows:
+                value = json.loads(data)
+                if value.get('leased_at', 0) > expired:
+                    continue
+                value['status'] = ProcessStatus.CREATED
+                value.pop('leased_at', None)
+                connection.execute('UPDATE jobs SET data = ? WHERE message_token = ?',
+                                   (json.dumps(value, default=str), message_token))
+                recovered.append((service_name, message_token))
+        return recovered
+
+    def finished(self) -> List[Tuple[AnyStr, AnyStr]]:
+        """
+        Finished jobs in the shared storage, including those of processes
+        which stopped before the jobs expired.
+
+        :return: list of (`service_name`, `message_token`)
+        :rtype: list
+        """
+        placeholders = ', '.join('?' for _ in FINISHED_STATUSES)
+        return [tuple(row) for row in self._db.connection().execute(
+            "SELECT service_name, message_token FROM jobs "
+            f"WHERE json_extract(data, '$.status') IN ({placeholders})", FINISHED_STATUSES)]
+
+
+class SQLiteQueueManager(AbstractQueue):
+    """"First Come First Serve" queue in a SQLite database shared by
+    producer processes. A token is handed to exactly one worker of any
+    process.
+    """
+
+    def __init__(self, path='producer_shared.db', max_capacity=None, timeout=30):
+        super().__init__()
+        self._max_capacity = max_capacity
+        self._db = _SQLiteBackend(path, timeout)
+        with self._db.transaction() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS queue ('
+                               'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                               'message_token TEXT)')
+            connection.execute('CREATE INDEX IF NOT EXISTS queue_message_token '
+                               'ON queue (message_token)')
+
+    def __len__(self):
+        return self._db.connection().execute('SELECT COUNT(*) FROM queue').fetchone()[0]
+
+    def __iter__(self):
+        rows = self._db.connection().execute('SELECT message_token FROM queue ORDER BY id')
+        for message_token, in rows:
+            yield message_token
+
+    @property
+    def queue(self) -> list:
+        """Property to get queued elements."""
+        return list(self)
+
+    def is_empty(self) -> bool:
+        return len(self) == 0
+
+    def is_full(self) -> bool:
+        return self._max_capacity is not None and len(self) >= self._max_capacity
+
+    def enqueue(self, message_token: str, service_name: str = None, priority: int = 0) -> None:
+        """
+        Insert element in queue. Service and priority are ignored, all jobs
+        are served in arrival order.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :param service_name: name of service
+        :type service_name: str
+        :param priority: job priority
+        :type priority: int
+        :return:
+        :rtype:
+        """
+        with self._db.transaction() as connection:
+            if self._max_capacity is not None and connection.execute(
+                    'SELECT COUNT(*) FROM queue').fetchone()[0] >= self._max_capacity:
+                raise OverflowError(f'Queue is full! Maximum capacity is {self._max_capacity}.')
+            connection.execute('INSERT INTO queue (message_token) VALUES (?)', (message_token,))
+
+    def dequeue(self) -> str:
+        """
+        Remove element from queue.
+
+        :return: 'message_token`
+        :rtype: str
+        """
+        with self._db.transaction() as connection:
+            row = connection.execute(
+                'SELECT id, message_token FROM queue ORDER BY id LIMIT 1').fetchone()
+            if row is None:
+                raise IndexError('Queue is empty!')
+            connection.execute('DELETE FROM queue WHERE id = ?', (row[0],))
+            return row[1]
+
+    def remove(self, message_token: str) -> bool:
+        """
+        Remove a queued element before its turn, looked up by index.
+
+        :param message_token: `message_token`
+        :type message_token: str
+        :return: True if it was queued
+        :rtype: bool
+        """
+        with self._db.transaction() as connection:
+            return connection.execute('DELETE FROM queue WHERE message_token = ?',
+                                      (message_token,)).rowcount > 0
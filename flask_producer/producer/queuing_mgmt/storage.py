@@ -0,0 +1,227 @@
+import atexit
+import itertools
+import json
+import sqlite3
+import threading
+import time
+
+from queue import Queue, Empty
+from typing import List, Tuple, AnyStr
+
+from .hash import Hash, HashTableStorage, ProcessStatus, FINISHED_STATUSES
+from .queue import AbstractQueue, QueueManager, FairQueueManager
+from .shared import SharedSQLiteStorage, SQLiteQueueManager
+
+_STOP = object()
+_COMMIT_ATTEMPTS = 3
+_RETRY_DELAY_SECONDS = 0.1
+
+
+class SQLiteHashTableStorage(HashTableStorage):
+    """Hash Table storage journaled to a SQLite database in WAL mode.
+
+    The in-memory Hash Table stays the working set; every stored, updated
+    or deleted job is also queued for a single writer thread. The writer
+    commits everything queued meanwhile in one transaction (group commit),
+    so concurrent submits share one `fsync`. `flush` blocks until the
+    changes of the calling thread are committed. A batch which still fails
+    after `_COMMIT_ATTEMPTS` is dropped from the journal, `flush` raises
+    its error to the threads whose changes it held.
+
+    On start the table is replayed from the database. Jobs which were
+    created or processing when the previous run stopped are reported by
+    `recovered` so they can be queued again, jobs run at least once.
+    Finished jobs are reported by `finished` so they still expire.
+    """
+
+    def __init__(self, path='producer_jobs.db', synchronous='NORMAL', max_batch=1000,
+                 wait_for_commit=True, size=20, stripes=16):
+        super().__init__(size, stripes)
+        self.path = path
+        self.max_batch = max_batch
+        self.wait_for_commit = wait_for_commit
+        self._pending = Queue()
+        self._sequence = itertools.count(1)
+        self._journal_lock = threading.Lock()
+        self._written = 0  # Last sequence the writer is done with
+        self._failed = []  # (first, last sequence, error) of batches not committed
+        self._commit = threading.Condition()
+        self._local = threading.local()
+        self._recovered = []
+        self._finished = []
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(f'PRAGMA synchronous={synchronous}')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS jobs ('
+                                 'message_token TEXT PRIMARY KEY, '
+                                 'service_name TEXT, '
+                                 'data TEXT)')
+        self._replay()
+        self._writer = threading.Thread(target=self._write, name='storage-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _replay(self) -> None:
+        """Load jobs of the previous run into the Hash Table."""
+        rows = self._connection.execute(
+            'SELECT service_name, message_token, data FROM jobs ORDER BY rowid')
+        for service_name, message_token, data in rows:
+            value = json.loads(data)
+            with self._lock_for(service_name):
+                self.hash_table[self.hash_function(service_name)][message_token] = value
+                self._token_index[message_token] = service_name
+            if value.get('status') in (ProcessStatus.CREATED, ProcessStatus.PROCESSING):
+                self._recovered.append((service_name, message_token))
+            elif value.get('status') in FINISHED_STATUSES:
+                self._finished.append((service_name, message_token))
+
+    def recovered(self) -> List[Tuple[AnyStr, AnyStr]]:
+        return list(self._recovered)
+
+    def finished(self) -> List[Tuple[AnyStr, AnyStr]]:
+        return list(self._finished)
+
+    def _changed(self, service_name: str, message_token: str, value: dict) -> None:
+        data = None if value is None else json.dumps(value, default=str)
+        with self._journal_lock:  # Journal in the same order as sequence numbers
+            sequence = next(self._sequence)
+            self._pending.put((sequence, service_name, message_token, data))
+        self._local.sequence = sequence
+
+    def _write(self) -> None:
+        """Writer loop, commits queued changes in batches."""
+        while True:
+            changes = [self._pending.get()]
+            while len(changes) < self.max_batch and changes[-1] is not _STOP:
+                try:
+                    changes.append(self._pending.get_nowait())
+                except Empty:
+                    break
+            stop = changes[-1] is _STOP
+            if stop:
+                changes.pop()
+            if changes:
+                self._commit_batch(changes)
+            if stop:
+                return
+
+    def _commit_batch(self, changes: List[Tuple]) -> None:
+        """
+        Commit changes in one transaction.
+
+        :param changes: list of (sequence, `service_name`, `message_token`, data)
+        :type changes: list
+        :return:
+        :rtype: None
+        """
+        error = None
+        for attempt in range(_COMMIT_ATTEMPTS):
+            try:
+                with self._connection:
+                    for _, service_name, message_token, data in changes:
+                        if data is None:
+                            self._connection.execute('DELETE FROM jobs WHERE message_token = ?',
+                                                     (message_token,))
+                        else:
+                            self._connection.execute(
+                                'INSERT INTO jobs (message_token, service_name, data) '
+                                'VALUES (?, ?, ?) ON CONFLICT (message_token) '
+                                'DO UPDATE SET data = excluded.data',
+                                (message_token, service_name, data))
+                error = None
+                break
+            except sqlite3.Error as e:
+                error = e
+                if attempt + 1 < _COMMIT_ATTEMPTS:
+                    time.sleep(_RETRY_DELAY_SECONDS * 2 ** attempt)
+        if error is not None:
+            from producer import logger
+            logger.log_exception('%s while journaling %d job changes, they are not durable.',
+                                 error, len(changes))
+        with self._commit:
+            if error is not None:
+                self._failed.append((changes[0][0], changes[-1][0], error))
+            self._written = changes[-1][0]
+            self._commit.notify_all()
+
+    def flush(self) -> None:
+        """
+        Block until changes made by the calling thread are durable.
+
+        :return:
+        :rtype: None
+        :raises sqlite3.Error: if some of them could not be committed
+        """
+        if not self.wait_for_commit:
+            return
+        sequence = getattr(self._local, 'sequence', 0)
+        flushed = getattr(self._local, 'flushed', 0)
+        self._local.flushed = sequence
+        with self._commit:
+            self._commit.wait_for(lambda: self._written >= sequence)
+            for first, last, error in self._failed:
+                if first <= sequence and last > flushed:
+                    raise error
+
+    def close(self) -> None:
+        """Commit pending changes and stop the writer."""
+        if self._writer.is_alive():
+            self._pending.put(_STOP)
+            self._writer.join()
+        self._connection.close()
+
+
+_STORAGES = {
+    'memory': HashTableStorage,
+    'sqlite': SQLiteHashTableStorage,
+    'shared': SharedSQLiteStorage,
+}
+
+
+def get_storage(backend: str = 'memory', **options) -> Hash:
+    """
+    Build job storage for configured backend.
+
+    :param backend: one of `memory`, `sqlite` or `shared`
+    :type backend: str
+    :param options: keyword arguments of the storage class
+    :type options: dict
+    :return: storage instance
+    :rtype: Hash
+    """
+    try:
+        storage_class = _STORAGES[backend]
+    except KeyError:
+        raise ValueError(f'Unknown storage backend - {backend}. '
+                         f'Expected one of {", ".join(_STORAGES)}.')
+    return storage_class(**options)
+
+
+def get_queue(storage, capacity: int = 20, max_capacity: int = None, scheduler: str = 'fifo',
+              weights: dict = None) -> AbstractQueue:
+    """
+    Build pending jobs queue living next to `storage`. Shared storage gets
+    a queue in the same database, every other one an in-process queue:
+    first come first serve (`fifo`) or fair share across services (`fair`).
+
+    :param storage: job storage from `get_storage`
+    :type storage: Hash
+    :param capacity: initial slots of in-process queue
+    :type capacity: int
+    :param max_capacity: upper bound of queued jobs
+    :type max_capacity: int
+    :param scheduler: `fifo` or `fair`
+    :type scheduler: str
+    :param weights: jobs per turn of services with `fair` scheduler, 1 if not given
+    :type weights: dict
+    :return: queue instance
+    :rtype: AbstractQueue
+    """
+    if isinstance(storage, SharedSQLiteStorage):
+        return SQLiteQueueManager(storage.path, max_capacity)
+    if scheduler == 'fair':
+        return FairQueueManager(max_capacity, weights)
+    if scheduler != 'fifo':
+        raise ValueError(f'Unknown queue scheduler - {scheduler}. Expected one of fifo, fair.')
+    return QueueManager(capacity, max_capacity)
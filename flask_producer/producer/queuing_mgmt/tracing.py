@@ -0,0 +1,122 @@
+import threading
+import time
+
+from collections import deque
+from typing import Dict, List
+
+from .metrics import JOB_STAGE
+
+_TRANSITIONS = ('submitted_at', 'picked_up_at', 'finished_at', 'delivered_at')
+# Stage name, job field it starts at, job field it ends at
+_STAGES = (
+    ('queue_wait', 'submitted_at', 'picked_up_at'),
+    ('execution', 'picked_up_at', 'finished_at'),
+    ('delivery', 'finished_at', 'delivered_at')
+)
+
+
+class Tracer:
+    """Lifecycle of jobs split into stages.
+
+    Jobs carry monotonic timestamps of their transitions: `submitted_at`,
+    `picked_up_at`, `finished_at` and, once delivered, `delivered_at`.
+    Every stage (queue wait, execution, delivery and the total) is observed
+    in a latency histogram per service and function as soon as it ends.
+    The last `max_traces` finished jobs are kept to be exported as spans.
+    """
+
+    def __init__(self, max_traces=10000):
+        self._traces = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def observe(stage: str, service_name: str, func: str, started: float,
+                ended: float) -> None:
+        """
+        Observe duration of a stage. Unknown or backwards (timestamps from
+        before a reboot) durations are skipped.
+
+        :param stage: `queue_wait`, `execution`, `delivery` or `total`
+        :type stage: str
+        :param service_name: name of the service
+        :type service_name: str
+        :param func: name of the job function
+        :type func: str
+        :param started: monotonic time the stage started
+        :type started: float
+        :param ended: monotonic time the stage ended
+        :type ended: float
+        :return:
+        :rtype: None
+        """
+        if started is not None and ended is not None and ended >= started:
+            JOB_STAGE.observe(ended - started, stage, service_name, func)
+
+    def complete(self, service_name: str, message_token: str, value: dict, outcome: str) -> None:
+        """
+        Keep the timestamps of a job which reached its last transition.
+
+        :param service_name: name of the service
+        :type service_name: str
+        :param message_token: `message_token`
+        :type message_token: str
+        :param value: job with its timestamps
+        :type value: dict
+        :param outcome: `delivered`, `failed`, `timed_out` or `cancelled`
+        :type outcome: str
+        :return:
+        :rtype: None
+        """
+        trace = (service_name, message_token, value.get('func'), outcome,
+                 tuple(value.get(field) for field in _TRANSITIONS))
+        with self._lock:
+            self._traces.append(trace)
+
+    def spans(self, service_name: str = None, limit: int = 100) -> List[Dict]:
+        """
+        Most recent traces as spans, one trace per job (`trace_id` is the
+        `message_token`) with a `job` root span and a child span per stage.
+        Monotonic timestamps are mapped to Unix epoch nanoseconds.
+
+        :param service_name: only jobs of this service, all if None
+        :type service_name: str
+        :param limit: number of jobs
+        :type limit: int
+        :return: spans
+        :rtype: List[Dict]
+        """
+        with self._lock:
+            traces = list(self._traces)
+        offset = time.time() - time.monotonic()
+        spans = []
+        for name, message_token, func, outcome, timestamps in reversed(traces):
+            known = [t for t in timestamps if t is not None]
+            if not known or service_name is not None and name != service_name:
+                continue
+            if limit <= 0:
+                break
+            limit -= 1
+            times = dict(zip(_TRANSITIONS, timestamps))
+            root_id = message_token[:16]
+            attributes = {'service_name': name, 'func': func, 'outcome': outcome}
+            spans.append(self._span(message_token, root_id, None, 'job', min(known), max(known),
+                                    offset, attributes))
+            for number, (stage, start, end) in enumerate(_STAGES, 1):
+                if times[start] is not None and times[end] is not None:
+                    spans.append(self._span(message_token, f'{root_id[:14]}{number:02x}',
+                                            root_id, stage, times[start], times[end], offset,
+                                            attributes))
+        return spans
+
+    @staticmethod
+    def _span(trace_id: str, span_id: str, parent_span_id: str, name: str, started: float,
+              ended: float, offset: float, attributes: dict) -> Dict:
+        return {
+            'trace_id': trace_id,
+            'span_id': span_id,
+            'parent_span_id': parent_span_id,
+            'name': name,
+            'start_time_unix_nano': int((started + offset) * 1e9),
+            'end_time_unix_nano': int((ended + offset) * 1e9),
+            'attributes': attributes
+        }
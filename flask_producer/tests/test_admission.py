@@ -0,0 +1,24 @@
+import unittest
+
+from producer.queuing_mgmt.admission import AdmissionController
+
+
+class TestRateLimit(unittest.TestCase):
+
+    def test_rate_below_one_admits_a_job(self):
+        admission = AdmissionController(rate=0.5)
+        self.assertEqual(admission.burst, 1)
+        self.assertEqual(admission.admit({'s': 1}, 0, 0), (None, 0))
+        self.assertEqual(admission.admit({'s': 1}, 0, 0), (429, 2))
+
+    def test_batch_larger_than_burst(self):
+        admission = AdmissionController(rate=10, burst=5)
+        self.assertEqual(admission.admit({'s': 6}, 0, 0), (413, None))
+        self.assertEqual(admission.load(0, 0)['rejected_too_large'], 6)
+        # Tokens were not taken
+        self.assertEqual(admission.admit({'s': 5}, 0, 0), (None, 0))
+        self.assertEqual(admission.admit({'s': 5}, 0, 0), (429, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
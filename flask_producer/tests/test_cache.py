@@ -0,0 +1,17 @@
+import unittest
+
+from producer.queuing_mgmt.cache import ResultCache
+
+
+class TestKey(unittest.TestCase):
+
+    def test_storage_fields_ignored(self):
+        data = {'name': 'x', 'func': 'greetings', 'submitted_at': 1.0}
+        leased = dict(data, message_token='a', status=2, picked_up_at=2.0, leased_at=3.0)
+        self.assertEqual(ResultCache.key('greetings', data), ResultCache.key('greetings', leased))
+        self.assertNotEqual(ResultCache.key('greetings', data),
+                            ResultCache.key('greetings', dict(data, name='y')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from producer.queuing_mgmt.hash import ProcessStatus
+from producer.queuing_mgmt.jobs import Jobs
+
+
+class TestExpiryAfterRestart(unittest.TestCase):
+    """Finished jobs restored from the storage still expire."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'jobs.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def committed(self, message_token):
+        """Wait for the finished job to reach the database."""
+        for _ in range(200):
+            connection = sqlite3.connect(self.path)
+            row = connection.execute('SELECT data FROM jobs WHERE message_token = ?',
+                                     (message_token,)).fetchone()
+            connection.close()
+            if row and json.loads(row[0]).get('status') == ProcessStatus.COMPLETE:
+                return
+            time.sleep(0.01)
+        self.fail(f'Job {message_token} was not committed.')
+
+    def restart(self, backend):
+        config = {'STORAGE_BACKEND': backend, 'STORAGE_OPTIONS': {'path': self.path},
+                  'EXPIRY': {'interval': 3600}}
+        message_token = Jobs(config).register('greetings', 'restart', {'name': 'x', 'ttl': 0.2})
+        self.committed(message_token)
+
+        queueing = Jobs(dict(config, EXPIRY={'interval': 0.05}))
+        self.assertEqual(queueing.reaper_stats()['tracked'], 1)
+        for _ in range(100):
+            if queueing.is_completed('restart', message_token)[0] == ProcessStatus.EXPIRED:
+                break
+            time.sleep(0.02)
+        self.assertEqual(queueing.is_completed('restart', message_token)[0],
+                         ProcessStatus.EXPIRED)
+        self.assertEqual(queueing.reaper_stats()['tracked'], 0)
+
+    def test_sqlite(self):
+        self.restart('sqlite')
+
+    def test_shared(self):
+        self.restart('shared')
+
+
+if __name__ == '__main__':
+    unittest.main()
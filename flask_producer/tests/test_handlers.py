@@ -0,0 +1,82 @@
+import threading
+import time
+import unittest
+
+from producer.queuing_mgmt.executor import get_executor
+from producer.queuing_mgmt.handlers import HandlerRegistry, JobTimeout
+
+_RELEASE = threading.Event()
+
+
+def late(payload: dict) -> dict:
+    raise TimeoutError('Upstream did not answer.')
+
+
+async def alate(payload: dict) -> dict:
+    raise TimeoutError('Upstream did not answer.')
+
+
+def hang(payload: dict) -> dict:
+    _RELEASE.wait(5)
+    return {'result': 'late'}
+
+
+class TestTimeouts(unittest.TestCase):
+    """Only an expired deadline is a timeout, a `TimeoutError` of the job
+    function is a failure."""
+
+    def setUp(self):
+        _RELEASE.clear()
+        self.executor = get_executor('thread', 2)
+        self.handlers = HandlerRegistry(functions={})
+
+    def tearDown(self):
+        _RELEASE.set()
+        self.executor.shutdown()
+
+    def assertCounted(self, name, **expected):
+        # Pooled calls are counted by a done callback, shortly after the result
+        for _ in range(100):
+            stats = self.handlers.stats()[name]
+            if all(stats[counter] == value for counter, value in expected.items()):
+                return
+            time.sleep(0.01)
+        self.fail(f'Handler {name} counted {stats}, expected {expected}.')
+
+    def assertFailed(self, name, timeout=None):
+        with self.assertRaises(TimeoutError) as raised:
+            self.handlers.run(name, {}, self.executor, timeout=timeout)
+        self.assertNotIsInstance(raised.exception, JobTimeout)
+        self.assertEqual(str(raised.exception), 'Upstream did not answer.')
+        self.assertCounted(name, failed=1, timed_out=0)
+
+    def test_inline_without_timeout(self):
+        self.handlers.register('late', late)
+        self.assertFailed('late')
+
+    def test_inline_with_timeout(self):
+        self.handlers.register('late', late, timeout=5)
+        self.assertFailed('late')
+
+    def test_thread_without_timeout(self):
+        self.handlers.register('late', late, execution='thread')
+        self.assertFailed('late')
+
+    def test_thread_with_timeout(self):
+        self.handlers.register('late', late, execution='thread')
+        self.assertFailed('late', timeout=5)
+
+    def test_coroutine_with_timeout(self):
+        self.handlers.register('late', alate, execution='coroutine', timeout=5)
+        self.assertFailed('late')
+
+    def test_expired(self):
+        self.handlers.register('hang', hang, timeout=0.05)
+        with self.assertRaises(JobTimeout):
+            self.handlers.run('hang', {}, self.executor)
+        _RELEASE.set()
+        self.assertCounted('hang', timed_out=1, failed=0, abandoned=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
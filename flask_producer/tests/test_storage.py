@@ -0,0 +1,36 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from producer.queuing_mgmt.storage import SQLiteHashTableStorage
+
+
+class TestFailedCommit(unittest.TestCase):
+    """Changes which could not be committed are not reported durable."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'jobs.db')
+        self.storage = SQLiteHashTableStorage(self.path)
+
+    def tearDown(self):
+        self.storage.close()
+        self.directory.cleanup()
+
+    def test_flush_raises(self):
+        self.storage.set_item('s', {'name': 'x'}, message_token='a')
+        self.storage.flush()
+        connection = sqlite3.connect(self.path)
+        connection.execute('DROP TABLE jobs')
+        connection.close()
+
+        self.storage.set_item('s', {'name': 'y'}, message_token='b')
+        with self.assertRaises(sqlite3.Error):
+            self.storage.flush()
+        # Reported once, to the thread which made the change
+        self.storage.flush()
+
+
+if __name__ == '__main__':
+    unittest.main()